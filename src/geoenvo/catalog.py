@@ -0,0 +1,136 @@
+"""
+*catalog.py*
+"""
+
+from threading import Lock
+from types import MappingProxyType
+from typing import Hashable, Union
+
+import daiquiri
+from geoenvo.environment import Environment
+from geoenvo.utilities import EnvironmentDataModel
+
+logger = daiquiri.getLogger(__name__)
+
+
+class EnvironmentCatalog:
+    """
+    The EnvironmentCatalog class is a registry of the environment classes of a
+    ``DataSource``. Each class is identified by an integer code and holds
+    precomputed, immutable environment properties. Resolved environments are
+    carried as lightweight ``Environment`` objects referencing a code in the
+    catalog, and are only expanded into the full environment data model when
+    their ``data`` is first accessed (e.g., when a ``Response`` is
+    constructed). Each result gets its own ``Environment``, so changes to the
+    data of one result don't affect others.
+
+    A catalog is shared by all instances of a data source, so each class is
+    parsed and registered once per process.
+    """
+
+    def __init__(self, data_source: str, identifier: str):
+        """
+        Initializes an empty catalog.
+
+        :param data_source: The name of the data source.
+        :param identifier: The identifier (e.g., DOI) of the data source.
+        """
+        self._data_source = data_source
+        self._identifier = identifier
+        self._codes = {}
+        self._properties = {}
+        self._lock = Lock()
+
+    @property
+    def data_source(self) -> str:
+        """
+        Retrieves the name of the data source.
+
+        :return: The name of the data source.
+        """
+        return self._data_source
+
+    @property
+    def identifier(self) -> str:
+        """
+        Retrieves the identifier of the data source.
+
+        :return: The identifier of the data source.
+        """
+        return self._identifier
+
+    def __len__(self) -> int:
+        return len(self._properties)
+
+    def __contains__(self, code: int) -> bool:
+        return code in self._properties
+
+    def register(self, key: Hashable, properties: dict, code: int = None) -> int:
+        """
+        Adds an environment class to the catalog, if not already present.
+
+        :param key: A hashable value uniquely identifying the class in the
+            data source (e.g., a raster value or descriptor string).
+        :param properties: A dictionary of environment properties, or ``None``
+            if the class has no properties (e.g., an empty descriptor).
+        :param code: The integer code of the class (optional). If not
+            provided, the next available code is used.
+        :return: The integer code of the class.
+        """
+        with self._lock:
+            if key in self._codes:
+                return self._codes[key]
+            if code is None:
+                code = len(self._properties)
+                while code in self._properties:
+                    code += 1
+            self._codes[key] = code
+            if properties is not None:
+                properties = MappingProxyType(dict(properties))
+            self._properties[code] = properties
+            logger.debug(f"Registered environment class {code} in {self.data_source}")
+            return code
+
+    def code(self, key: Hashable) -> Union[int, None]:
+        """
+        Retrieves the integer code of an environment class.
+
+        :param key: The key the class was registered with.
+        :return: The integer code, or ``None`` if the class is not registered.
+        """
+        return self._codes.get(key)
+
+    def properties(self, code: int) -> MappingProxyType:
+        """
+        Retrieves the immutable properties of an environment class.
+
+        :param code: The integer code of the class.
+        :return: A read-only mapping of environment properties, or ``None``.
+        """
+        return self._properties[code]
+
+    def environment(self, code: int) -> Environment:
+        """
+        Creates an ``Environment`` object referencing an environment class.
+        A new object is returned for every result, and its data is expanded
+        from the catalog on first access.
+
+        :param code: The integer code of the class.
+        :return: An ``Environment`` object.
+        """
+        return Environment(code=code, catalog=self)
+
+    def expand(self, code: int) -> dict:
+        """
+        Expands an environment class into the environment data model.
+
+        :param code: The integer code of the class.
+        :return: A new dictionary in the environment data model format.
+        """
+        environment = EnvironmentDataModel()
+        environment.set_identifier(self.identifier)
+        environment.set_data_source(self.data_source)
+        environment.set_date_created()
+        properties = self.properties(code)
+        environment.set_properties(None if properties is None else dict(properties))
+        return environment.data
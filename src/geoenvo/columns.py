@@ -0,0 +1,222 @@
+"""
+*columns.py*
+"""
+
+import json
+from math import isnan
+from pathlib import Path
+from typing import List, Union
+
+import daiquiri
+import numpy as np
+import shapely
+from geoenvo.geometry import GEOD, match_within_distance
+
+logger = daiquiri.getLogger(__name__)
+
+# Attributes of each layer, in the order of the response of the Ecological
+# Marine Units data source
+ATTRIBUTES = ["UnitTop", "UnitBottom", "OceanName", "Name_2018"]
+
+
+class ColumnStore:
+    """
+    The ColumnStore class provides vectorized lookups against a local copy of
+    a layered, point-based dataset (e.g., the Ecological Marine Units), where
+    each horizontal cell holds a vertical column of layers.
+
+    Layers are grouped by the coordinates of their cell, and sorted from the
+    top to the bottom of each column, so that the layers of a cell are a
+    contiguous slice of the attribute arrays. Lookups return dictionaries in
+    the format of the response of the online data source, which can then be
+    converted to ``Environment`` objects the same way.
+    """
+
+    def __init__(self, x, y, attributes: dict, fields: list = None):
+        """
+        Initializes a ColumnStore object.
+
+        :param x: An array of x coordinates (longitude) of the cell of each
+            layer.
+        :param y: An array of y coordinates (latitude) of the cell of each
+            layer.
+        :param attributes: A dictionary of arrays of layer attributes, with
+            the keys ``UnitTop``, ``UnitBottom``, ``OceanName``, and
+            ``Name_2018``. Missing codes may be ``None`` or ``NaN``.
+        :param fields: The fields of the layer, including coded value domains,
+            in the format of the ArcGIS REST API (optional). Without them,
+            codes are converted with the domains shipped with the package.
+        """
+        x = np.asarray(x, dtype=float)
+        y = np.asarray(y, dtype=float)
+        tops = np.asarray(attributes["UnitTop"], dtype=float)
+        cells, inverse = np.unique(np.column_stack([x, y]), axis=0, return_inverse=True)
+        order = np.lexsort((-tops, inverse.ravel()))
+        self._x, self._y = cells[:, 0], cells[:, 1]
+        self._starts = np.searchsorted(inverse.ravel()[order], np.arange(len(cells)))
+        self._counts = np.diff(np.append(self._starts, len(order)))
+        self._attributes = {
+            "UnitTop": tops[order].tolist(),
+            "UnitBottom": np.asarray(attributes["UnitBottom"], dtype=float)[
+                order
+            ].tolist(),
+            "OceanName": _codes(np.asarray(attributes["OceanName"])[order]),
+            "Name_2018": _codes(np.asarray(attributes["Name_2018"])[order]),
+        }
+        self._fields = fields
+        logger.debug(f"Indexed {len(order)} layers in {len(cells)} cells")
+
+    @property
+    def fields(self) -> list:
+        """
+        Retrieves the fields of the layer, including coded value domains.
+
+        :return: A list of fields, or ``None`` if not defined.
+        """
+        return self._fields
+
+    def __len__(self) -> int:
+        return len(self._attributes["UnitTop"])
+
+    @classmethod
+    def from_file(cls, path: Union[str, Path]) -> "ColumnStore":
+        """
+        Loads a column store from a local file.
+
+        Two formats are supported:
+
+        - **GeoParquet** (``.parquet``, ``.geoparquet``): Each row is a layer,
+          with the columns ``UnitTop``, ``UnitBottom``, ``OceanName``, and
+          ``Name_2018``, and the location of its cell as a ``Point`` geometry
+          column, or as ``x`` and ``y`` columns. Reading requires the optional
+          ``pyarrow`` dependency.
+        - **NumPy** (``.npz``): An archive of arrays with the keys ``x``,
+          ``y``, ``UnitTop``, ``UnitBottom``, ``OceanName``, and
+          ``Name_2018``.
+
+        The fields of the layer (see ``fields``) are read from a sidecar JSON
+        file of the same name (e.g., ``emu.parquet.json``) with the key
+        ``fields``, such as the layer metadata of the online data source. The
+        file is optional.
+
+        :param path: The path to the file.
+        :return: A ColumnStore object.
+        """
+        path = Path(path)
+        logger.debug(f"Opening column store from {path}")
+        fields = None
+        sidecar = path.with_name(path.name + ".json")
+        if sidecar.exists():
+            with open(sidecar, "r", encoding="utf-8") as f:
+                fields = json.load(f).get("fields")
+        if path.suffix.lower() == ".npz":
+            with np.load(path, allow_pickle=True) as archive:
+                attributes = {a: archive[a] for a in ATTRIBUTES}
+                return cls(archive["x"], archive["y"], attributes, fields)
+        if path.suffix.lower() in [".parquet", ".geoparquet"]:
+            # pylint: disable=import-outside-toplevel
+            import pandas as pd
+
+            try:
+                table = pd.read_parquet(path)
+            except ImportError as e:
+                raise ImportError(
+                    "Reading GeoParquet files requires the optional 'pyarrow' "
+                    "dependency (e.g., 'pip install geoenvo[parquet]')."
+                ) from e
+            if "x" in table and "y" in table:
+                x, y = table["x"].to_numpy(), table["y"].to_numpy()
+            else:
+                points = shapely.from_wkb(table["geometry"].to_numpy())
+                x, y = shapely.get_x(points), shapely.get_y(points)
+            attributes = {a: table[a].to_numpy() for a in ATTRIBUTES}
+            return cls(x, y, attributes, fields)
+        raise ValueError(f"Unsupported column store format: {path.suffix}")
+
+    def query_points(self, x, y, distance: float) -> List[dict]:
+        """
+        Finds the layers of the cells within a distance of each of a list of
+        points.
+
+        :param x: An array of x coordinates (longitude).
+        :param y: An array of y coordinates (latitude).
+        :param distance: The maximum geodesic distance in meters.
+        :return: A list of dictionaries, one per point, in the format of the
+            response of a single point query.
+        """
+        points, cells = match_within_distance(x, y, self._x, self._y, distance)
+        results = [[] for _ in range(len(np.atleast_1d(x)))]
+        for point, cell in zip(points.tolist(), cells.tolist()):
+            results[point].append(cell)
+        return [self._response(cells) for cells in results]
+
+    # pylint: disable=too-many-locals
+    def query_polygon(self, geometry: dict, distance: float) -> dict:
+        """
+        Finds the layers of the cells within a polygon, or within a distance
+        of its boundary. Lines (e.g., tracks) are handled the same way, with
+        the cells within a distance of the line.
+
+        The distance to the boundary is measured geodesically from the
+        nearest point of the boundary in planar (degree) coordinates, which is
+        a close approximation for the small distances used by the data source.
+
+        :param geometry: A GeoJSON ``Polygon`` or ``LineString`` geometry.
+        :param distance: The maximum distance in meters.
+        :return: A dictionary in the format of the response of a single
+            polygon query.
+        """
+        polygon = shapely.geometry.shape(geometry)
+        polygon = shapely.force_2d(polygon)
+        _, ymin, _, ymax = polygon.bounds
+        half_height = distance / 110_000
+        max_lat = min(max(abs(ymin), abs(ymax)) + half_height, 89.9)
+        search_area = polygon.buffer(half_height / np.cos(np.radians(max_lat)))
+        candidates = np.flatnonzero(shapely.contains_xy(search_area, self._x, self._y))
+
+        inside = shapely.contains_xy(polygon, self._x[candidates], self._y[candidates])
+        outside = candidates[~inside]
+        edge = polygon.boundary if isinstance(polygon, shapely.Polygon) else polygon
+        nearest = shapely.shortest_line(
+            shapely.points(self._x[outside], self._y[outside]), edge
+        )
+        coordinates = shapely.get_coordinates(nearest).reshape(-1, 4)
+        _, _, meters = GEOD.inv(
+            coordinates[:, 0], coordinates[:, 1], coordinates[:, 2], coordinates[:, 3]
+        )
+        cells = np.concatenate([candidates[inside], outside[meters <= distance]])
+        return self._response(cells.tolist())
+
+    def _response(self, cells: List[int]) -> dict:
+        """
+        Gathers the layers of a list of cells into a response.
+
+        :param cells: A list of cell indices.
+        :return: A dictionary in the format of the response of the online
+            data source, with layers sorted from the top down.
+        """
+        layers = [
+            i
+            for cell in cells
+            for i in range(self._starts[cell], self._starts[cell] + self._counts[cell])
+        ]
+        attributes = self._attributes
+        features = [
+            {"attributes": {a: attributes[a][i] for a in ATTRIBUTES}} for i in layers
+        ]
+        features.sort(key=lambda f: -f["attributes"]["UnitTop"])
+        return {"fields": self.fields, "features": features}
+
+
+def _codes(values: np.ndarray) -> list:
+    """
+    Converts an array of codes to a list of integers, with missing codes
+    (e.g., ``NaN`` in columns of nullable integers) as ``None``.
+
+    :param values: An array of codes.
+    :return: A list of integers and ``None`` values.
+    """
+    return [
+        None if v is None or (isinstance(v, float) and isnan(v)) else int(v)
+        for v in values.tolist()
+    ]
@@ -3,9 +3,25 @@
 """
 
 from abc import ABC, abstractmethod
-from typing import List
-from geoenvo.geometry import Geometry
-from geoenvo.environment import Environment
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Union
+
+import daiquiri
+import shapely
+from geoenvo.catalog import EnvironmentCatalog
+from geoenvo.geometry import (
+    Geometry,
+    GeometryArray,
+    exceeds_size,
+    json_compatible,
+    split_polygon,
+)
+from geoenvo.environment import Environment, merge_environments
+
+logger = daiquiri.getLogger(__name__)
+
+# Maximum number of tiles of a polygon queried concurrently
+TILE_WORKERS = 8
 
 
 class DataSource(ABC):
@@ -13,16 +29,65 @@ class DataSource(ABC):
     Abstract base class for data sources that provide environmental information
     based on geographic queries. Implementing classes must define methods for
     resolving spatial geometries to environmental descriptions.
+
+    Resolution is stateless: ``get_environment`` and ``get_environments``
+    pass the response and geometry of each call to the conversion methods
+    (e.g., ``convert_data(data)``) rather than storing them on the instance,
+    so one configured data source can serve concurrent resolutions. The
+    ``data`` and ``geometry`` properties are only defaults for the conversion
+    methods when called without arguments.
     """
 
     def __init__(self):
         """
-        Initializes the DataSource with placeholders for geometry, data, and
-        properties.
+        Initializes the DataSource with placeholders for geometry, data,
+        properties, the catalog of environment classes, and the size of tiles
+        polygons are split into.
         """
         self._geometry = None
         self._data = None
         self._properties = None
+        self._catalog = None
+        self._split_size = None
+
+    @property
+    def catalog(self) -> EnvironmentCatalog:
+        """
+        Retrieves the catalog of environment classes of the data source. The
+        catalog holds the integer codes and precomputed properties of each
+        environment class resolved by the data source.
+
+        :return: An ``EnvironmentCatalog`` object.
+        """
+        return self._catalog
+
+    @property
+    def split_size(self) -> float:
+        """
+        Retrieves the size of the tiles large ``Polygon`` geometries are split
+        into.
+
+        When set, polygons extending beyond this size (in decimal degrees) in
+        either dimension are split into tiles of a grid of this size (see
+        ``get_environment_in_tiles``). The tiles are queried in parallel, and
+        their environments are merged without duplicates, so that large
+        polygons do not exceed the limits of the data source. Only data
+        sources checking ``exceeds_split_size`` split polygons.
+
+        :return: The tile size in decimal degrees, or ``None`` if polygons are
+            not split.
+        """
+        return self._split_size
+
+    @split_size.setter
+    def split_size(self, split_size: float):
+        """
+        Sets the size of the tiles large ``Polygon`` geometries are split into.
+
+        :param split_size: The tile size in decimal degrees. Use ``None`` to
+            disable splitting.
+        """
+        self._split_size = split_size
 
     @property
     @abstractmethod
@@ -83,36 +148,93 @@ class DataSource(ABC):
     def get_environment(self, geometry: Geometry) -> List[Environment]:
         """
         Resolves a given geometry to environmental descriptions using the data
-        source.
+        source. Geometries in other coordinate reference systems than
+        EPSG:4326 are reprojected first (see ``Geometry.to_wgs84``).
 
         :param geometry: The geographic location to get_environment.
         :return: A list of Environment containing environmental descriptions.
         """
 
+    def get_environments(
+        self, geometries: Union[List[Geometry], GeometryArray]
+    ) -> List[List[Environment]]:
+        """
+        Resolves a list of geometries to environmental descriptions using the
+        data source. By default, each geometry is resolved individually.
+        Implementing classes may override this method to resolve geometries in
+        bulk.
+
+        :param geometries: The geographic locations to resolve, as a list of
+            ``Geometry`` objects or a ``GeometryArray``.
+        :return: A list, in the order of the input geometries, of lists of
+            Environment containing environmental descriptions.
+        """
+        return [self.get_environment(geometry) for geometry in geometries]
+
+    def exceeds_split_size(self, geometry: Geometry) -> bool:
+        """
+        Checks if a geometry is to be resolved in tiles (see ``split_size``).
+
+        :param geometry: The geographic location to resolve.
+        :return: ``True`` if ``split_size`` is set and the geometry is a
+            ``Polygon`` extending beyond it, otherwise ``False``.
+        """
+        return self.split_size is not None and exceeds_size(geometry, self.split_size)
+
+    def get_environment_in_tiles(
+        self, geometry: Geometry, size: float
+    ) -> List[Environment]:
+        """
+        Resolves a large ``Polygon`` geometry by splitting it into tiles of a
+        grid (see ``split_polygon``), which are resolved in parallel with
+        ``get_environment``. The environments of the tiles are merged without
+        duplicates.
+
+        This keeps the size of each request within the limits of the data
+        source, and the time to resolve a polygon predictable.
+
+        :param geometry: A ``Polygon`` geometry.
+        :param size: The size of the tiles in decimal degrees.
+        :return: A list of ``Environment`` objects.
+        """
+        tiles = [
+            Geometry(json_compatible(shapely.geometry.mapping(tile)))
+            for tile in split_polygon(geometry.to_shapely(), size)
+        ]
+        logger.debug(
+            f"Resolving {len(tiles)} tiles of polygon in {self.__class__.__name__}"
+        )
+        with ThreadPoolExecutor(max_workers=TILE_WORKERS) as executor:
+            results = list(executor.map(self.get_environment, tiles))
+        return merge_environments(results)
+
     @abstractmethod
-    def convert_data(self) -> List[Environment]:
+    def convert_data(self, data: dict = None) -> List[Environment]:
         """
         Converts raw data from the data source into a standardized format.
 
+        :param data: The raw response data to convert. Defaults to ``data``.
         :return: A list of Environment representing converted environmental
             data.
         """
 
     @abstractmethod
-    def unique_environment(self) -> List[dict]:
+    def unique_environment(self, data: dict = None) -> List[dict]:
         """
         Extracts unique environmental descriptions from the data source.
 
+        :param data: The raw response data. Defaults to ``data``.
         :return: A list of dictionaries containing unique environmental
             descriptions.
         """
 
     @abstractmethod
-    def has_environment(self) -> bool:
+    def has_environment(self, data: dict = None) -> bool:
         """
         Determines whether the data source contains environmental information
         for the given geometry.
 
+        :param data: The raw response data. Defaults to ``data``.
         :return: ``True`` if environmental data is available, otherwise
             ``False``.
         """
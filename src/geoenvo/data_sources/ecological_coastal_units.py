@@ -2,20 +2,65 @@
 *ecological_coastal_units.py*
 """
 
+from functools import lru_cache
 from json import dumps
-from typing import List
+from pathlib import Path
+from types import MappingProxyType
+from typing import List, Union
 
+import numpy as np
 import requests
 import daiquiri
+import shapely
+from geoenvo.catalog import EnvironmentCatalog
 from geoenvo.data_sources.data_source import DataSource
-from geoenvo.geometry import Geometry
+from geoenvo.geometry import (
+    Geometry,
+    GeometryArray,
+    buffer_points,
+    geometry_types,
+    point_coordinates,
+    reproject_geometries,
+)
+from geoenvo.segments import SegmentStore
 from geoenvo.environment import Environment
 from geoenvo.utilities import user_agent
-from geoenvo.utilities import EnvironmentDataModel, get_properties
+from geoenvo.utilities import get_properties
 
 logger = daiquiri.getLogger(__name__)
 
-
+# Atomic properties of the CSU_Descriptor, followed by the descriptor itself
+PROPERTIES = [
+    "Slope",
+    "Sinuosity",
+    "Erodibility",
+    "Temperature and Moisture Regime",
+    "River Discharge",
+    "Wave Height",
+    "Tidal Range",
+    "Marine Physical Environment",
+    "Turbidity",
+    "Chlorophyll",
+    "CSU_Descriptor",
+]
+
+# Number of parsed descriptors kept in memory
+DESCRIPTOR_CACHE_SIZE = 4096
+
+# Strategies for resolving points within the buffer distance
+STRATEGIES = ["buffer", "distance"]
+
+# Size of the grid cells (in degrees) used to cluster nearby buffered points
+# into a single query
+CLUSTER_SIZE = 0.5
+
+# Environment classes are shared by all instances of the data source
+CATALOG = EnvironmentCatalog(
+    "EcologicalCoastalUnits", "https://doi.org/10.5066/P9HWHSPU"
+)
+
+
+# pylint: disable=too-many-instance-attributes
 class EcologicalCoastalUnits(DataSource):
     """
     A concrete implementation of ``DataSource`` that retrieves coastal
@@ -31,6 +76,22 @@ class EcologicalCoastalUnits(DataSource):
           radius (in kilometers). These polygons are then resolved against the
           dataset, and all overlapping coastal units are returned in the
           response.
+        - Setting the ``batch_size`` property (along with ``buffer``) enables
+          batched resolution of ``Point`` geometries with
+          ``get_environments``. Nearby buffered points are clustered, each
+          cluster is resolved with a single query, and the returned coastal
+          units are assigned to each buffer locally.
+        - Setting the ``strategy`` property to ``"distance"`` sends ``Point``
+          geometries as is, with the ``buffer`` as a server-side search
+          distance, instead of buffering them locally.
+        - For offline resolution, set the ``store`` property to a local copy
+          of the dataset (GeoParquet, see ``SegmentStore.from_file``).
+          Geometries are then intersected with the coastal units locally, in
+          bulk, without querying the ArcGIS FeatureServer.
+        - Setting the ``split_size`` property splits large ``Polygon``
+          geometries into tiles, which are queried in parallel (see
+          ``DataSource.split_size``). Splitting does not apply to the local
+          ``store``.
 
     **Further Information**
         - **Spatial Resolution**: Global coverage with a resolution of
@@ -50,7 +111,14 @@ class EcologicalCoastalUnits(DataSource):
         `https://doi.org/10.5066/P9HWHSPU <https://doi.org/10.5066/P9HWHSPU>`_.
     """
 
-    def __init__(self, buffer: float = None):
+    def __init__(
+        self,
+        buffer: float = None,
+        batch_size: int = None,
+        store: Union[str, Path, SegmentStore] = None,
+        strategy: str = "buffer",
+        split_size: float = None,
+    ):
         """
         Initializes the EcologicalCoastalUnits data source with default
         properties.
@@ -58,20 +126,15 @@ class EcologicalCoastalUnits(DataSource):
         super().__init__()
         self._geometry = None
         self._data = None
-        self._properties = {
-            "Slope": None,
-            "Sinuosity": None,
-            "Erodibility": None,
-            "Temperature and Moisture Regime": None,
-            "River Discharge": None,
-            "Wave Height": None,
-            "Tidal Range": None,
-            "Marine Physical Environment": None,
-            "Turbidity": None,
-            "Chlorophyll": None,
-            "CSU_Descriptor": None,
-        }
+        self._properties = dict.fromkeys(PROPERTIES)
         self._buffer = buffer
+        self._catalog = CATALOG
+        self._batch_size = batch_size
+        self._store = None
+        self.store = store
+        self._strategy = None
+        self.strategy = strategy
+        self.split_size = split_size
 
     @property
     # pylint: disable=duplicate-code
@@ -123,6 +186,96 @@ class EcologicalCoastalUnits(DataSource):
         """
         self._buffer = buffer
 
+    @property
+    def batch_size(self) -> int:
+        """
+        Retrieves the batch size used for batched resolution of buffered
+        points.
+
+        When set (along with ``buffer``), ``get_environments`` clusters nearby
+        buffered ``Point`` geometries and sends up to ``batch_size`` of them
+        in one query for the extent of the cluster. The returned coastal units
+        are then assigned to the buffers they intersect.
+
+        :return: The maximum number of points per query, or ``None`` if
+            batching is disabled.
+        """
+        return self._batch_size
+
+    @batch_size.setter
+    def batch_size(self, batch_size: int):
+        """
+        Sets the batch size used for batched resolution of buffered points.
+
+        :param batch_size: The maximum number of points per query. Use
+            ``None`` to disable batching.
+        """
+        self._batch_size = batch_size
+
+    @property
+    def strategy(self) -> str:
+        """
+        Retrieves the strategy used to resolve ``Point`` geometries within the
+        ``buffer`` distance.
+
+        - ``"buffer"``: The point is buffered locally, and the envelope of the
+          buffer is sent as a polygon query.
+        - ``"distance"``: The point is sent as a single coordinate pair, along
+          with the ``buffer`` as the ``distance`` query parameter, so the
+          FeatureServer finds the coastal units within that distance of the
+          point. No buffering is done locally. Note, the search area is a
+          circle rather than the envelope of one, so a few units near the
+          corners of the envelope may not be returned.
+
+        The strategy applies to single point queries. Batched and offline
+        resolution always use local buffers.
+
+        :return: The strategy as a string.
+        """
+        return self._strategy
+
+    @strategy.setter
+    def strategy(self, strategy: str):
+        """
+        Sets the strategy used to resolve ``Point`` geometries within the
+        ``buffer`` distance.
+
+        :param strategy: Either ``"buffer"`` or ``"distance"``.
+        """
+        if strategy not in STRATEGIES:
+            raise ValueError(
+                f"Invalid strategy '{strategy}'. Expected one of {STRATEGIES}."
+            )
+        self._strategy = strategy
+
+    @property
+    def store(self) -> SegmentStore:
+        """
+        Retrieves the local segment store used for offline resolution.
+
+        When set, geometries are resolved by intersecting them with the
+        coastal units of the local store, instead of querying the ArcGIS
+        FeatureServer. The output is the same as that of the online data
+        source.
+
+        :return: The ``SegmentStore`` object, or ``None`` if resolution is
+            online.
+        """
+        return self._store
+
+    @store.setter
+    def store(self, store: Union[str, Path, SegmentStore]):
+        """
+        Sets the local segment store used for offline resolution.
+
+        :param store: A ``SegmentStore`` object, or the path to a GeoParquet
+            file (see ``SegmentStore.from_file``). Use ``None`` to resolve
+            online.
+        """
+        if store is not None and not isinstance(store, SegmentStore):
+            store = SegmentStore.from_file(store)
+        self._store = store
+
     # pylint: disable=duplicate-code
     def get_environment(self, geometry: Geometry) -> List[Environment]:
         """
@@ -137,24 +290,187 @@ class EcologicalCoastalUnits(DataSource):
             f"Starting environment resolution for geometry in "
             f"{self.__class__.__name__}"
         )
+        geometry = geometry.to_wgs84()
+
+        if self.store is None and self.exceeds_split_size(geometry):
+            return self.get_environment_in_tiles(geometry, self.split_size)
 
         # Enable buffer-based sampling for points. Without this, the data
         # source would return None because environments are represented as
         # line vectors, meaning point locations would not overlap with any
         # features.
-        if geometry.geometry_type() == "Point" and self.buffer is not None:
+        if (
+            geometry.geometry_type() == "Point"
+            and self.buffer is not None
+            and self.strategy == "distance"
+            and self.store is None
+        ):
+            data = self._request_within_distance(geometry)
+        else:
+            if geometry.geometry_type() == "Point" and self.buffer is not None:
+                logger.debug(
+                    f"Applying buffer of {self.buffer} kilometers to point " f"geometry"
+                )
+                geometry = Geometry(geometry.point_to_polygon(buffer=self.buffer))
+            data = self._request(geometry)
+        environments = self.convert_data(data)
+        logger.info(
+            f"Resolved {len(environments)} environments for geometry in "
+            f"{self.__class__.__name__}"
+        )
+        return environments
+
+    def get_environments(
+        self, geometries: Union[List[Geometry], GeometryArray]
+    ) -> List[List[Environment]]:
+        """
+        Resolves a list of geometries to environmental descriptions using the
+        Ecological Coastal Units dataset. When the ``batch_size`` and
+        ``buffer`` properties are set, buffered ``Point`` geometries are
+        resolved in clusters, with one query per cluster. When the ``store``
+        property is set, all geometries are resolved offline in one bulk
+        query. In both cases, the points of a ``GeometryArray`` are read from
+        its coordinate arrays directly.
+
+        :param geometries: The geographic locations to resolve.
+        :return: A list, in the order of the input geometries, of lists of
+            ``Environment`` objects.
+        """
+        geometries = reproject_geometries(geometries)
+        if self.store is not None:
+            return self._read_segments(geometries)
+        if self.batch_size is None or self.buffer is None:
+            return super().get_environments(geometries)
+
+        results = [None] * len(geometries)
+        types = geometry_types(geometries)
+        for i in np.flatnonzero(types != "Point").tolist():
+            results[i] = self.get_environment(geometries[i])
+        points = np.flatnonzero(types == "Point")
+        if len(points) == 0:
+            return results
+
+        x, y = point_coordinates(geometries, points)
+        envelopes = buffer_points(x, y, self.buffer * 1000)
+        for cluster in cluster_points(x, y, self.batch_size):
             logger.debug(
-                f"Applying buffer of {self.buffer} kilometers to point " f"geometry"
+                f"Resolving cluster of {len(cluster)} points in "
+                f"{self.__class__.__name__}"
             )
-            geometry.data = geometry.point_to_polygon(buffer=self.buffer)
+            responses = self._request_envelopes(envelopes[cluster])
+            for i, data in zip(cluster.tolist(), responses):
+                results[points[i]] = self.convert_data(data)
+        return results
+
+    def _read_segments(
+        self, geometries: Union[List[Geometry], GeometryArray]
+    ) -> List[List[Environment]]:
+        """
+        Resolves a list of geometries against the local segment store, with
+        all points buffered at once.
 
-        self.data = self._request(geometry)
-        environments = self.convert_data()
+        :param geometries: The geographic locations to resolve.
+        :return: A list, in the order of the input geometries, of lists of
+            ``Environment`` objects.
+        """
+        types = geometry_types(geometries)
+        shapes = np.empty(len(geometries), dtype=object)
+        for i in np.flatnonzero(types != "Point").tolist():
+            shapes[i] = geometries[i].to_shapely()
+        points = np.flatnonzero(types == "Point")
+        x, y = point_coordinates(geometries, points)
+        if self.buffer is not None:
+            bounds = buffer_points(x, y, self.buffer * 1000)
+            shapes[points] = shapely.box(*bounds.T)
+        else:
+            shapes[points] = shapely.points(x, y)
+        results = [self.convert_data(data) for data in self.store.query(shapes)]
         logger.info(
-            f"Resolved {len(environments)} environments for geometry in "
+            f"Resolved environments for {len(geometries)} geometries in "
             f"{self.__class__.__name__}"
         )
-        return environments
+        return results
+
+    def _request_envelopes(self, envelopes: np.ndarray) -> List[dict]:
+        """
+        Sends one query for the extent of a list of envelopes, and assigns the
+        returned coastal units to each envelope locally.
+
+        :param envelopes: An array of shape ``(n, 4)`` of
+            ``(minx, miny, maxx, maxy)`` envelopes.
+        :return: A list of dictionaries, one per envelope, in the format of the
+            response of a single query. If a query fails, the dictionaries are
+            empty.
+        """
+        extent = {
+            "xmin": float(envelopes[:, 0].min()),
+            "ymin": float(envelopes[:, 1].min()),
+            "xmax": float(envelopes[:, 2].max()),
+            "ymax": float(envelopes[:, 3].max()),
+            "spatialReference": {"wkid": 4326},
+        }
+
+        # Page through the results, as a cluster may return more features
+        # than the server's maximum record count. Results are ordered by a
+        # unique field, so that pages don't skip or repeat features.
+        features = []
+        while True:
+            response = self._query(
+                extent,
+                "esriGeometryEnvelope",
+                returnGeometry="true",
+                resultOffset=str(len(features)),
+                orderByFields="OBJECTID",
+            )
+            if "features" not in response:  # Failed request
+                if features:
+                    logger.warning(
+                        f"Discarding {len(features)} features of earlier pages "
+                        f"after a failed request in {self.__class__.__name__}"
+                    )
+                return [{} for _ in envelopes]
+            features.extend(response.get("features", []))
+            exceeded = response.get("exceededTransferLimit") or response.get(
+                "properties", {}
+            ).get("exceededTransferLimit")
+            if not exceeded or not response.get("features"):
+                break
+        logger.debug(f"Received {len(features)} features for {len(envelopes)} points")
+
+        # Assign the features to the envelopes they intersect
+        results = [{"type": "FeatureCollection", "features": []} for _ in envelopes]
+        features = [f for f in features if f.get("geometry")]
+        if features:
+            tree = shapely.STRtree(
+                [shapely.geometry.shape(f["geometry"]) for f in features]
+            )
+            boxes = shapely.box(*envelopes.T)
+            i, j = tree.query(boxes, predicate="intersects")
+            for envelope, feature in zip(i.tolist(), j.tolist()):
+                results[envelope]["features"].append(
+                    {"properties": features[feature]["properties"]}
+                )
+        return results
+
+    def _request_within_distance(self, geometry: Geometry) -> dict:
+        """
+        Sends a request for the coastal units within the ``buffer`` distance
+        of a ``Point`` geometry, using the ``distance`` and ``units`` query
+        parameters.
+
+        :param geometry: A ``Point`` geometry.
+        :return: A dictionary containing raw response data from the data
+            source.
+        """
+        x, y, *_ = geometry.data["coordinates"]
+        logger.debug(f"Querying within {self.buffer} kilometers of point geometry")
+        return self._query(
+            f"{x},{y}",
+            "esriGeometryPoint",
+            inSR="4326",
+            distance=str(self.buffer),
+            units="esriSRUnit_Kilometer",
+        )
 
     def _request(self, geometry: Geometry) -> dict:
         """
@@ -165,6 +481,22 @@ class EcologicalCoastalUnits(DataSource):
         :return: A dictionary containing raw response data from the data
             source.
         """
+        if self.store is not None:
+            return self.store.query([geometry.to_shapely()])[0]
+        esri = geometry.to_esri()
+        return self._query(esri["geometry"], esri["geometryType"])
+
+    def _query(self, geometry: Union[dict, str], geometry_type: str, **kwargs) -> dict:
+        """
+        Sends a query to the Ecological Coastal Units data source.
+
+        :param geometry: An Esri-formatted geometry, or the ``x,y`` coordinate
+            pair of a point.
+        :param geometry_type: The Esri geometry type.
+        :param kwargs: Additional query parameters, overriding the defaults.
+        :return: A dictionary containing raw response data from the data
+            source.
+        """
         base = (
             "https://services.arcgis.com/P3ePLMYs2RVChkJx/ArcGIS/rest/"
             "services/Ecological_Coastal_Units__ECU__1km_Segments/"
@@ -172,8 +504,8 @@ class EcologicalCoastalUnits(DataSource):
         )
         payload = {
             "f": "geojson",
-            "geometry": dumps(geometry.to_esri()["geometry"]),
-            "geometryType": geometry.to_esri()["geometryType"],
+            "geometry": geometry if isinstance(geometry, str) else dumps(geometry),
+            "geometryType": geometry_type,
             "where": "1=1",
             "spatialRel": "esriSpatialRelIntersects",
             "outFields": "*",
@@ -185,6 +517,7 @@ class EcologicalCoastalUnits(DataSource):
             "returnExtentOnly": "false",
             "returnGeometry": "false",
         }
+        payload.update(kwargs)
 
         logger.debug(f"Sending request to {self.__class__.__name__}")
 
@@ -208,38 +541,41 @@ class EcologicalCoastalUnits(DataSource):
             return {}
 
     # pylint: disable=duplicate-code
-    def convert_data(self) -> List[Environment]:
+    def convert_data(self, data: dict = None) -> List[Environment]:
         logger.debug(f"Starting data conversion in {self.__class__.__name__}")
         result = []
-        unique_ecu_environments = self.unique_environment()
+        unique_ecu_environments = self.unique_environment(data)
         for unique_ecu_environment in unique_ecu_environments:
-            environment = EnvironmentDataModel()
-            environment.set_identifier("https://doi.org/10.5066/P9HWHSPU")
-            environment.set_data_source(self.__class__.__name__)
-            environment.set_date_created()
-            properties = self.set_properties(
-                unique_environment_properties=unique_ecu_environment
-            )
-            environment.set_properties(properties)
-            result.append(Environment(data=environment.data))
-            logger.debug(f"Converted environment: {properties}")
+            # Parse each environment class once, then reuse it from the catalog
+            code = self.catalog.code(unique_ecu_environment)
+            if code is None:
+                properties = self.set_properties(
+                    unique_environment_properties=unique_ecu_environment
+                )
+                code = self.catalog.register(unique_ecu_environment, properties)
+                logger.debug(f"Converted environment: {properties}")
+            result.append(self.catalog.environment(code))
         logger.debug(
             f"Successfully converted {len(result)} environments in "
             f"{self.__class__.__name__}"
         )
         return result
 
-    def unique_environment(self) -> List[dict]:
-        if not self.has_environment():
+    def unique_environment(self, data: dict = None) -> List[dict]:
+        if data is None:
+            data = self.data
+        if not self.has_environment(data):
             return []
         prop = "CSU_Descriptor"
-        descriptors = get_properties(self._data, [prop])[prop]
+        descriptors = get_properties(data, [prop])[prop]
         descriptors = set(descriptors)
         descriptors = list(descriptors)
         return descriptors
 
-    def has_environment(self) -> bool:
-        res = len(self._data.get("features", []))
+    def has_environment(self, data: dict = None) -> bool:
+        if data is None:
+            data = self.data
+        res = len(data.get("features", []))
         if res == 0:
             return False
         return True
@@ -247,7 +583,8 @@ class EcologicalCoastalUnits(DataSource):
     def set_properties(self, unique_environment_properties) -> dict:
         """
         Sets the properties for the data source based on unique environmental
-        descriptions.
+        descriptions. Descriptors are parsed once per process (see
+        ``parse_descriptor``).
 
         :param unique_environment_properties: A dictionary containing
             environmental classification attributes.
@@ -255,46 +592,75 @@ class EcologicalCoastalUnits(DataSource):
         """
         if len(unique_environment_properties) == 0:
             return None
+        return dict(parse_descriptor(unique_environment_properties))
 
-        # There is only one property returned by this data source
-        # (CSU_Descriptor), which is composed of 10 atomic properties. Split
-        # the CSU_Descriptor into atomic properties and then zip the
-        # descriptors and atomic property labels to create a dictionary of
-        # environment properties.
-        descriptors = unique_environment_properties
-        descriptors = descriptors.split(",")
-        descriptors = [g.strip() for g in descriptors]
-        atomic_property_labels = self._properties.keys()
-        environments = [dict(zip(atomic_property_labels, descriptors))]
-
-        # Iterate over atomic properties and set labels
-        environment = environments[0]
-        properties = self._properties
-        for item in environment.keys():
-            label = environment.get(item)
-            properties[item] = label
-
-        # Compose a readable CSU_Descriptor class by joining atomic properties
-        # into a single string.
-        csu_descriptor = list(properties.values())
-        csu_descriptor = csu_descriptor[:-1]  # last one is the CSU_Description
-        csu_descriptor = ", ".join(csu_descriptor)
-        properties["CSU_Descriptor"] = csu_descriptor
-
-        # Convert property labels into a more readable format
-        new_properties = {
-            "slope": properties["Slope"],
-            "sinuosity": properties["Sinuosity"],
-            "erodibility": properties["Erodibility"],
-            "temperatureAndMoistureRegime": properties[
-                "Temperature and Moisture Regime"
-            ],
-            "riverDischarge": properties["River Discharge"],
-            "waveHeight": properties["Wave Height"],
-            "tidalRange": properties["Tidal Range"],
-            "marinePhysicalEnvironment": properties["Marine Physical Environment"],
-            "turbidity": properties["Turbidity"],
-            "chlorophyll": properties["Chlorophyll"],
-            "ecosystem": properties["CSU_Descriptor"],
-        }
-        return new_properties
+
+@lru_cache(maxsize=DESCRIPTOR_CACHE_SIZE)
+def parse_descriptor(descriptor: str) -> MappingProxyType:
+    """
+    Parses a CSU_Descriptor into readable environment properties. The set of
+    distinct descriptors is small, so results are memoized for the process
+    and repeated descriptors are parsed with a single lookup.
+
+    :param descriptor: A CSU_Descriptor, composed of comma separated atomic
+        properties.
+    :return: A read-only dictionary of environment properties.
+    """
+    # There is only one property returned by this data source
+    # (CSU_Descriptor), which is composed of 10 atomic properties. Split
+    # the CSU_Descriptor into atomic properties and then zip the
+    # descriptors and atomic property labels to create a dictionary of
+    # environment properties.
+    descriptors = [g.strip() for g in descriptor.split(",")]
+    environments = [dict(zip(PROPERTIES, descriptors))]
+
+    # Iterate over atomic properties and set labels
+    environment = environments[0]
+    properties = dict.fromkeys(PROPERTIES)
+    for item in environment.keys():
+        label = environment.get(item)
+        properties[item] = label
+
+    # Compose a readable CSU_Descriptor class by joining atomic properties
+    # into a single string.
+    csu_descriptor = list(properties.values())
+    csu_descriptor = csu_descriptor[:-1]  # last one is the CSU_Description
+    csu_descriptor = ", ".join(csu_descriptor)
+    properties["CSU_Descriptor"] = csu_descriptor
+
+    # Convert property labels into a more readable format
+    new_properties = {
+        "slope": properties["Slope"],
+        "sinuosity": properties["Sinuosity"],
+        "erodibility": properties["Erodibility"],
+        "temperatureAndMoistureRegime": properties["Temperature and Moisture Regime"],
+        "riverDischarge": properties["River Discharge"],
+        "waveHeight": properties["Wave Height"],
+        "tidalRange": properties["Tidal Range"],
+        "marinePhysicalEnvironment": properties["Marine Physical Environment"],
+        "turbidity": properties["Turbidity"],
+        "chlorophyll": properties["Chlorophyll"],
+        "ecosystem": properties["CSU_Descriptor"],
+    }
+    return MappingProxyType(new_properties)
+
+
+def cluster_points(x: np.ndarray, y: np.ndarray, size: int) -> List[np.ndarray]:
+    """
+    Clusters nearby points by the grid cell (of ``CLUSTER_SIZE`` degrees)
+    containing them, splitting cells with many points into clusters of at
+    most ``size`` points.
+
+    :param x: An array of x coordinates (longitude).
+    :param y: An array of y coordinates (latitude).
+    :param size: The maximum number of points per cluster.
+    :return: A list of integer arrays indexing the points of each cluster.
+    """
+    cells = np.floor(np.column_stack([x, y]) / CLUSTER_SIZE).astype(np.int64)
+    _, inverse = np.unique(cells, axis=0, return_inverse=True)
+    order = np.argsort(inverse.ravel(), kind="stable")
+    _, starts = np.unique(inverse.ravel()[order], return_index=True)
+    clusters = []
+    for cell in np.split(order, starts[1:]):
+        clusters.extend(np.split(cell, range(size, len(cell), size)))
+    return clusters
@@ -2,21 +2,62 @@
 *ecological_marine_units.py*
 """
 
+from functools import lru_cache
+from importlib.resources import files
 from json import dumps, loads
-from typing import List
+from pathlib import Path
+from threading import Lock
+from types import MappingProxyType
+from typing import List, Tuple, Union
 
-import pandas as pd
+import numpy as np
 import requests
 import daiquiri
+from geoenvo.catalog import EnvironmentCatalog
+from geoenvo.columns import ColumnStore
 from geoenvo.data_sources.data_source import DataSource
-from geoenvo.geometry import Geometry
+from geoenvo.geometry import (
+    Geometry,
+    GeometryArray,
+    geometry_types,
+    match_within_distance,
+    reproject_geometries,
+)
 from geoenvo.environment import Environment
-from geoenvo.utilities import user_agent
-from geoenvo.utilities import EnvironmentDataModel
+from geoenvo.utilities import user_agent, LRUCache
 
 logger = daiquiri.getLogger(__name__)
 
+# Search distance around input geometries, in nautical miles
+SEARCH_DISTANCE = 10
 
+# Number of vertical columns (i.e., raw responses per horizontal location)
+# kept in the cache of each instance
+COLUMN_CACHE_SIZE = 1024
+
+# Ocean name and atomic properties of Name_2018, followed by the descriptor
+PROPERTIES = [
+    "OceanName",
+    "Depth",
+    "Temperature",
+    "Salinity",
+    "Dissolved Oxygen",
+    "Nitrate",
+    "Phosphate",
+    "Silicate",
+    "EMU_Descriptor",
+]
+
+# Number of parsed descriptors kept in memory
+DESCRIPTOR_CACHE_SIZE = 4096
+
+# Environment classes are shared by all instances of the data source
+CATALOG = EnvironmentCatalog(
+    "EcologicalMarineUnits", "https://doi.org/10.5066/P9Q6ZSGN"
+)
+
+
+# pylint: disable=too-many-instance-attributes
 class EcologicalMarineUnits(DataSource):
     """
     A concrete implementation of ``DataSource`` that retrieves marine
@@ -33,6 +74,18 @@ class EcologicalMarineUnits(DataSource):
           stacked environments will be returned. If a ``z`` value is included,
           only the intersecting environment layers at that depth will be
           returned.
+        - Setting the ``batch_size`` property enables batched resolution of
+          ``Point`` geometries with ``get_environments``. Points are sent in
+          groups as a single multipoint query, and the returned units are
+          assigned to each point locally.
+        - For offline resolution, set the ``store`` property to a local copy
+          of the dataset (GeoParquet, see ``ColumnStore.from_file``). Layers
+          are then looked up locally, without querying the ArcGIS
+          FeatureServer, and points are resolved in vectorized batches.
+        - Setting the ``split_size`` property splits large ``Polygon``
+          geometries into tiles, which are queried in parallel (see
+          ``DataSource.split_size``). Splitting does not apply to the local
+          ``store``.
 
     **Further Information**
         - **Spatial Resolution**: Global coverage with a resolution of
@@ -51,7 +104,12 @@ class EcologicalMarineUnits(DataSource):
         Survey data release, `https://doi.org/10.5066/P9Q6ZSGN <https://doi.org/10.5066/P9Q6ZSGN>`_.
     """
 
-    def __init__(self):
+    def __init__(
+        self,
+        batch_size: int = None,
+        store: Union[str, Path, ColumnStore] = None,
+        split_size: float = None,
+    ):
         """
         Initializes the EcologicalMarineUnits data source with default
         properties.
@@ -59,17 +117,13 @@ class EcologicalMarineUnits(DataSource):
         super().__init__()
         self._geometry = None
         self._data = None
-        self._properties = {
-            "OceanName": None,
-            "Depth": None,
-            "Temperature": None,
-            "Salinity": None,
-            "Dissolved Oxygen": None,
-            "Nitrate": None,
-            "Phosphate": None,
-            "Silicate": None,
-            "EMU_Descriptor": None,
-        }
+        self._properties = dict.fromkeys(PROPERTIES)
+        self._catalog = CATALOG
+        self._batch_size = batch_size
+        self._columns = LRUCache(COLUMN_CACHE_SIZE)
+        self._store = None
+        self.store = store
+        self.split_size = split_size
 
     @property
     def geometry(self) -> dict:
@@ -95,6 +149,59 @@ class EcologicalMarineUnits(DataSource):
     def properties(self, properties: dict):
         self._properties = properties
 
+    @property
+    def batch_size(self) -> int:
+        """
+        Retrieves the batch size used for batched resolution of points.
+
+        When set, ``get_environments`` sends up to ``batch_size`` ``Point``
+        geometries in one multipoint query, rather than one query per point.
+        Each returned unit is then assigned to the input points within the
+        search distance of it, and filtered by the ``z`` value of each point.
+
+        :return: The maximum number of points per query, or ``None`` if
+            batching is disabled.
+        """
+        return self._batch_size
+
+    @batch_size.setter
+    def batch_size(self, batch_size: int):
+        """
+        Sets the batch size used for batched resolution of points.
+
+        :param batch_size: The maximum number of points per query. Use
+            ``None`` to disable batching.
+        """
+        self._batch_size = batch_size
+
+    @property
+    def store(self) -> ColumnStore:
+        """
+        Retrieves the local column store used for offline resolution.
+
+        When set, geometries are resolved by looking up the layers of the
+        cells within the search distance of them in the local store, instead
+        of querying the ArcGIS FeatureServer. The output is the same as that of
+        the online data source.
+
+        :return: The ``ColumnStore`` object, or ``None`` if resolution is
+            online.
+        """
+        return self._store
+
+    @store.setter
+    def store(self, store: Union[str, Path, ColumnStore]):
+        """
+        Sets the local column store used for offline resolution.
+
+        :param store: A ``ColumnStore`` object, or the path to a GeoParquet
+            or ``.npz`` file (see ``ColumnStore.from_file``). Use ``None`` to
+            resolve online.
+        """
+        if store is not None and not isinstance(store, ColumnStore):
+            store = ColumnStore.from_file(store)
+        self._store = store
+
     # pylint: disable=duplicate-code
     def get_environment(self, geometry: Geometry) -> List[Environment]:
         """
@@ -109,10 +216,14 @@ class EcologicalMarineUnits(DataSource):
             f"Starting environment resolution for geometry in "
             f"{self.__class__.__name__}"
         )
+        geometry = geometry.to_wgs84()
 
-        self.geometry = geometry.data  # access z values to filter on depth
-        self.data = self._request(geometry)
-        environments = self.convert_data()
+        if self.store is None and self.exceeds_split_size(geometry):
+            return self.get_environment_in_tiles(geometry, self.split_size)
+
+        data = self._request(geometry)
+        # Pass the geometry to access z values to filter on depth
+        environments = self.convert_data(data, geometry.data)
 
         logger.info(
             f"Resolved {len(environments)} environments for geometry in "
@@ -120,15 +231,186 @@ class EcologicalMarineUnits(DataSource):
         )
         return environments
 
+    def get_environments(
+        self, geometries: Union[List[Geometry], GeometryArray]
+    ) -> List[List[Environment]]:
+        """
+        Resolves a list of geometries to environmental descriptions using the
+        Ecological Marine Units dataset. When the ``batch_size`` property is
+        set, ``Point`` geometries are resolved in batches of multipoint
+        queries. When the ``store`` property is set, they are resolved
+        offline in batches of ``batch_size`` (or all at once).
+
+        :param geometries: The geographic locations to resolve.
+        :return: A list, in the order of the input geometries, of lists of
+            ``Environment`` objects.
+        """
+        geometries = reproject_geometries(geometries)
+        if self.batch_size is None and self.store is None:
+            return super().get_environments(geometries)
+
+        results = [None] * len(geometries)
+        types = geometry_types(geometries)
+        for i in np.flatnonzero(types != "Point").tolist():
+            results[i] = self.get_environment(geometries[i])
+        points = np.flatnonzero(types == "Point").tolist()
+
+        batch_size = self.batch_size or max(len(points), 1)
+        for start in range(0, len(points), batch_size):
+            batch = points[start : start + batch_size]
+            logger.debug(
+                f"Resolving batch of {len(batch)} points in "
+                f"{self.__class__.__name__}"
+            )
+            responses = self._request_columns([geometries[i] for i in batch])
+            for i, data in zip(batch, responses):
+                results[i] = self.convert_data(data, geometries[i].data)
+        return results
+
+    def _request_columns(self, geometries: List[Geometry]) -> List[dict]:
+        """
+        Retrieves the vertical columns of a list of ``Point`` geometries from
+        the cache, and requests the missing ones in one multipoint query.
+
+        :param geometries: A list of ``Point`` geometries.
+        :return: A list of dictionaries, one per point, in the format of the
+            response of a single point query.
+        """
+        if self.store is not None:
+            return self._read_columns(geometries)
+        keys = [column_key(g.data) for g in geometries]
+        columns = [self._columns.get(key) for key in keys]
+        missing = [i for i, column in enumerate(columns) if column is None]
+        if missing:
+            responses = self._request_points([geometries[i] for i in missing])
+            for i, data in zip(missing, responses):
+                if "features" in data:  # Don't cache failed requests
+                    self._columns.put(keys[i], data)
+                columns[i] = data
+        logger.debug(
+            f"Found {len(keys) - len(missing)} of {len(keys)} columns in the "
+            f"cache of {self.__class__.__name__}"
+        )
+        return [copy_column(column) for column in columns]
+
+    def _read_columns(self, geometries: List[Geometry]) -> List[dict]:
+        """
+        Reads the vertical columns of a list of geometries from the local
+        column store.
+
+        :param geometries: A list of ``Point`` or ``Polygon`` geometries.
+        :return: A list of dictionaries, one per geometry, in the format of the
+            response of a single query.
+        """
+        distance = SEARCH_DISTANCE * 1852
+        results = [None] * len(geometries)
+        points = [i for i, g in enumerate(geometries) if g.geometry_type() == "Point"]
+        if points:
+            x = [geometries[i].data["coordinates"][0] for i in points]
+            y = [geometries[i].data["coordinates"][1] for i in points]
+            for i, data in zip(points, self.store.query_points(x, y, distance)):
+                results[i] = data
+        for i, geometry in enumerate(geometries):
+            if results[i] is None:
+                results[i] = self.store.query_polygon(geometry.data, distance)
+        return results
+
+    # pylint: disable=too-many-locals
+    def _request_points(self, geometries: List[Geometry]) -> List[dict]:
+        """
+        Sends a multipoint query for a list of ``Point`` geometries, and
+        assigns the returned features to each point locally.
+
+        :param geometries: A list of ``Point`` geometries.
+        :return: A list of dictionaries, one per point, in the format of the
+            response of a single point query. If the query fails, the
+            dictionaries are empty.
+        """
+        x = np.array([g.data["coordinates"][0] for g in geometries], dtype=float)
+        y = np.array([g.data["coordinates"][1] for g in geometries], dtype=float)
+        multipoint = {
+            "points": np.column_stack([x, y]).tolist(),
+            "spatialReference": {"wkid": 4326},
+        }
+
+        # Page through the results, as a batch may return more features than
+        # the server's maximum record count.
+        fields, features = [], []
+        while True:
+            response = self._query(
+                multipoint,
+                "esriGeometryMultipoint",
+                returnGeometry="true",
+                resultOffset=str(len(features)),
+            )
+            if "features" not in response:  # Failed request
+                if features:
+                    logger.warning(
+                        f"Discarding {len(features)} features of earlier pages "
+                        f"after a failed request in {self.__class__.__name__}"
+                    )
+                return [{} for _ in geometries]
+            fields = response.get("fields", fields)
+            features.extend(response.get("features", []))
+            if not response.get("exceededTransferLimit") or not response.get(
+                "features"
+            ):
+                break
+        logger.debug(f"Received {len(features)} features for {len(x)} points")
+
+        # Assign features to the points within the search distance of them
+        feature_x = [f["geometry"]["x"] for f in features]
+        feature_y = [f["geometry"]["y"] for f in features]
+        i, j = match_within_distance(x, y, feature_x, feature_y, SEARCH_DISTANCE * 1852)
+        results = [{"fields": fields, "features": []} for _ in geometries]
+        for point, feature in zip(i.tolist(), j.tolist()):
+            # Copy attributes, as they are converted in place downstream
+            results[point]["features"].append(
+                {"attributes": dict(features[feature]["attributes"])}
+            )
+        for result in results:
+            result["features"].sort(key=lambda f: -f["attributes"]["UnitTop"])
+        return results
+
     def _request(self, geometry: Geometry) -> dict:
         """
         Sends a request to the Ecological Marine Units data source and
         retrieves raw response data.
 
+        The response for a location doesn't depend on its ``z`` values, which
+        are only used to filter the response locally. The full vertical column
+        is therefore cached per horizontal location, and geometries differing
+        only in depth are answered from the cache.
+
         :param geometry: The geographic location to query.
         :return: A dictionary containing raw response data from the data
             source.
         """
+        if self.store is not None:
+            return self._read_columns([geometry])[0]
+        key = column_key(geometry.data)
+        data = self._columns.get(key)
+        if data is None:
+            esri = geometry.to_esri()
+            esri["geometry"].pop("z", None)
+            data = self._query(esri["geometry"], esri["geometryType"])
+            if "features" not in data:  # Don't cache failed requests
+                return data
+            self._columns.put(key, data)
+        else:
+            logger.debug(f"Found column in the cache of {self.__class__.__name__}")
+        return copy_column(data)
+
+    def _query(self, geometry: dict, geometry_type: str, **kwargs) -> dict:
+        """
+        Sends a query to the Ecological Marine Units data source.
+
+        :param geometry: An Esri-formatted geometry.
+        :param geometry_type: The Esri geometry type.
+        :param kwargs: Additional query parameters, overriding the defaults.
+        :return: A dictionary containing raw response data from the data
+            source.
+        """
         base = (
             "https://services.arcgis.com/P3ePLMYs2RVChkJx/ArcGIS/rest/services/"
             + "EMU_2018"
@@ -138,12 +420,12 @@ class EcologicalMarineUnits(DataSource):
         )
         payload = {
             "f": "json",
-            "geometry": dumps(geometry.to_esri()["geometry"]),
-            "geometryType": geometry.to_esri()["geometryType"],
+            "geometry": dumps(geometry),
+            "geometryType": geometry_type,
             "where": "1=1",
             "spatialRel": "esriSpatialRelIntersects",
             "outFields": "UnitTop,UnitBottom,OceanName,Name_2018",
-            "distance": "10",
+            "distance": str(SEARCH_DISTANCE),
             "units": "esriSRUnit_NauticalMile",
             "multipatchOption": "xyFootprint",
             "outSR": '{"wkid":4326}',
@@ -152,10 +434,13 @@ class EcologicalMarineUnits(DataSource):
             "returnM": "false",
             "returnExceededLimitFeatures": "true",
             "sqlFormat": "none",
-            "orderByFields": "UnitTop desc",
+            # Break ties of UnitTop, so that pages of results don't skip or
+            # repeat features
+            "orderByFields": "UnitTop desc,OBJECTID",
             "returnDistinctValues": "false",
             "returnExtentOnly": "false",
         }
+        payload.update(kwargs)
 
         logger.debug(f"Sending request to {self.__class__.__name__}")
 
@@ -179,36 +464,119 @@ class EcologicalMarineUnits(DataSource):
             return {}
 
     # pylint: disable=duplicate-code
-    def convert_data(self) -> List[Environment]:
+    def get_environment_profile(
+        self, geometry: Geometry, depths: List[Union[float, Tuple[float, float]]]
+    ) -> List[List[Environment]]:
+        """
+        Resolves a geometry to environmental descriptions at many depths. The
+        vertical stack of units at the location is fetched once, then the
+        units intersecting each depth are found with a sorted interval lookup
+        on ``UnitTop`` and ``UnitBottom``.
+
+        :param geometry: The geographic location to resolve. Any ``z`` value
+            of the geometry is ignored.
+        :param depths: A list of depths, each either a single ``z`` value or a
+            ``(zmin, zmax)`` interval. Depths are expressed like the ``z``
+            values of geometries (i.e., negative values below sea level).
+        :return: A list, in the order of the input depths, of lists of
+            ``Environment`` objects.
+        """
+        logger.debug(
+            f"Starting profile resolution for {len(depths)} depths in "
+            f"{self.__class__.__name__}"
+        )
+        geometry = geometry.to_wgs84()
+        data = self._request(geometry)
+        if not self.has_environment(data):
+            return [[] for _ in depths]
+        features = self.convert_codes_to_values(data)["features"]
+        tops = [f["attributes"]["UnitTop"] for f in features]
+        bottoms = [f["attributes"]["UnitBottom"] for f in features]
+
+        results = []
+        for layers in select_layers(tops, bottoms, depths):
+            descriptors = {
+                dumps(
+                    {
+                        "attributes": {
+                            "OceanName": features[i]["attributes"]["OceanName"],
+                            "Name_2018": features[i]["attributes"]["Name_2018"],
+                        }
+                    }
+                )
+                for i in layers.tolist()
+            }
+            results.append(self._to_environments(list(descriptors)))
+        logger.info(
+            f"Resolved environments at {len(depths)} depths in "
+            f"{self.__class__.__name__}"
+        )
+        return results
+
+    def convert_data(
+        self, data: dict = None, geometry: dict = None
+    ) -> List[Environment]:
+        """
+        Converts raw data from the data source into ``Environment`` objects.
+
+        :param data: The raw response data to convert. Defaults to ``data``.
+        :param geometry: The geometry to filter on depth. Defaults to
+            ``geometry``.
+        :return: A list of ``Environment`` objects.
+        """
         logger.debug(f"Starting data conversion in {self.__class__.__name__}")
-        result = []
-        unique_emu_environments = self.unique_environment()
-        for unique_emu_environment in unique_emu_environments:
-            environment = EnvironmentDataModel()
-            environment.set_identifier("https://doi.org/10.5066/P9Q6ZSGN")
-            environment.set_data_source(self.__class__.__name__)
-            environment.set_date_created()
-            properties = self.set_properties(
-                unique_environment_properties=unique_emu_environment
-            )
-            environment.set_properties(properties)
-            result.append(Environment(data=environment.data))
-            logger.debug(f"Converted environment: {properties}")
+        result = self._to_environments(self.unique_environment(data, geometry))
         logger.debug(
             f"Successfully converted {len(result)} environments in "
             f"{self.__class__.__name__}"
         )
         return result
 
-    def unique_environment(self) -> List[dict]:
-        if not self.has_environment():
+    def _to_environments(self, unique_emu_environments: List[str]) -> List[Environment]:
+        """
+        Converts unique environmental descriptions into ``Environment`` objects
+        of the catalog.
+
+        :param unique_emu_environments: A list of unique environmental
+            descriptions, as returned by ``unique_environment``.
+        :return: A list of ``Environment`` objects.
+        """
+        result = []
+        for unique_emu_environment in unique_emu_environments:
+            # Parse each environment class once, then reuse it from the catalog
+            code = self.catalog.code(unique_emu_environment)
+            if code is None:
+                properties = self.set_properties(
+                    unique_environment_properties=unique_emu_environment
+                )
+                code = self.catalog.register(unique_emu_environment, properties)
+                logger.debug(f"Converted environment: {properties}")
+            result.append(self.catalog.environment(code))
+        return result
+
+    def unique_environment(
+        self, data: dict = None, geometry: dict = None
+    ) -> List[dict]:
+        """
+        Extracts unique environmental descriptions from the data source.
+
+        :param data: The raw response data. Defaults to ``data``.
+        :param geometry: The geometry to filter on depth. Defaults to
+            ``geometry``.
+        :return: A list of unique environmental descriptions.
+        """
+        if data is None:
+            data = self.data
+        if not self.has_environment(data):
             return []
-        data = self.convert_codes_to_values()
-        descriptors = self.get_environments_for_geometry_z_values(data=data)
+        data = self.convert_codes_to_values(data)
+        descriptors = self.get_environments_for_geometry_z_values(data, geometry)
         return descriptors
 
-    def has_environment(self) -> bool:
-        res = len(self.data.get("features", []))
+    def has_environment(self, data: dict = None) -> bool:
+        if data is None:
+            data = self.data
+        res = len(data.get("features", []))
         if res == 0:
             return False
         return True
@@ -216,7 +584,8 @@ class EcologicalMarineUnits(DataSource):
     def set_properties(self, unique_environment_properties) -> dict:
         """
         Sets the properties for the data source based on unique environmental
-        descriptions.
+        descriptions. Descriptions are parsed once per process (see
+        ``parse_descriptor``).
 
         :param unique_environment_properties: A dictionary containing
             environmental classification attributes.
@@ -224,113 +593,60 @@ class EcologicalMarineUnits(DataSource):
         """
         if len(unique_environment_properties) == 0:
             return None
+        return dict(parse_descriptor(unique_environment_properties))
 
-        # There are two properties returned by this data source (OceanName and
-        # Name_2018), the latter of which is composed of 7 atomic properties.
-        # Split Name_2018 into atomic properties and then zip the descriptors
-        # and atomic property labels to create a dictionary of environment
-        # properties.
-        properties = loads(unique_environment_properties)["attributes"]
-        ocean_name = properties.get("OceanName")
-        descriptors = properties.get("Name_2018")
-        descriptors = descriptors.split(",")
-        descriptors = [g.strip() for g in descriptors]
-
-        # Add ocean name to front of descriptors list in preparation for the
-        # zipping operation below
-        descriptors = [ocean_name] + descriptors
-        properties = self.properties
-        atomic_property_labels = properties.keys()
-        environments = [dict(zip(atomic_property_labels, descriptors))]
-
-        # Iterate over atomic properties and set labels
-        environment = environments[0]
-        for item in environment.keys():
-            label = environment.get(item)
-            properties[item] = label
-
-        # Compose a readable EMU_Description classification by joining atomic
-        # properties into a single string.
-        emu_descriptor = list(properties.values())
-        emu_descriptor = emu_descriptor[:-1]  # last one is the EMU_Descriptor
-        # Handle edge case where some of the properties are None. This is an
-        # issue with the data source.
-        if None in emu_descriptor:
-            emu_descriptor = ["n/a" if f is None else f for f in emu_descriptor]
-        emu_descriptor = ", ".join(emu_descriptor)
-        properties["EMU_Descriptor"] = emu_descriptor
-
-        # Convert properties into a more readable format
-        new_properties = {
-            "oceanName": properties["OceanName"],
-            "depth": properties["Depth"],
-            "temperature": properties["Temperature"],
-            "salinity": properties["Salinity"],
-            "dissolvedOxygen": properties["Dissolved Oxygen"],
-            "nitrate": properties["Nitrate"],
-            "phosphate": properties["Phosphate"],
-            "silicate": properties["Silicate"],
-            "ecosystem": properties["EMU_Descriptor"],
-        }
-        return new_properties
-
-    def convert_codes_to_values(self) -> dict:
+    def convert_codes_to_values(self, data: dict = None) -> dict:
         """
         Converts coded classification values (e.g., ``OceanName`` and other
         properties) into descriptive string values. This transformation ensures
         consistency between response objects across different datasets.
 
+        The code-value maps are taken from the cache of coded value domains
+        (see ``coded_value_domains``), so each code is converted with a single
+        dictionary lookup.
+
+        :param data: The raw response data, converted in place. Defaults to
+            ``data``.
         :return: A dictionary with converted classification values.
         """
-        data = self.data
-        field_names = [field["name"] for field in data["fields"]]
-        i = field_names.index("OceanName")
-        ocean_name_map = pd.DataFrame(
-            data.get("fields")[i].get("domain").get("codedValues")
-        )
-
-        # Create the code-value map for Name_2018
-        i = field_names.index("Name_2018")
-        name_2018_map = pd.DataFrame(
-            data.get("fields")[i].get("domain").get("codedValues")
-        )
+        if data is None:
+            data = self.data
+        domains = coded_value_domains(data.get("fields"))
+        ocean_name_map = domains.get("OceanName", {})
+        name_2018_map = domains.get("Name_2018", {})
 
         # Iterate over the features array replacing OceanName and
         # Name_2018 codes with corresponding values in the maps
-        for i in range(len(data.get("features"))):
+        for feature in data.get("features"):
+            attributes = feature["attributes"]
             # OceanName
-            code = data.get("features")[i]["attributes"]["OceanName"]
+            code = attributes["OceanName"]
             if code is None:
-                value = "Not an ocean"
+                attributes["OceanName"] = "Not an ocean"
             else:
-                value = ocean_name_map.loc[ocean_name_map["code"] == code, "name"].iloc[
-                    0
-                ]
-            data.get("features")[i]["attributes"]["OceanName"] = value
-            # Name_2018
-            code = data.get("features")[i]["attributes"]["Name_2018"]
-
-            # Not all locations have Name_2018 values (not sure why this is
-            # the case).
-            try:
-                value = name_2018_map.loc[name_2018_map["code"] == code, "name"].iloc[0]
-            except IndexError:
-                value = "n/a"
-            data.get("features")[i]["attributes"]["Name_2018"] = value
+                attributes["OceanName"] = ocean_name_map.get(code, "n/a")
+            # Name_2018. Not all locations have Name_2018 values (not sure why
+            # this is the case).
+            attributes["Name_2018"] = name_2018_map.get(attributes["Name_2018"], "n/a")
         return data
 
-    def get_environments_for_geometry_z_values(self, data) -> List[dict]:
+    def get_environments_for_geometry_z_values(
+        self, data, geometry: dict = None
+    ) -> List[dict]:
         """
         Extracts the depth (Z) values from the geometry property in the
         response object. This method is useful for analyzing environmental
         data at different depth levels.
 
         :param data: The response data containing geometry information.
+        :param geometry: The geometry with the z values to filter on. Defaults
+            to ``geometry``.
         """
         # Get the z values from the geometry property of the response object
-        geometry = self.geometry
+        if geometry is None:
+            geometry = self.geometry
         coordinates = geometry.get("coordinates")
-        if len(coordinates) == 3:
+        if geometry.get("type") == "Point" and len(coordinates) == 3:
             zmin = geometry.get("coordinates")[2]
             zmax = geometry.get("coordinates")[2]
         else:
@@ -374,3 +690,236 @@ class EcologicalMarineUnits(DataSource):
         res = set(res)
         res = list(res)
         return res
+
+
+def column_key(geometry: dict) -> tuple:
+    """
+    Creates a depth-agnostic cache key for a GeoJSON geometry, from its
+    horizontal coordinates.
+
+    :param geometry: A GeoJSON geometry.
+    :return: A hashable tuple of the geometry type and its ``x`` and ``y``
+        coordinates, rounded to 6 decimal places (about 0.1 m).
+    """
+
+    def strip(coordinates):
+        if coordinates and isinstance(coordinates[0], (list, tuple)):
+            return tuple(strip(c) for c in coordinates)
+        return tuple(round(float(c), 6) for c in coordinates[:2])
+
+    return geometry.get("type"), strip(geometry.get("coordinates"))
+
+
+def copy_column(data: dict) -> dict:
+    """
+    Copies a cached response, so that the conversion of codes to values
+    (which is done in place) leaves the cached response untouched.
+
+    :param data: A response of the Ecological Marine Units data source.
+    :return: A copy of the response with copied feature attributes.
+    """
+    data = dict(data)
+    data["features"] = [
+        {"attributes": dict(f["attributes"])} for f in data.get("features", [])
+    ]
+    return data
+
+
+def select_layers(
+    tops: List[float], bottoms: List[float], depths: List[Union[float, tuple]]
+) -> List[np.ndarray]:
+    """
+    Finds the vertical layers intersecting each of a list of depths.
+
+    Layers are sorted by ``bottom`` once. For each depth, a binary search
+    finds the layers with a bottom at or above the deepest point of the depth,
+    and, when the layers don't overlap (as in a single vertical column), a
+    second binary search on the sorted tops finds those with a top at or below
+    the shallowest point of the depth.
+
+    :param tops: The top of each layer (e.g., ``UnitTop``).
+    :param bottoms: The bottom of each layer (e.g., ``UnitBottom``).
+    :param depths: A list of depths, each either a single ``z`` value or a
+        ``(zmin, zmax)`` interval.
+    :return: A list, in the order of the input depths, of integer arrays
+        indexing the intersecting layers. A layer intersects a depth when it
+        shares at least one point with it, including its boundaries.
+    """
+    tops = np.asarray(tops, dtype=float)
+    bottoms = np.asarray(bottoms, dtype=float)
+    order = np.lexsort((tops, bottoms))
+    sorted_tops, sorted_bottoms = tops[order], bottoms[order]
+    monotonic = bool(np.all(np.diff(sorted_tops) >= 0))
+
+    result = []
+    for depth in depths:
+        if isinstance(depth, (tuple, list)):
+            zmin, zmax = min(depth), max(depth)
+        else:
+            zmin = zmax = depth
+        hi = np.searchsorted(sorted_bottoms, zmax, side="right")
+        if monotonic:
+            lo = np.searchsorted(sorted_tops[:hi], zmin, side="left")
+            result.append(order[lo:hi])
+        else:
+            result.append(order[:hi][sorted_tops[:hi] >= zmin])
+    return result
+
+
+@lru_cache(maxsize=DESCRIPTOR_CACHE_SIZE)
+def parse_descriptor(descriptor: str) -> MappingProxyType:
+    """
+    Parses a unique environmental description (a JSON string of the
+    ``OceanName`` and ``Name_2018`` values, see ``unique_environment``) into
+    readable environment properties. The set of distinct descriptions is
+    small, so results are memoized for the process and repeated descriptions
+    are parsed with a single lookup.
+
+    :param descriptor: A unique environmental description.
+    :return: A read-only dictionary of environment properties.
+    """
+    # There are two properties returned by this data source (OceanName and
+    # Name_2018), the latter of which is composed of 7 atomic properties.
+    # Split Name_2018 into atomic properties and then zip the descriptors
+    # and atomic property labels to create a dictionary of environment
+    # properties.
+    properties = loads(descriptor)["attributes"]
+    ocean_name = properties.get("OceanName")
+    descriptors = properties.get("Name_2018")
+    atomic_descriptors = coded_value_domains().get("Name_2018_atomic", {})
+    if descriptors in atomic_descriptors:  # Split once per domain value
+        descriptors = list(atomic_descriptors[descriptors])
+    else:
+        descriptors = descriptors.split(",")
+        descriptors = [g.strip() for g in descriptors]
+
+    # Add ocean name to front of descriptors list in preparation for the
+    # zipping operation below
+    descriptors = [ocean_name] + descriptors
+    properties = dict.fromkeys(PROPERTIES)
+    environments = [dict(zip(PROPERTIES, descriptors))]
+
+    # Iterate over atomic properties and set labels
+    environment = environments[0]
+    for item in environment.keys():
+        label = environment.get(item)
+        properties[item] = label
+
+    # Compose a readable EMU_Description classification by joining atomic
+    # properties into a single string.
+    emu_descriptor = list(properties.values())
+    emu_descriptor = emu_descriptor[:-1]  # last one is the EMU_Descriptor
+    # Handle edge case where some of the properties are None. This is an
+    # issue with the data source.
+    if None in emu_descriptor:
+        emu_descriptor = ["n/a" if f is None else f for f in emu_descriptor]
+    emu_descriptor = ", ".join(emu_descriptor)
+    properties["EMU_Descriptor"] = emu_descriptor
+
+    # Convert properties into a more readable format
+    new_properties = {
+        "oceanName": properties["OceanName"],
+        "depth": properties["Depth"],
+        "temperature": properties["Temperature"],
+        "salinity": properties["Salinity"],
+        "dissolvedOxygen": properties["Dissolved Oxygen"],
+        "nitrate": properties["Nitrate"],
+        "phosphate": properties["Phosphate"],
+        "silicate": properties["Silicate"],
+        "ecosystem": properties["EMU_Descriptor"],
+    }
+    return MappingProxyType(new_properties)
+
+
+_domains = {}
+_domains_lock = Lock()
+
+
+def coded_value_domains(fields: list = None) -> dict:
+    """
+    Retrieves the coded value domains of the ``OceanName`` and ``Name_2018``
+    fields of the Ecological Marine Units dataset. The domains are static, so
+    they are cached once per process. On first use, they are captured from the
+    ``fields`` of a query response, if provided and holding the domains, or
+    otherwise read from the copy shipped with the package (see
+    ``packaged_fields``), so that no request is sent.
+
+    :param fields: The ``fields`` array of a query response (optional).
+    :return: A dictionary with the keys ``OceanName`` and ``Name_2018``, each
+        mapping integer codes to values, and ``Name_2018_atomic``, mapping each
+        ``Name_2018`` value to a tuple of its atomic properties.
+    """
+    with _domains_lock:
+        if _domains:
+            return _domains
+        for candidates in [fields or [], packaged_fields()]:
+            for field in candidates:
+                domain = field.get("domain") or {}
+                if field.get("name") in ["OceanName", "Name_2018"] and domain:
+                    coded_values = domain.get("codedValues", [])
+                    _domains[field["name"]] = {
+                        v["code"]: v["name"] for v in coded_values
+                    }
+            if _domains:
+                break
+        if "Name_2018" in _domains:
+            # Precompute the atomic properties of each Name_2018 value
+            _domains["Name_2018_atomic"] = {
+                name: tuple(g.strip() for g in name.split(","))
+                for name in _domains["Name_2018"].values()
+            }
+        logger.debug(f"Cached coded value domains: {list(_domains.keys())}")
+        return _domains
+
+
+@lru_cache(maxsize=None)
+def packaged_fields() -> list:
+    """
+    Loads the fields of the Ecological Marine Units layer, with their coded
+    value domains, from the copy shipped with the package. The file is read
+    once per process.
+
+    :return: A list of fields in the format of the ArcGIS REST API.
+    """
+    domains_file = files("geoenvo.data.data_source_attributes").joinpath(
+        "emu_coded_value_domains.json"
+    )
+    with domains_file.open("r", encoding="utf-8") as f:
+        return loads(f.read()).get("fields", [])
+
+
+def create_coded_value_domains(
+    output_directory: Path = files("geoenvo.data.data_source_attributes"),
+) -> None:
+    """
+    Writes the coded value domains of the Ecological Marine Units layer to
+    local file, from its layer metadata. The domains enable the conversion of
+    codes to values without requesting the layer metadata.
+    """
+    metadata = request_layer_metadata()
+    fields = [f for f in metadata.get("fields", []) if f.get("domain")]
+    file_path = output_directory.joinpath("emu_coded_value_domains.json")
+    with open(file_path, "w", encoding="utf-8") as file:
+        file.write(dumps({"fields": fields}, indent=4))
+
+
+def request_layer_metadata() -> dict:
+    """
+    Sends a request for the layer metadata of the Ecological Marine Units
+    dataset, which includes the coded value domains of its fields.
+
+    :return: A dictionary containing the layer metadata.
+    """
+    base = (
+        "https://services.arcgis.com/P3ePLMYs2RVChkJx/ArcGIS/rest/services/"
+        "EMU_2018/FeatureServer/0"
+    )
+    # pylint: disable=broad-exception-caught
+    try:
+        response = requests.get(
+            base, params={"f": "json"}, timeout=10, headers=user_agent()
+        )
+        return response.json()
+    except Exception as e:
+        logger.error(f"Failed to fetch layer metadata. Error: {e}", exc_info=True)
+        return {}
@@ -2,23 +2,53 @@
 *world_terrestrial_ecosystems.py*
 """
 
+# pylint: disable=too-many-lines
+
+from functools import lru_cache
+from itertools import chain
 from json import dumps, loads
 from pathlib import Path
-from typing import List
+from typing import List, Union
 from importlib.resources import files
 
 import daiquiri
-import pandas as pd
+import numpy as np
 import requests
+from geoenvo.catalog import EnvironmentCatalog
 from geoenvo.data_sources.data_source import DataSource
-from geoenvo.geometry import Geometry
+from geoenvo.geometry import (
+    Geometry,
+    GeometryArray,
+    adaptive_sample_polygon,
+    coordinates_to_points,
+    drop_repeated_cells,
+    equal_area_sample_polygon,
+    geometry_types,
+    iter_grid_sample_coordinates,
+    point_coordinates,
+    sample_line,
+    snap_to_pixels,
+    reproject_geometries,
+)
 from geoenvo.environment import Environment
+from geoenvo.raster import Raster
 from geoenvo.utilities import user_agent
-from geoenvo.utilities import EnvironmentDataModel
+from geoenvo.utilities import LRUCache
 
 logger = daiquiri.getLogger(__name__)
 
+# Native pixel size of the dataset in decimal degrees (approximately 250 m)
+PIXEL_SIZE = 0.002245799
+
+# Geotransform of the grid that tiles are exported on, anchored at the
+# upper-left corner of the dataset's global extent
+PIXEL_GRID = (-180, PIXEL_SIZE, 0, 90, 0, -PIXEL_SIZE)
+
+# Maximum number of code tiles kept in memory per data source instance
+TILE_CACHE_SIZE = 64
+
 
+# pylint: disable=too-many-instance-attributes
 class WorldTerrestrialEcosystems(DataSource):
     """
     A concrete implementation of ``DataSource`` that retrieves terrestrial
@@ -32,7 +62,20 @@ class WorldTerrestrialEcosystems(DataSource):
           representative points. Each point is resolved individually, and the
           results are aggregated into the final response. By default,
           ``Polygon`` geometries are resolved using the centroid of the
-          polygon.
+          polygon. Alternatively, the ``adaptive_depth`` property enables
+          adaptive sampling, which refines the sampling only where
+          environments change, and the ``max_points`` property bounds the
+          number of points sampled from a polygon. The ``align_to_pixels``
+          property keeps at most one sample point per pixel of the dataset.
+        - ``LineString`` geometries (e.g., tracks and transects) are sampled at
+          the native resolution of the dataset, and resolved to the
+          environments along the line with their along-track extents.
+        - By default, this data source queries the ArcGIS ImageServer. Setting
+          the ``raster`` property to a local copy of the dataset (GeoTIFF/COG
+          or ``.npy``) resolves geometries offline, with vectorized pixel
+          lookups. Alternatively, setting the ``tile_size`` property fetches
+          tiles of raw class codes from the ImageServer, and resolves all
+          points falling within a tile locally.
 
     **Further Information**
         - **Spatial Resolution**: Global coverage with a resolution of
@@ -50,7 +93,17 @@ class WorldTerrestrialEcosystems(DataSource):
         <https://doi.org/10.5066/P9DO61LP>`_.
     """
 
-    def __init__(self, grid_size: float = None):
+    # pylint: disable=too-many-arguments
+    # pylint: disable=too-many-positional-arguments
+    def __init__(
+        self,
+        grid_size: float = None,
+        raster: Union[str, Path, Raster] = None,
+        tile_size: int = None,
+        adaptive_depth: int = None,
+        max_points: int = None,
+        align_to_pixels: bool = False,
+    ):
         """
         Initializes the WorldTerrestrialEcosystems data source with default
         properties.
@@ -68,6 +121,15 @@ class WorldTerrestrialEcosystems(DataSource):
         }
 
         self._grid_size = grid_size
+        self._raster = None
+        self.raster = raster
+        self._tile_size = tile_size
+        self._tiles = LRUCache(maxsize=TILE_CACHE_SIZE)
+        self._catalog = environment_catalog()
+        self._adaptive_depth = adaptive_depth
+        self._max_points = max_points
+        self._align_to_pixels = align_to_pixels
+        self._pixel_grid = None
 
     @property
     # pylint: disable=duplicate-code
@@ -119,6 +181,168 @@ class WorldTerrestrialEcosystems(DataSource):
         """
         self._grid_size = grid_size
 
+    @property
+    def raster(self) -> Raster:
+        """
+        Retrieves the local raster used for offline resolution.
+
+        When set, geometries are resolved by reading class codes from the
+        local raster instead of querying the ArcGIS ImageServer. Lookups are
+        vectorized over all points of a geometry (or batch of geometries), and
+        only the pixels (or blocks) containing the points are read from disk.
+
+        :return: The ``Raster`` object, or ``None`` if resolution is online.
+        """
+        return self._raster
+
+    @raster.setter
+    def raster(self, raster: Union[str, Path, Raster]):
+        """
+        Sets the local raster used for offline resolution.
+
+        :param raster: A ``Raster`` object, or the path to a GeoTIFF/COG or
+            ``.npy`` file (see ``Raster.from_file``). Use ``None`` to resolve
+            online.
+        """
+        if raster is not None and not isinstance(raster, Raster):
+            raster = Raster.from_file(raster)
+        self._raster = raster
+
+    @property
+    def tile_size(self) -> int:
+        """
+        Retrieves the tile size used for tile-based resolution.
+
+        When set (and no ``raster`` is set), the points to resolve are grouped
+        by the tile of the dataset containing them. Each tile is fetched once
+        from the ImageServer as an array of raw class codes, kept in a bounded
+        cache, and all points within it are resolved locally. This replaces
+        one ``identify`` request per point with one ``exportImage`` request
+        per tile.
+
+        :return: The width (and height) of a tile in pixels, or ``None`` if
+            tile-based resolution is disabled.
+        """
+        return self._tile_size
+
+    @tile_size.setter
+    def tile_size(self, tile_size: int):
+        """
+        Sets the tile size used for tile-based resolution.
+
+        :param tile_size: The width (and height) of a tile in pixels. Use
+            ``None`` to disable tile-based resolution.
+        """
+        self._tile_size = tile_size
+        self._tiles.clear()
+
+    @property
+    def adaptive_depth(self) -> int:
+        """
+        Retrieves the maximum refinement depth of adaptive sampling.
+
+        When set, ``Polygon`` geometries are sampled adaptively, as an
+        alternative to the uniform ``grid_size`` sampling. The polygon is
+        first sampled on a coarse grid (of ``grid_size`` cells, if set), then
+        only the cells whose environment differs from a neighboring cell are
+        split into quadrants and sampled again, up to ``adaptive_depth``
+        times or until ``max_points`` samples are taken. Homogeneous areas
+        are thus resolved with few lookups.
+
+        :return: The maximum depth as an integer, or ``None`` if adaptive
+            sampling is disabled.
+        """
+        return self._adaptive_depth
+
+    @adaptive_depth.setter
+    def adaptive_depth(self, adaptive_depth: int):
+        """
+        Sets the maximum refinement depth of adaptive sampling.
+
+        :param adaptive_depth: The maximum depth as an integer. Use ``None``
+            to disable adaptive sampling.
+        """
+        self._adaptive_depth = adaptive_depth
+
+    @property
+    def max_points(self) -> int:
+        """
+        Retrieves the maximum number of points sampled from a ``Polygon``
+        geometry.
+
+        With adaptive sampling (see ``adaptive_depth``), this bounds the
+        number of samples. Otherwise, setting it enables equal-area sampling:
+        the polygon is sampled on a grid of an equal-area projection, with a
+        spacing chosen from the polygon's area to yield close to, but no more
+        than, ``max_points`` points. Unlike ``grid_size``, which is in
+        degrees, the cost of resolving a polygon is then bounded regardless of
+        its size or latitude. It takes precedence over ``grid_size``.
+
+        :return: The maximum number of points, or ``None`` if unbounded.
+        """
+        return self._max_points
+
+    @max_points.setter
+    def max_points(self, max_points: int):
+        """
+        Sets the maximum number of points sampled from a ``Polygon``
+        geometry.
+
+        :param max_points: The maximum number of points. Use ``None`` for no
+            limit.
+        """
+        self._max_points = max_points
+
+    @property
+    def align_to_pixels(self) -> bool:
+        """
+        Retrieves whether the points sampled from a ``Polygon`` geometry are
+        aligned to the pixel grid of the dataset.
+
+        When enabled, the sample points (grid points and vertices) are
+        snapped to the centers of the pixels containing them, and only one
+        point is kept per pixel. Points within the same pixel always resolve
+        to the same environment, so this removes redundant lookups, which is
+        most effective when ``grid_size`` is smaller than the native pixel
+        size (``PIXEL_SIZE``). Points are aligned to the grid they are
+        resolved on (see ``pixel_grid``), and are left as is if that grid
+        can't be determined.
+
+        :return: ``True`` if sample points are aligned to pixels.
+        """
+        return self._align_to_pixels
+
+    @align_to_pixels.setter
+    def align_to_pixels(self, align_to_pixels: bool):
+        """
+        Sets whether the points sampled from a ``Polygon`` geometry are
+        aligned to the pixel grid of the dataset.
+
+        :param align_to_pixels: ``True`` to align sample points to pixels.
+        """
+        self._align_to_pixels = align_to_pixels
+
+    @property
+    def pixel_grid(self) -> Union[tuple, None]:
+        """
+        Retrieves the geotransform of the pixel grid that points are resolved
+        on. This is the grid of the local ``raster`` if set, or the grid that
+        tiles are exported on (``PIXEL_GRID``) if ``tile_size`` is set, or
+        else the native grid of the dataset, as described by the metadata of
+        the ImageServer. The metadata is requested once per instance.
+
+        :return: A GDAL-style geotransform ``(x_origin, pixel_width, 0,
+            y_origin, 0, pixel_height)``, or ``None`` if the grid can't be
+            determined.
+        """
+        if self.raster is not None:
+            return self.raster.transform
+        if self.tile_size is not None:
+            return PIXEL_GRID
+        if self._pixel_grid is None:
+            self._pixel_grid = self._request_pixel_grid()
+        return self._pixel_grid
+
     def get_environment(self, geometry: Geometry) -> List[Environment]:
         """
         Resolves a given geometry to environmental descriptions using the
@@ -132,11 +356,131 @@ class WorldTerrestrialEcosystems(DataSource):
             f"Starting environment resolution for geometry in "
             f"{self.__class__.__name__}"
         )
+        geometry = geometry.to_wgs84()
+
+        if geometry.geometry_type() == "Polygon" and self.adaptive_depth is not None:
+            data = self._sample_adaptive(geometry)
+            environments = self.convert_data(data)
+            logger.info(
+                f"Resolved {len(environments)} environments for geometry in "
+                f"{self.__class__.__name__}"
+            )
+            return environments
+
+        if geometry.geometry_type() == "LineString":
+            environments = self._resolve_line(geometry)
+            logger.info(
+                f"Resolved {len(environments)} environments along line in "
+                f"{self.__class__.__name__}"
+            )
+            return environments
+
+        if self._streams(geometry):
+            data = self._sample_stream(geometry)
+            environments = self.convert_data(data)
+            logger.info(
+                f"Resolved {len(environments)} environments for geometry in "
+                f"{self.__class__.__name__}"
+            )
+            return environments
+
+        geometries = self._sample(geometry)
+
+        # Resolve each geometry, and in the case of multiple points, construct
+        # a single response object emulating the API response format. This is
+        # to maintain compatibility with the downstream code.
+        if self.raster is not None or self.tile_size is not None:
+            data = self._read_codes([geometries])[0]
+        else:
+            results = []
+            for item in geometries:
+                response = self._request(item)
+                if response.get("properties"):
+                    results.extend(response["properties"].get("Values", []))
+            data = {"properties": {"Values": results}}
+
+        environments = self.convert_data(data)
+        logger.info(
+            f"Resolved {len(environments)} environments for geometry in "
+            f"{self.__class__.__name__}"
+        )
+        return environments
+
+    def get_environments(
+        self, geometries: Union[List[Geometry], GeometryArray]
+    ) -> List[List[Environment]]:
+        """
+        Resolves a list of geometries to environmental descriptions using the
+        World Terrestrial Ecosystems dataset. When the ``raster`` (or
+        ``tile_size``) property is set, the points of all geometries are read
+        from the local raster (or tiles) in a single vectorized lookup. The
+        points of a ``GeometryArray`` are read from its coordinate arrays
+        directly.
+
+        :param geometries: The geographic locations to resolve.
+        :return: A list, in the order of the input geometries, of lists of
+            ``Environment`` objects.
+        """
+        geometries = reproject_geometries(geometries)
+        if (self.raster is None and self.tile_size is None) or (
+            self.adaptive_depth is not None
+        ):
+            return super().get_environments(geometries)
+
+        logger.debug(
+            f"Starting environment resolution for {len(geometries)} geometries "
+            f"in {self.__class__.__name__}"
+        )
+        types = geometry_types(geometries)
+        points = np.flatnonzero(types == "Point")
+        x, y = point_coordinates(geometries, points)
+
+        # Polygons sampled on a grid are streamed one at a time, to bound memory
+        # use, and all other geometries are read at once
+        results = [None] * len(geometries)
+        samples = {}
+        for i in np.flatnonzero(types != "Point").tolist():
+            geometry = geometries[i]
+            if geometry.geometry_type() == "LineString":
+                results[i] = self._resolve_line(geometry)
+            elif self._streams(geometry):
+                results[i] = self.convert_data(self._sample_stream(geometry))
+            else:
+                samples[i] = self._sample(geometry)
+        sample_x, sample_y, group = self._sample_coordinates(list(samples.values()))
+        data = self._read_groups(
+            np.concatenate([x, sample_x]),
+            np.concatenate([y, sample_y]),
+            np.concatenate([points, np.array(list(samples), dtype=np.int64)[group]]),
+            len(geometries),
+        )
+        for i, item in enumerate(data):
+            if results[i] is None:
+                results[i] = self.convert_data(item)
+        logger.info(
+            f"Resolved environments for {len(geometries)} geometries in "
+            f"{self.__class__.__name__}"
+        )
+        return results
 
+    def _sample(self, geometry: Geometry) -> List[Geometry]:
+        """
+        Converts a geometry into the list of geometries to be resolved.
+
+        :param geometry: The geographic location to resolve.
+        :return: A list of ``Geometry`` objects.
+        """
         # Enable grid-based sampling for polygons. Without this, the data source
         # would default to using the centroid of the polygon instead.
         geometries = []
-        if geometry.geometry_type() == "Polygon" and self.grid_size is not None:
+        if geometry.geometry_type() == "Polygon" and self.max_points is not None:
+            logger.debug(
+                f"Applying equal-area sampling with at most {self.max_points} "
+                f"points"
+            )
+            x, y = equal_area_sample_polygon(geometry.to_shapely(), self.max_points)
+            geometries = [Geometry(point) for point in coordinates_to_points(x, y)]
+        elif geometry.geometry_type() == "Polygon" and self.grid_size is not None:
             logger.debug(
                 f"Applying grid-based sampling with grid size " f"{self.grid_size}"
             )
@@ -146,23 +490,349 @@ class WorldTerrestrialEcosystems(DataSource):
         else:
             geometries.append(geometry)
 
-        # Resolve each geometry, and in the case of multiple points, construct
-        # a single response object emulating the API response format. This is
-        # to maintain compatibility with the downstream code.
-        results = []
-        for item in geometries:
-            response = self._request(item)
-            if response.get("properties"):
-                results.extend(response["properties"].get("Values", []))
-        self.data = {"properties": {"Values": results}}
-
-        environments = self.convert_data()
-        logger.info(
-            f"Resolved {len(environments)} environments for geometry in "
-            f"{self.__class__.__name__}"
+        sampled = geometry.geometry_type() == "Polygon" and all(
+            g.geometry_type() == "Point" for g in geometries
+        )
+        transform = self.pixel_grid if self.align_to_pixels and sampled else None
+        if transform is not None:
+            x, y = np.array([g.coordinates[0, :2] for g in geometries]).T
+            x, y = snap_to_pixels(x, y, transform)
+            logger.debug(f"Aligned {len(geometries)} sample points to {len(x)} pixels")
+            geometries = [Geometry(point) for point in coordinates_to_points(x, y)]
+        return geometries
+
+    def _streams(self, geometry: Geometry) -> bool:
+        """
+        Determines whether a geometry is resolved by streaming its grid
+        samples (see ``_sample_stream``), which is the case for ``Polygon``
+        geometries sampled on a uniform grid of ``grid_size``.
+
+        :param geometry: The geographic location to resolve.
+        :return: ``True`` if the geometry is streamed.
+        """
+        return (
+            geometry.geometry_type() == "Polygon"
+            and self.grid_size is not None
+            and self.max_points is None
+            and not self.align_to_pixels
+        )
+
+    def _sample_stream(self, geometry: Geometry) -> dict:
+        """
+        Samples a ``Polygon`` geometry on a grid of ``grid_size``, one strip of
+        the grid at a time, and constructs a response object emulating the
+        API response format.
+
+        Each strip is resolved as it is generated, and only the distinct
+        codes found so far are kept, so memory use is bounded regardless of
+        the size of the polygon or the density of the grid.
+
+        :param geometry: A ``Polygon`` geometry.
+        :return: A dictionary in the format of the ``identify`` operation's
+            response.
+        """
+        logger.debug(f"Streaming grid-based sampling with grid size {self.grid_size}")
+        polygon = geometry.to_shapely()
+        strips = iter_grid_sample_coordinates(polygon, self.grid_size)
+        vertices = np.array(list(dict.fromkeys(polygon.exterior.coords)))
+        codes, count = set(), 0
+        for x, y in chain(strips, [(vertices[:, 0], vertices[:, 1])]):
+            codes.update(np.unique(self._classify(x, y)).tolist())
+            count += len(x)
+        logger.debug(f"Resolved {count} streamed samples")
+        values = [str(code) for code in sorted(codes) if code in self.catalog]
+        return {"properties": {"Values": values or ["NoData"]}}
+
+    # pylint: disable=too-many-locals
+    def _resolve_line(self, geometry: Geometry) -> List[Environment]:
+        """
+        Resolves a ``LineString`` geometry (e.g., a cruise track or transect)
+        to the environments along it.
+
+        The line is sampled at the native resolution of the dataset (or at
+        ``grid_size``, if set), and only the samples falling in a different
+        pixel than the preceding sample are resolved, in one lookup. Each
+        environment lists its along-track extents under ``extents``, as the
+        ``start`` and ``end`` distances in meters from the start of the line.
+
+        :param geometry: A ``LineString`` geometry.
+        :return: A list of ``Environment`` objects, in the order in which
+            they are first found along the line.
+        """
+        x, y, distance = sample_line(
+            geometry.to_shapely(), self.grid_size or PIXEL_SIZE
         )
+        transform = self.pixel_grid
+        if transform is None:
+            kept = np.arange(len(x))
+        else:
+            kept = drop_repeated_cells(x, y, transform)
+        logger.debug(f"Resolving {len(kept)} of {len(x)} samples along line")
+        codes = self._classify(x[kept], y[kept])
+
+        # Each resolved sample holds until the next one, and consecutive
+        # samples of the same class are merged into one extent
+        starts = distance[kept]
+        ends = np.append(starts[1:], distance[-1])
+        extents = {}
+        for code, start, end in zip(codes.tolist(), starts.tolist(), ends.tolist()):
+            runs = extents.setdefault(code, [])
+            if runs and runs[-1]["end"] == start:
+                runs[-1]["end"] = end
+            else:
+                runs.append({"start": start, "end": end})
+
+        environments = []
+        for code, runs in extents.items():
+            if code not in self.catalog:
+                continue
+            data = self.catalog.expand(code)
+            data["extents"] = [
+                {"start": round(r["start"], 1), "end": round(r["end"], 1)} for r in runs
+            ]
+            environments.append(Environment(data, code=code, catalog=self.catalog))
         return environments
 
+    def _sample_adaptive(self, geometry: Geometry) -> dict:
+        """
+        Samples a ``Polygon`` geometry adaptively (see ``adaptive_depth``),
+        and constructs a response object emulating the API response format.
+
+        :param geometry: A ``Polygon`` geometry.
+        :return: A dictionary in the format of the ``identify`` operation's
+            response.
+        """
+        logger.debug(
+            f"Applying adaptive sampling with maximum depth {self.adaptive_depth}"
+        )
+        _, _, codes = adaptive_sample_polygon(
+            geometry.to_shapely(),
+            self._classify,
+            cell_size=self.grid_size,
+            max_depth=self.adaptive_depth,
+            max_points=self.max_points,
+        )
+        logger.debug(f"Resolved {len(codes)} adaptive samples")
+        values = [str(code) for code in np.unique(codes) if code in self.catalog]
+        return {"properties": {"Values": values or ["NoData"]}}
+
+    def _classify(self, x: np.ndarray, y: np.ndarray) -> np.ndarray:
+        """
+        Reads the class codes at the given coordinates, from the local raster
+        (or tiles) if set, or else with one ``identify`` request per point.
+
+        :param x: An array of x coordinates (longitude).
+        :param y: An array of y coordinates (latitude).
+        :return: An integer array of class codes, with 0 where there is no
+            data.
+        """
+        if self.raster is not None:
+            return self.raster.sample(x, y).filled(0)
+        if self.tile_size is not None:
+            return self._sample_tiles(x, y).filled(0)
+        codes = []
+        for point in coordinates_to_points(x, y):
+            response = self._request(Geometry(point))
+            values = response.get("properties", {}).get("Values") or ["NoData"]
+            codes.append(0 if values[0] == "NoData" else int(values[0]))
+        return np.array(codes, dtype=np.int64)
+
+    def _read_codes(self, samples: List[List[Geometry]]) -> List[dict]:
+        """
+        Reads class codes from the local raster (or tiles) for groups of
+        geometries, and constructs a response object for each group emulating
+        the API response format.
+
+        :param samples: A list of lists of ``Geometry`` objects. Each inner
+            list holds the geometries sampled from one input geometry.
+        :return: A list of dictionaries, one per group, in the format of the
+            ``identify`` operation's response.
+        """
+        x, y, group = self._sample_coordinates(samples)
+        return self._read_groups(x, y, group, len(samples))
+
+    @staticmethod
+    def _sample_coordinates(samples: List[List[Geometry]]) -> tuple:
+        """
+        Gathers the coordinates of groups of geometries into arrays.
+
+        :param samples: A list of lists of ``Geometry`` objects.
+        :return: A tuple of arrays ``(x, y, group)``, where ``group`` is the
+            index of the group of each point. Polygons are represented by
+            their centroid.
+        """
+        x, y, group = [], [], []
+        for i, geometries in enumerate(samples):
+            for geometry in geometries:
+                if geometry.geometry_type() == "Point":
+                    coordinates = geometry.coordinates[0, :2]
+                else:  # Polygons are resolved by their centroid
+                    centroid = geometry.to_shapely().centroid
+                    coordinates = [centroid.x, centroid.y]
+                x.append(coordinates[0])
+                y.append(coordinates[1])
+                group.append(i)
+        return (
+            np.array(x, dtype=float),
+            np.array(y, dtype=float),
+            np.array(group, dtype=np.int64),
+        )
+
+    def _read_groups(
+        self, x: np.ndarray, y: np.ndarray, group: np.ndarray, count: int
+    ) -> List[dict]:
+        """
+        Reads class codes from the local raster (or tiles) for groups of
+        points, and constructs a response object for each group emulating
+        the API response format.
+
+        :param x: An array of x coordinates (longitude).
+        :param y: An array of y coordinates (latitude).
+        :param group: An array of the index of the group of each point.
+        :param count: The number of groups.
+        :return: A list of dictionaries, one per group, in the format of the
+            ``identify`` operation's response.
+        """
+        if len(x) == 0:
+            return [{"properties": {"Values": ["NoData"]}} for _ in range(count)]
+        if self.raster is not None:
+            codes = self.raster.sample(x, y)
+        else:
+            codes = self._sample_tiles(x, y)
+        logger.debug(f"Read {len(codes)} pixels")
+
+        # Reduce to the unique codes of each group before mapping, so the
+        # mapping cost scales with the number of distinct environments rather
+        # than the number of points.
+        found = ~np.ma.getmaskarray(codes)
+        pairs = np.stack([group[found], codes.data[found]], axis=1)
+        values = [[] for _ in range(count)]
+        for i, code in np.unique(pairs, axis=0):
+            if code in self.catalog:
+                values[i].append(str(code))
+        return [{"properties": {"Values": v or ["NoData"]}} for v in values]
+
+    def _sample_tiles(self, x: np.ndarray, y: np.ndarray) -> np.ma.MaskedArray:
+        """
+        Reads class codes at the given coordinates from tiles of the dataset,
+        fetching each tile that is not already cached exactly once.
+
+        :param x: An array of x coordinates (longitude).
+        :param y: An array of y coordinates (latitude).
+        :return: A masked integer array of class codes.
+        """
+        span = self.tile_size * PIXEL_SIZE
+        tile_cols = np.floor((x + 180) / span).astype(np.int64)
+        tile_rows = np.floor((90 - y) / span).astype(np.int64)
+        codes = np.ma.masked_all(x.shape, dtype=np.int64)
+
+        # Group points by tile, so each tile is visited once
+        keys = tile_rows * int(np.ceil(360 / span)) + tile_cols
+        order = np.argsort(keys, kind="stable")
+        _, starts = np.unique(keys[order], return_index=True)
+        for selected in np.split(order, starts[1:]):
+            key = (int(tile_rows[selected[0]]), int(tile_cols[selected[0]]))
+            tile = self._tiles.get(key)
+            if tile is None:
+                tile = self._request_tile(key)
+                if tile is None:
+                    continue  # Leave the points of a failed tile masked
+                self._tiles.put(key, tile)
+            codes[selected] = tile.sample(x[selected], y[selected])
+        return codes
+
+    def _request_tile(self, key: tuple) -> Union[Raster, None]:
+        """
+        Sends an ``exportImage`` request for a tile of raw class codes.
+
+        :param key: The ``(row, column)`` index of the tile in the tile grid,
+            counted from the upper-left corner of the dataset's extent.
+        :return: A ``Raster`` of the tile, or ``None`` if the request failed.
+        """
+        base = (
+            "https://landscape12.arcgis.com/arcgis/rest/services/"
+            "World_Terrestrial_Ecosystems/ImageServer/exportImage"
+        )
+        span = self.tile_size * PIXEL_SIZE
+        xmin = -180 + key[1] * span
+        ymax = 90 - key[0] * span
+        payload = {
+            "bbox": f"{xmin},{ymax - span},{xmin + span},{ymax}",
+            "bboxSR": "4326",
+            "imageSR": "4326",
+            "size": f"{self.tile_size},{self.tile_size}",
+            "format": "bsq",  # Raw, lossless band sequential pixel values
+            "pixelType": "U16",
+            "noData": "0",
+            "interpolation": "RSP_NearestNeighbor",
+            "f": "image",
+        }
+
+        logger.debug(f"Sending tile request {key} to {self.__class__.__name__}")
+
+        # pylint: disable=broad-exception-caught
+        try:
+            response = requests.get(
+                base, params=payload, timeout=30, headers=user_agent()
+            )
+            array = np.frombuffer(response.content, dtype=np.uint16)
+            array = array.reshape(self.tile_size, self.tile_size)
+            transform = (xmin, PIXEL_SIZE, 0, ymax, 0, -PIXEL_SIZE)
+            return Raster(array, transform, nodata=0)
+        except Exception as e:
+            logger.error(
+                f"Failed to fetch tile from {self.__class__.__name__}. Error: {e}",
+                exc_info=True,
+            )
+            return None
+
+    def _request_pixel_grid(self) -> Union[tuple, None]:
+        """
+        Sends a request for the metadata of the ImageServer, and reads the
+        geotransform of the dataset's pixel grid from its ``extent`` and
+        ``pixelSizeX``/``pixelSizeY``.
+
+        :return: A GDAL-style geotransform, or ``None`` if the request failed
+            or the grid is not in EPSG:4326.
+        """
+        base = (
+            "https://landscape12.arcgis.com/arcgis/rest/services/"
+            "World_Terrestrial_Ecosystems/ImageServer"
+        )
+
+        logger.debug(f"Sending metadata request to {self.__class__.__name__}")
+
+        # pylint: disable=broad-exception-caught
+        try:
+            response = requests.get(
+                base, params={"f": "json"}, timeout=10, headers=user_agent()
+            )
+            metadata = response.json()
+            extent = metadata["extent"]
+            reference = extent.get("spatialReference", {})
+            wkid = reference.get("latestWkid", reference.get("wkid"))
+            if wkid != 4326:
+                logger.warning(
+                    f"Pixel grid of {self.__class__.__name__} is in wkid {wkid}, "
+                    f"not EPSG:4326. Sample points are not aligned to pixels."
+                )
+                return None
+            return (
+                float(extent["xmin"]),
+                float(metadata["pixelSizeX"]),
+                0,
+                float(extent["ymax"]),
+                0,
+                -float(metadata["pixelSizeY"]),
+            )
+        except Exception as e:
+            logger.error(
+                f"Failed to fetch metadata from {self.__class__.__name__}. "
+                f"Error: {e}",
+                exc_info=True,
+            )
+            return None
+
     def _request(self, geometry: Geometry) -> dict:
         """
         Sends a request to the World Terrestrial Ecosystems data source and
@@ -177,7 +847,7 @@ class WorldTerrestrialEcosystems(DataSource):
             "World_Terrestrial_Ecosystems/ImageServer/identify"
         )
         payload = {
-            "geometry": dumps(geometry.to_esri()["geometry"]),
+            "geometry": geometry.to_esri_json(),
             "geometryType": geometry.to_esri()["geometryType"],
             "returnGeometry": "false",
             "f": "json",
@@ -204,55 +874,34 @@ class WorldTerrestrialEcosystems(DataSource):
             )
             return {}
 
-    def convert_data(self) -> List[Environment]:
+    def convert_data(self, data: dict = None) -> List[Environment]:
         logger.debug(f"Starting data conversion in {self.__class__.__name__}")
-        result = []
-        unique_wte_environments = self.unique_environment()
-        for unique_wte_environment in unique_wte_environments:
-            environment = EnvironmentDataModel()
-            environment.set_identifier("https://doi.org/10.5066/P9DO61LP")
-            environment.set_data_source(self.__class__.__name__)
-            environment.set_date_created()
-            environment.set_properties(unique_wte_environment)
-            result.append(Environment(data=environment.data))
-            logger.debug("Converted environment properties")
+        result = [self.catalog.environment(code) for code in self.unique_codes(data)]
         logger.debug(
             f"Successfully converted {len(result)} environments in "
             f"{self.__class__.__name__}"
         )
         return result
 
-    def unique_environment(self) -> List[dict]:
-        # Parse the properties of the environment(s) in the data to a form
-        # that can be compared for uniqueness.
-        if not self.has_environment():
+    def unique_environment(self, data: dict = None) -> List[dict]:
+        return [dict(self.catalog.properties(code)) for code in self.unique_codes(data)]
+
+    def unique_codes(self, data: dict = None) -> List[int]:
+        """
+        Extracts the unique environment class codes from the data.
+
+        :param data: The raw response data. Defaults to ``data``.
+        :return: A sorted list of integer codes of the ``catalog``.
+        """
+        if data is None:
+            data = self.data
+        if not self.has_environment(data):
             return []
-        descriptors = []
-        properties = self.properties.keys()
-        self.data = apply_code_mapping(self.data)
-        results = self.data.get("results")
-        for result in results:
-            res = {}
-            for item in properties:
-                res[item] = result.get(item)
-            res = dumps(res)
-            descriptors.append(res)
-        descriptors = set(descriptors)
-        descriptors = [loads(d) for d in descriptors]
-
-        # Convert properties into a more readable format
-        new_descriptors = []
-        for descriptor in descriptors:
-            new_descriptor = {
-                "temperature": descriptor["Temperatur"],
-                "moisture": descriptor["Moisture"],
-                "landCover": descriptor["Landcover"],
-                "landForm": descriptor["Landforms"],
-                "climate": descriptor["Climate_Re"],
-                "ecosystem": descriptor["ClassName"],
-            }
-            new_descriptors.append(new_descriptor)
-        return new_descriptors
+        codes = set()
+        for value in data["properties"]["Values"]:
+            if value != "NoData" and int(value) in self.catalog:
+                codes.add(int(value))
+        return sorted(codes)
 
     def has_environment(self, data=None) -> bool:
         """
@@ -281,37 +930,70 @@ def apply_code_mapping(json: dict) -> dict:
     :return: A dictionary containing the mapped environmental properties.
     """
 
-    # Load the mapping file as a DataFrame for easy lookup
+    table = attribute_table()
+    mapped_results = []
+    for code in json["properties"].get("Values"):
+        if code == "NoData":
+            continue
+        mapped_results.append(dict(table[int(code)]))
+    return {"results": mapped_results}
+
+
+@lru_cache(maxsize=None)
+def attribute_table() -> dict:
+    """
+    Loads the raster attribute table of the World Terrestrial Ecosystems into
+    a lookup of classification codes to environmental properties. The table is
+    read from file once per process.
+
+    :return: A dictionary mapping integer codes to dictionaries of
+        environmental properties.
+    """
     mapping_file = files("geoenvo.data.data_source_attributes").joinpath(
         "wte_attribute_table.json"
     )
     with mapping_file.open("r", encoding="utf-8") as f:
-        attribute_table = loads(f.read())
+        table = loads(f.read())
 
-    features = attribute_table.get("features")
-    attributes = [feature["attributes"] for feature in features]
-    df = pd.DataFrame(attributes)
+    # Trim down the attributes to only the ones we want to return
+    columns = [
+        "Landforms",
+        "Landcover",
+        "Climate_Re",
+        "ClassName",
+        "Moisture",
+        "Temperatur",
+    ]
+    lookup = {}
+    for feature in table.get("features"):
+        attributes = feature["attributes"]
+        lookup[attributes["Value"]] = {key: attributes[key] for key in columns}
+    return lookup
 
-    mapped_results = []
-    for code in json["properties"].get("Values"):
-        # Get the row from the data frame where the attribute matches the
-        # value in the Value column. Also trim down the columns to only the
-        # ones we want to return.
-        if code == "NoData":
-            continue
-        row = df[df["Value"] == int(code)]
-        row = row[
-            [
-                "Landforms",
-                "Landcover",
-                "Climate_Re",
-                "ClassName",
-                "Moisture",
-                "Temperatur",
-            ]
-        ]
-        mapped_results.append(row.to_dict("records")[0])
-    return {"results": mapped_results}
+
+@lru_cache(maxsize=None)
+def environment_catalog() -> EnvironmentCatalog:
+    """
+    Builds the catalog of environment classes of the World Terrestrial
+    Ecosystems. Each class is registered under its raster value, with
+    properties in a readable format.
+
+    :return: An ``EnvironmentCatalog`` object.
+    """
+    catalog = EnvironmentCatalog(
+        "WorldTerrestrialEcosystems", "https://doi.org/10.5066/P9DO61LP"
+    )
+    for code, descriptor in attribute_table().items():
+        properties = {
+            "temperature": descriptor["Temperatur"],
+            "moisture": descriptor["Moisture"],
+            "landCover": descriptor["Landcover"],
+            "landForm": descriptor["Landforms"],
+            "climate": descriptor["Climate_Re"],
+            "ecosystem": descriptor["ClassName"],
+        }
+        catalog.register(code, properties, code=code)
+    return catalog
 
 
 def create_attribute_table(
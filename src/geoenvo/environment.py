@@ -2,26 +2,37 @@
 *environment.py*
 """
 
+from json import dumps
+from typing import List
+
 import daiquiri
 
 logger = daiquiri.getLogger(__name__)
 
 
-# pylint: disable=too-few-public-methods
 class Environment:
     """
     The Environment class represents environmental descriptions retrieved from
     a ``DataSource``. It provides a structured way to store and manage
     environmental data.
+
+    An Environment may alternatively reference an environment class of an
+    ``EnvironmentCatalog`` by its integer ``code``, in which case ``data`` is
+    expanded from the catalog on first access and kept with the object.
     """
 
-    def __init__(self, data: dict = None):
+    def __init__(self, data: dict = None, code: int = None, catalog=None):
         """
         Initializes an Environment object with the given data.
 
         :param data: A dictionary containing environmental data.
+        :param code: The integer code of an environment class (optional).
+        :param catalog: The ``EnvironmentCatalog`` holding the environment
+            class referenced by ``code`` (optional).
         """
         self._data = data
+        self._code = code
+        self._catalog = catalog
 
     @property
     def data(self) -> dict:
@@ -30,6 +41,8 @@ class Environment:
 
         :return: A dictionary representing the environmental data.
         """
+        if self._data is None and self._catalog is not None:
+            self._data = self._catalog.expand(self._code)
         return self._data
 
     @data.setter
@@ -40,3 +53,48 @@ class Environment:
         :param data: A dictionary containing updated environmental data.
         """
         self._data = data
+
+    @property
+    def code(self) -> int:
+        """
+        Retrieves the integer code of the referenced environment class.
+
+        :return: The integer code, or ``None`` if the environment does not
+            reference a catalog.
+        """
+        return self._code
+
+
+def merge_environments(environments: List[List[Environment]]) -> List[Environment]:
+    """
+    Merges the environments resolved for the parts of a geometry by one data
+    source, dropping duplicates and keeping the order of first occurrence.
+
+    The along-track ``extents`` of environments resolved for lines (e.g., the
+    parts of a ``MultiLineString``) are combined rather than dropped, and
+    each extent is labeled with the index of its ``part``, as extents are
+    measured from the start of each part.
+
+    :param environments: A list of lists of ``Environment`` objects, one per
+        part.
+    :return: A list of distinct ``Environment`` objects.
+    """
+    merged = {}
+    extents = {}
+    for part, environment in (
+        (i, e) for i, group in enumerate(environments) for e in group
+    ):
+        if environment.code is not None:
+            key = environment.code
+        else:
+            key = dumps(environment.data, sort_keys=True, default=str)
+        merged.setdefault(key, environment)
+        runs = (environment.data or {}).get("extents")
+        if runs is not None and len(environments) > 1:
+            extents.setdefault(key, []).extend({**r, "part": part} for r in runs)
+    for key, runs in extents.items():
+        data = dict(merged[key].data)
+        data["extents"] = runs
+        merged[key] = Environment(data, code=merged[key].code)
+    logger.debug(f"Merged environments of {len(environments)} parts")
+    return list(merged.values())
@@ -2,36 +2,107 @@
 *geometry.py*
 """
 
-import json
-from io import StringIO
+# pylint: disable=too-many-lines
+
+from functools import lru_cache
 from json import dumps
+from typing import Callable, Iterator, List, Union
 
 import daiquiri
 import geopandas as gpd
+import pyproj
 import shapely
-from shapely import Polygon, Point
 import numpy as np
 
 logger = daiquiri.getLogger(__name__)
 
+# Ellipsoid for geodesic calculations on EPSG:4326 coordinates
+GEOD = pyproj.Geod(ellps="WGS84")
+
+# Number of azimuths along which geodesic buffers are traced
+BUFFER_AZIMUTHS = 64
+
+# Maximum number of grid cells tested against a polygon at once when sampling
+# is streamed
+STRIP_SIZE = 100_000
+
+# Coordinate reference system of GeoJSON geometries, and of the coordinates
+# used by data sources
+WGS84 = 4326
+
+# Maximum number of cached coordinate transformers
+TRANSFORMER_CACHE_SIZE = 32
 
+# Types of the parts of multipart geometries
+PART_TYPES = {
+    "MultiPoint": "Point",
+    "MultiLineString": "LineString",
+    "MultiPolygon": "Polygon",
+}
+
+
+# pylint: disable=too-many-instance-attributes
 class Geometry:
     """
     The Geometry class manages spatial geometries in GeoJSON format and
     provides utilities for transformation and spatial processing.
 
-    Currently, the ``geometry`` parameter only supports GeoJSON ``Point`` and
-    ``Polygon`` types, with plans to support additional types, including
-    ``GeometryCollection``, in the future.
+    The ``geometry`` parameter supports the GeoJSON ``Point``, ``LineString``
+    and ``Polygon`` types, and the multipart ``MultiPoint``,
+    ``MultiLineString``, ``MultiPolygon`` and ``GeometryCollection`` types.
+    Multipart geometries are resolved by their parts (see ``parts``), and the
+    environments of the parts are merged into one response.
+
+    Derived forms of the geometry (its coordinate array, Shapely object, Esri
+    JSON and ``key``) are computed on first use and cached, so that they are
+    not rebuilt by each operation on the same geometry. The cache is cleared
+    when ``data`` or ``crs`` is set.
+
+    Coordinates are in EPSG:4326 unless another ``crs`` is declared. Data
+    sources work in EPSG:4326, so geometries in other systems are reprojected
+    with ``to_wgs84`` when they are resolved (by the ``Resolver``, or by the
+    ``get_environment`` and ``get_environments`` methods of data sources).
+    The Esri form of the geometry declares its system in its
+    ``spatialReference``.
     """
 
-    def __init__(self, geometry: dict):
+    __slots__ = (
+        "_data",
+        "_crs",
+        "_coordinates",
+        "_shapely",
+        "_esri",
+        "_esri_json",
+        "_key",
+        "_wgs84",
+    )
+
+    def __init__(self, geometry: dict, crs=None):
         """
         Initializes a Geometry object with the given GeoJSON geometry.
 
         :param geometry: A dictionary representing a GeoJSON geometry.
+        :param crs: The coordinate reference system of the geometry, as any
+            input accepted by ``pyproj.CRS.from_user_input`` (e.g., ``3857``
+            or ``"EPSG:32633"``). Defaults to EPSG:4326.
         """
         self._data = geometry
+        self._crs = crs
+        self._clear()
+
+    def __repr__(self) -> str:
+        return f"Geometry({self.data!r})"
+
+    def _clear(self):
+        """
+        Clears the cached derived forms of the geometry.
+        """
+        self._coordinates = None
+        self._shapely = None
+        self._esri = None
+        self._esri_json = None
+        self._key = None
+        self._wgs84 = None
 
     @property
     def data(self) -> dict:
@@ -50,30 +121,188 @@ class Geometry:
         :param geometry: A dictionary representing a new GeoJSON geometry.
         """
         self._data = geometry
+        self._clear()
+
+    @property
+    def crs(self):
+        """
+        Retrieves the coordinate reference system of the geometry.
+
+        :return: The coordinate reference system as declared, or ``None`` for
+            EPSG:4326.
+        """
+        return self._crs
+
+    @crs.setter
+    def crs(self, crs):
+        """
+        Updates the coordinate reference system of the geometry. The
+        coordinates are not changed (see ``to_wgs84`` to reproject them).
+
+        :param crs: The new coordinate reference system.
+        """
+        self._crs = crs
+        self._clear()
+
+    @property
+    def coordinates(self) -> np.ndarray:
+        """
+        Retrieves the coordinates of the geometry as a compact array.
+
+        :return: A float array of shape ``(n, d)`` of the ``n`` positions of
+            the geometry (e.g., the point, or the vertices of the rings of a
+            polygon), with ``d`` dimensions.
+        """
+        if self._coordinates is None:
+            coordinates = self.data.get("coordinates")
+            if self.geometry_type() == "Point":
+                coordinates = np.array([coordinates], dtype=float)
+            elif self.geometry_type() == "LineString":
+                coordinates = np.array(coordinates, dtype=float)
+            elif self.geometry_type() == "Polygon":
+                coordinates = np.array(
+                    [position for ring in coordinates for position in ring],
+                    dtype=float,
+                )
+            else:  # Multipart geometries
+                shape = self.to_shapely()
+                coordinates = shapely.get_coordinates(
+                    shape, include_z=bool(shapely.has_z(shape))
+                )
+            self._coordinates = coordinates
+        return self._coordinates
+
+    @property
+    def key(self) -> tuple:
+        """
+        Retrieves a canonical, hashable key of the geometry (e.g., to find
+        repeated geometries in a batch). Geometries with the same key have the
+        same coordinate reference system and the same shape, including the
+        structure of their rings and parts.
+
+        :return: A tuple of the EPSG code of the geometry (or ``None`` for
+            systems without one), and its WKB representation.
+        """
+        if self._key is None:
+            wkb = shapely.to_wkb(self.to_shapely(), output_dimension=3)
+            self._key = (crs_to_epsg(self.crs), wkb)
+        return self._key
+
+    def to_shapely(self) -> shapely.Geometry:
+        """
+        Converts the GeoJSON geometry to a Shapely geometry.
+
+        :return: A Shapely geometry object.
+        """
+        if self._shapely is None:
+            self._shapely = shapely.geometry.shape(self.data)
+        return self._shapely
+
+    def to_wgs84(self) -> "Geometry":
+        """
+        Reprojects the geometry to EPSG:4326. All coordinates are transformed
+        at once with a cached transformer (see ``get_transformer``), and z
+        coordinates are kept as is.
+
+        :return: A ``Geometry`` object in EPSG:4326, which is the geometry
+            itself if it is already in EPSG:4326.
+        """
+        if is_wgs84(self.crs):
+            return self
+        if self._wgs84 is None:
+            logger.debug(f"Reprojecting geometry from '{self.crs}' to EPSG:4326")
+            shape = reproject_shapes(np.array([self.to_shapely()]), self.crs)[0]
+            self._wgs84 = Geometry(json_compatible(shapely.geometry.mapping(shape)))
+        return self._wgs84
 
     def is_supported(self) -> bool:
         """
         Checks if the stored geometry is supported by the resolver.
         A valid geometry must be a GeoJSON object with a top-level ``type`` of
-        either "Point" or "Polygon".
+        "Point", "LineString" or "Polygon", or a multipart geometry
+        ("MultiPoint", "MultiLineString", "MultiPolygon" or
+        "GeometryCollection") of such parts.
 
         :return: ``True`` if the geometry is supported, otherwise ``False``.
         """
         logger.debug(f"Checking if geometry type '{self.geometry_type()}' is supported")
-        if self.geometry_type() in ["Point", "Polygon"]:
+        if self.geometry_type() in ["Point", "LineString", "Polygon"]:
             return True
+        if self.is_multipart():
+            parts = self.parts()
+            if parts and all(part.is_supported() for part in parts):
+                return True
         logger.warning(f"Unsupported geometry type: {self.geometry_type()}")
         return False
 
+    def is_multipart(self) -> bool:
+        """
+        Checks if the stored geometry is a multipart geometry.
+
+        :return: ``True`` if the geometry is a "MultiPoint",
+            "MultiLineString", "MultiPolygon" or "GeometryCollection",
+            otherwise ``False``.
+        """
+        return self.geometry_type() in [*PART_TYPES, "GeometryCollection"]
+
+    def parts(self) -> List["Geometry"]:
+        """
+        Splits the stored geometry into its single parts. Nested geometry
+        collections are flattened.
+
+        :return: A list of ``Geometry`` objects of the parts, or a list of the
+            geometry itself if it is not a multipart geometry.
+        """
+        if self.geometry_type() in PART_TYPES:
+            part_type = PART_TYPES[self.geometry_type()]
+            return [
+                Geometry({"type": part_type, "coordinates": coordinates}, self.crs)
+                for coordinates in self.data["coordinates"]
+            ]
+        if self.geometry_type() == "GeometryCollection":
+            return [
+                part
+                for geometry in self.data.get("geometries", [])
+                for part in Geometry(geometry, self.crs).parts()
+            ]
+        return [self]
+
     def to_esri(self) -> dict:
         """
         Converts the GeoJSON geometry to an Esri-compatible format.
 
+        :return: A dictionary representing the Esri-formatted geometry. The
+            dictionary (and its ``geometry``) is a copy, which may be modified.
+        """
+        if self._esri is None:
+            self._esri = self._convert_to_esri()
+        return {
+            "geometry": dict(self._esri["geometry"]),
+            "geometryType": self._esri["geometryType"],
+        }
+
+    def to_esri_json(self) -> str:
+        """
+        Converts the GeoJSON geometry to an Esri JSON string, as sent in
+        requests to ArcGIS REST services.
+
+        :return: A JSON string of the Esri-formatted geometry.
+        """
+        if self._esri_json is None:
+            self._esri_json = dumps(self.to_esri()["geometry"])
+        return self._esri_json
+
+    def _convert_to_esri(self) -> dict:
+        """
+        Converts the GeoJSON geometry to an Esri-compatible format (see
+        ``to_esri``).
+
         :return: A dictionary representing the Esri-formatted geometry.
         """
         logger.debug(
             f"Converting geometry of type '{self.geometry_type()}' to Esri " f"format"
         )
+        spatial_reference = crs_to_spatial_reference(self.crs)
 
         if self.geometry_type() == "Point":
             x, y, *z = self.data["coordinates"]
@@ -81,15 +310,23 @@ class Geometry:
                 "x": x,
                 "y": y,
                 "z": z[0] if z else None,
-                "spatialReference": {"wkid": 4326},
+                "spatialReference": spatial_reference,
             }
             esri_geometry_type = "esriGeometryPoint"
             logger.debug("Successfully converted Point geometry to Esri format")
             return {"geometry": geometry, "geometryType": esri_geometry_type}
+        if self.geometry_type() == "LineString":
+            geometry = {
+                "paths": [self.data["coordinates"]],
+                "spatialReference": spatial_reference,
+            }
+            esri_geometry_type = "esriGeometryPolyline"
+            logger.debug("Successfully converted LineString geometry to Esri format")
+            return {"geometry": geometry, "geometryType": esri_geometry_type}
         if self.geometry_type() == "Polygon":
             geometry = {
                 "rings": self.data["coordinates"],
-                "spatialReference": {"wkid": 4326},
+                "spatialReference": spatial_reference,
             }
             esri_geometry_type = "esriGeometryPolygon"
             logger.debug("Successfully converted Polygon geometry to Esri format")
@@ -106,7 +343,9 @@ class Geometry:
 
     def point_to_polygon(self, buffer=None) -> dict:
         """
-        Converts a ``Point`` geometry into a ``Polygon`` by buffering it.
+        Converts a ``Point`` geometry into a ``Polygon`` by buffering it. The
+        polygon is the envelope of the geodesic circle of the buffer distance
+        around the point (see ``buffer_points``).
 
         :param buffer: The buffer distance used to create the polygon
             (optional).
@@ -125,23 +364,9 @@ class Geometry:
 
         # pylint: disable=broad-exception-caught
         try:
-            point = gpd.GeoSeries.from_file(StringIO(dumps(self.data)))
-            point = point.to_crs(32634)  # A CRS in units of meters
-            expanded_point = point.geometry.buffer(buffer * 1000)  # buffer to meters
-            expanded_point = expanded_point.to_crs(4326)  # Convert back to EPSG:4326
-            bounds = expanded_point.bounds
-            polygon = {
-                "type": "Polygon",
-                "coordinates": [
-                    [
-                        [bounds.minx[0], bounds.miny[0]],
-                        [bounds.maxx[0], bounds.miny[0]],
-                        [bounds.maxx[0], bounds.maxy[0]],
-                        [bounds.minx[0], bounds.maxy[0]],
-                        [bounds.minx[0], bounds.miny[0]],
-                    ]
-                ],
-            }
+            x, y, *_ = self.data["coordinates"]
+            bounds = buffer_points([x], [y], buffer * 1000)[0]  # km to meters
+            polygon = envelope_to_polygon(bounds)
             logger.debug(
                 f"Successfully converted Point to Polygon with buffer " f"{buffer} km"
             )
@@ -169,27 +394,19 @@ class Geometry:
         # pylint: disable=broad-exception-caught
         try:
             # Get points from within the polygon
-            polygon = gpd.GeoSeries.from_file(StringIO(dumps(self.data)))
-            representative_points = polygon.apply(
-                grid_sample_polygon, args=(grid_size,)
-            )
-            points = []
-            for item in representative_points.items():
-                geojson = json.loads(gpd.GeoSeries(item[1]).to_json())
-                result = geojson["features"][0]["geometry"]
-                points.append(result)
+            polygon = self.to_shapely()
+            x, y = grid_sample_coordinates(polygon, grid_size)
+            points = coordinates_to_points(x, y)
             logger.debug(
                 f"Extracted {len(points)} representative points from the " f"polygon"
             )
 
             # Get points from the vertices of the polygon
-            coords = list(polygon[0].exterior.coords)
-            polygon_vertices = gpd.GeoSeries([Point(x, y) for x, y in coords])
-            polygon_vertices = polygon_vertices.drop_duplicates()
-            for item in polygon_vertices.items():
-                geojson = json.loads(gpd.GeoSeries(item[1]).to_json())
-                result = geojson["features"][0]["geometry"]
-                points.append(result)
+            vertices = dict.fromkeys(polygon.exterior.coords)  # drop duplicates
+            points.extend(
+                {"type": "Point", "coordinates": [float(x), float(y)]}
+                for x, y, *_ in vertices
+            )
 
             logger.debug(f"Successfully converted Polygon to {len(points)} points")
             return points
@@ -198,12 +415,787 @@ class Geometry:
             logger.error(f"Failed to convert Polygon to points: {e}", exc_info=True)
             return self.data
 
+    def iter_polygon_to_points(self, grid_size) -> Iterator[dict]:
+        """
+        Converts a ``Polygon`` geometry into a stream of representative points
+        using grid-based sampling.
+
+        This is the lazy form of ``polygon_to_points``, for polygons too large
+        to sample at once. The grid is generated and tested in strips (see
+        ``iter_grid_sample_coordinates``), so memory use is bounded
+        regardless of the size of the polygon or the density of the grid.
+
+        :param grid_size: The size of the grid cells used for sampling.
+        :return: An iterator of dictionaries representing sampled points in
+            GeoJSON format, followed by the vertices of the polygon.
+        """
+        if self.geometry_type() != "Polygon":
+            logger.warning(
+                f"Skipping polygon-to-points streaming. Geometry type "
+                f"'{self.geometry_type()}' is not a Polygon."
+            )
+            return
+        polygon = self.to_shapely()
+        for x, y in iter_grid_sample_coordinates(polygon, grid_size):
+            yield from coordinates_to_points(x, y)
+        for x, y, *_ in dict.fromkeys(polygon.exterior.coords):
+            yield {"type": "Point", "coordinates": [float(x), float(y)]}
+
+
+class GeometryArray:
+    """
+    The GeometryArray class is a columnar container of many geometries, for
+    resolving large batches without creating a ``Geometry`` object (and a
+    GeoJSON dictionary) per input.
+
+    ``Point`` geometries are held as arrays of ``x``, ``y`` and optionally
+    ``z`` coordinates, which data sources read directly in their batch paths.
+    Other geometries (e.g., ``Polygon``) are held as Shapely objects. A
+    ``Geometry`` is only created for a row when it is accessed by index, so
+    the array can be passed anywhere a list of ``Geometry`` objects is
+    accepted (e.g., ``Resolver.resolve_batch`` and
+    ``DataSource.get_environments``).
+    """
+
+    # pylint: disable=too-many-arguments
+    # pylint: disable=too-many-positional-arguments
+    def __init__(self, x, y, z=None, ids=None, shapes=None, crs=None):
+        """
+        Initializes a GeometryArray object. Arrays of ``float`` are used as
+        is, without copying.
+
+        :param x: An array of x coordinates (longitude) of the points.
+        :param y: An array of y coordinates (latitude) of the points.
+        :param z: An array of z coordinates (optional). ``NaN`` values denote
+            points without a z coordinate.
+        :param ids: An array of identifiers of the rows (optional).
+        :param shapes: An object array of Shapely geometries (optional). Rows
+            with a geometry are resolved from it rather than from their
+            coordinates, and rows with ``None`` are points.
+        :param crs: The coordinate reference system of the coordinates and
+            geometries (optional). Defaults to EPSG:4326.
+        :raises ValueError: If a row has neither a geometry nor coordinates,
+            or its geometry is empty.
+        """
+        self._crs = crs
+        self._x = np.asarray(x, dtype=float)
+        self._y = np.asarray(y, dtype=float)
+        self._z = None if z is None else np.asarray(z, dtype=float)
+        self._ids = None if ids is None else np.asarray(ids)
+        self._shapes = None if shapes is None else np.asarray(shapes, dtype=object)
+        present = np.zeros(len(self._x), dtype=bool)
+        if self._shapes is not None:
+            present = shapes_present(self._shapes)
+            if shapely.is_empty(self._shapes[present]).any():
+                raise ValueError("Empty geometry")
+            if not present.any():
+                self._shapes = None
+        if np.isnan(self._x[~present]).any() or np.isnan(self._y[~present]).any():
+            raise ValueError("Missing geometry")
+
+    def __len__(self) -> int:
+        return len(self._x)
+
+    def __getitem__(self, index: int) -> Geometry:
+        """
+        Creates the ``Geometry`` of a row.
+
+        :param index: The index of the row.
+        :return: A ``Geometry`` object.
+        """
+        if self._shapes is not None and self._shapes[index] is not None:
+            data = shapely.geometry.mapping(self._shapes[index])
+            return Geometry(json_compatible(data), self._crs)
+        coordinates = [float(self._x[index]), float(self._y[index])]
+        if self._z is not None and not np.isnan(self._z[index]):
+            coordinates.append(float(self._z[index]))
+        return Geometry({"type": "Point", "coordinates": coordinates}, self._crs)
+
+    def __iter__(self) -> Iterator[Geometry]:
+        return (self[i] for i in range(len(self)))
+
+    @property
+    def crs(self):
+        """
+        Retrieves the coordinate reference system of the array.
+
+        :return: The coordinate reference system as declared, or ``None`` for
+            EPSG:4326.
+        """
+        return self._crs
+
+    @property
+    def x(self) -> np.ndarray:
+        """
+        Retrieves the x coordinates of the points.
+
+        :return: A float array, with ``NaN`` for rows that are not points.
+        """
+        return self._x
+
+    @property
+    def y(self) -> np.ndarray:
+        """
+        Retrieves the y coordinates of the points.
+
+        :return: A float array, with ``NaN`` for rows that are not points.
+        """
+        return self._y
+
+    @property
+    def z(self) -> np.ndarray:
+        """
+        Retrieves the z coordinates of the points.
+
+        :return: A float array, or ``None`` if no point has a z coordinate.
+        """
+        return self._z
+
+    @property
+    def ids(self) -> np.ndarray:
+        """
+        Retrieves the identifiers of the rows.
+
+        :return: An array of identifiers, or ``None`` if not defined.
+        """
+        return self._ids
+
+    @property
+    def types(self) -> np.ndarray:
+        """
+        Retrieves the geometry type of each row (e.g., "Point" or "Polygon").
+
+        :return: An object array of geometry type names.
+        """
+        types = np.full(len(self), "Point", dtype=object)
+        if self._shapes is not None:
+            present = shapes_present(self._shapes)
+            types[present] = [g.geom_type for g in self._shapes[present]]
+        return types
+
+    @classmethod
+    def from_shapely(cls, geometries, ids=None, crs=None) -> "GeometryArray":
+        """
+        Creates a GeometryArray from an array of Shapely geometries. The
+        coordinates of points are extracted in a vectorized manner.
+
+        :param geometries: An array-like of Shapely geometries.
+        :param ids: An array of identifiers of the rows (optional).
+        :param crs: The coordinate reference system of the geometries
+            (optional). Defaults to EPSG:4326.
+        :return: A GeometryArray object.
+        :raises ValueError: If a geometry is ``None`` or empty.
+        """
+        geometries = np.asarray(geometries, dtype=object)
+        if not shapes_present(geometries).all():
+            raise ValueError("Missing geometry")
+        if shapely.is_empty(geometries).any():
+            raise ValueError("Empty geometry")
+        points = shapely.get_type_id(geometries) == 0
+        x = np.where(points, shapely.get_x(geometries), np.nan)
+        y = np.where(points, shapely.get_y(geometries), np.nan)
+        z = None
+        if shapely.has_z(geometries[points]).any():
+            z = np.where(points, shapely.get_z(geometries), np.nan)
+        shapes = None
+        if not points.all():
+            shapes = np.where(points, None, geometries)
+        return cls(x, y, z=z, ids=ids, shapes=shapes, crs=crs)
+
+    @classmethod
+    def from_geodataframe(
+        cls, frame: gpd.GeoDataFrame, id_column: str = None
+    ) -> "GeometryArray":
+        """
+        Creates a GeometryArray from a GeoDataFrame, reprojected to EPSG:4326
+        if needed.
+
+        :param frame: A GeoDataFrame.
+        :param id_column: The name of the column of identifiers (optional).
+            Defaults to the index of the frame.
+        :return: A GeometryArray object.
+        """
+        ids = frame.index if id_column is None else frame[id_column]
+        array = cls.from_shapely(
+            frame.geometry.to_numpy(), ids=ids.to_numpy(), crs=frame.crs
+        )
+        return array.to_wgs84()
+
+    def take(self, indices) -> "GeometryArray":
+        """
+        Selects rows of the array.
+
+        :param indices: An array of row indices, or a boolean mask.
+        :return: A GeometryArray of the selected rows.
+        """
+        return GeometryArray(
+            self._x[indices],
+            self._y[indices],
+            z=None if self._z is None else self._z[indices],
+            ids=None if self._ids is None else self._ids[indices],
+            shapes=None if self._shapes is None else self._shapes[indices],
+            crs=self._crs,
+        )
+
+    def to_wgs84(self) -> "GeometryArray":
+        """
+        Reprojects the array to EPSG:4326. The coordinates of all points are
+        transformed with one call of a cached transformer (see
+        ``get_transformer``), and the other geometries with one more.
+
+        :return: A GeometryArray in EPSG:4326, which is the array itself if it
+            is already in EPSG:4326.
+        """
+        if is_wgs84(self._crs):
+            return self
+        logger.debug(f"Reprojecting {len(self)} geometries from '{self._crs}'")
+        x, y = get_transformer(self._crs).transform(self._x, self._y)
+        shapes = None
+        if self._shapes is not None:
+            shapes = self._shapes.copy()
+            present = shapes_present(shapes)
+            shapes[present] = reproject_shapes(shapes[present], self._crs)
+        return GeometryArray(x, y, z=self._z, ids=self._ids, shapes=shapes)
+
+
+def split_parts(geometries: Union[List[Geometry], GeometryArray]) -> tuple:
+    """
+    Splits the multipart geometries of a list (or array) of geometries into
+    their parts, so that the parts of all geometries can be resolved
+    together.
+
+    :param geometries: A list of ``Geometry`` objects, or a GeometryArray.
+    :return: A tuple of the geometries to resolve, and the index of the input
+        geometry of each, or ``None`` if no geometry is multipart (in which
+        case the input is returned as is).
+    """
+    multipart = np.isin(geometry_types(geometries), [*PART_TYPES, "GeometryCollection"])
+    if not multipart.any():
+        return geometries, None
+    parts, owners = [], []
+    for i, is_multipart in enumerate(multipart.tolist()):
+        geometry = geometries[i]
+        split = geometry.parts() if is_multipart else [geometry]
+        parts.extend(split)
+        owners.extend([i] * len(split))
+    logger.debug(f"Split {len(geometries)} geometries into {len(parts)} parts")
+    return parts, owners
+
+
+def shapes_present(shapes: np.ndarray) -> np.ndarray:
+    """
+    Finds the elements of an object array that are geometries.
+
+    :param shapes: An object array of Shapely geometries and ``None`` values.
+    :return: A boolean array.
+    """
+    return np.array([shape is not None for shape in shapes], dtype=bool)
+
+
+def json_compatible(data):
+    """
+    Converts the tuples of a GeoJSON mapping (e.g., from
+    ``shapely.geometry.mapping``) to lists, as in parsed GeoJSON.
+
+    :param data: A GeoJSON mapping, or part of it.
+    :return: The mapping with lists in place of tuples.
+    """
+    if isinstance(data, dict):
+        return {key: json_compatible(value) for key, value in data.items()}
+    if isinstance(data, (list, tuple)):
+        return [json_compatible(value) for value in data]
+    return data
+
+
+@lru_cache(maxsize=TRANSFORMER_CACHE_SIZE)
+def get_transformer(crs) -> pyproj.Transformer:
+    """
+    Gets a transformer from a coordinate reference system to EPSG:4326, in
+    x (longitude), y (latitude) order. Transformers are cached, so that they
+    are created once per system rather than once per geometry.
+
+    :param crs: The source coordinate reference system, as any hashable
+        input accepted by ``pyproj.CRS.from_user_input``.
+    :return: A ``pyproj.Transformer`` object.
+    """
+    logger.debug(f"Creating transformer from '{crs}' to EPSG:4326")
+    return pyproj.Transformer.from_crs(crs, WGS84, always_xy=True)
+
+
+@lru_cache(maxsize=TRANSFORMER_CACHE_SIZE)
+def crs_to_epsg(crs) -> Union[int, None]:
+    """
+    Gets the EPSG code of a coordinate reference system.
+
+    :param crs: The coordinate reference system, or ``None`` for EPSG:4326.
+    :return: The EPSG code, or ``None`` if the system does not have one.
+    """
+    if crs is None:
+        return WGS84
+    return pyproj.CRS.from_user_input(crs).to_epsg()
+
+
+def is_wgs84(crs) -> bool:
+    """
+    Checks if a coordinate reference system is EPSG:4326.
+
+    :param crs: The coordinate reference system, or ``None`` for EPSG:4326.
+    :return: ``True`` if the system is EPSG:4326, otherwise ``False``.
+    """
+    return crs_to_epsg(crs) == WGS84
+
+
+def crs_to_spatial_reference(crs) -> dict:
+    """
+    Converts a coordinate reference system to an Esri ``spatialReference``.
+
+    :param crs: The coordinate reference system, or ``None`` for EPSG:4326.
+    :return: A dictionary with the ``wkid`` of the system, or its ``wkt`` if
+        it does not have an EPSG code.
+    """
+    epsg = crs_to_epsg(crs)
+    if epsg is not None:
+        return {"wkid": epsg}
+    return {
+        "wkt": pyproj.CRS.from_user_input(crs).to_wkt(pyproj.enums.WktVersion.WKT1_ESRI)
+    }
+
+
+def reproject_shapes(shapes: np.ndarray, crs) -> np.ndarray:
+    """
+    Reprojects an array of Shapely geometries to EPSG:4326, with one call of
+    a cached transformer over the coordinates of all geometries. Z
+    coordinates are kept as is.
+
+    :param shapes: An object array of Shapely geometries.
+    :param crs: The coordinate reference system of the geometries.
+    :return: An object array of the reprojected geometries.
+    """
+    transformer = get_transformer(crs)
+
+    def transform(coordinates: np.ndarray) -> np.ndarray:
+        coordinates = coordinates.copy()
+        coordinates[:, 0], coordinates[:, 1] = transformer.transform(
+            coordinates[:, 0], coordinates[:, 1]
+        )
+        return coordinates
+
+    include_z = bool(shapely.has_z(shapes).any()) if len(shapes) else False
+    return shapely.transform(shapes, transform, include_z=include_z)
+
+
+def reproject_geometries(
+    geometries: Union[List[Geometry], GeometryArray],
+) -> Union[List[Geometry], GeometryArray]:
+    """
+    Reprojects a list (or array) of geometries to EPSG:4326. The geometries
+    of a list are grouped by their coordinate reference system, and each
+    group is reprojected at once (see ``reproject_shapes``).
+
+    :param geometries: A list of ``Geometry`` objects, or a GeometryArray.
+    :return: The geometries in EPSG:4326, which are the input geometries if
+        they are all in EPSG:4326 already.
+    """
+    if isinstance(geometries, GeometryArray):
+        return geometries.to_wgs84()
+    groups = {}
+    for i, geometry in enumerate(geometries):
+        if not is_wgs84(geometry.crs):
+            groups.setdefault(geometry.crs, []).append(i)
+    if not groups:
+        return geometries
+    geometries = list(geometries)
+    for crs, indices in groups.items():
+        logger.debug(f"Reprojecting {len(indices)} geometries from '{crs}'")
+        shapes = np.array([geometries[i].to_shapely() for i in indices], dtype=object)
+        for i, shape in zip(indices, reproject_shapes(shapes, crs)):
+            data = json_compatible(shapely.geometry.mapping(shape))
+            geometries[i] = Geometry(data)
+    return geometries
+
+
+def geometry_types(geometries: Union[List[Geometry], GeometryArray]) -> np.ndarray:
+    """
+    Retrieves the geometry type of each of a list (or array) of geometries.
+
+    :param geometries: A list of ``Geometry`` objects, or a GeometryArray.
+    :return: An object array of geometry type names.
+    """
+    if isinstance(geometries, GeometryArray):
+        return geometries.types
+    return np.array([g.geometry_type() for g in geometries], dtype=object)
+
+
+def point_coordinates(
+    geometries: Union[List[Geometry], GeometryArray], indices
+) -> tuple:
+    """
+    Retrieves the coordinates of ``Point`` geometries of a list (or array) of
+    geometries. A GeometryArray is read without creating ``Geometry``
+    objects.
+
+    :param geometries: A list of ``Geometry`` objects, or a GeometryArray.
+    :param indices: The indices of the ``Point`` geometries.
+    :return: A tuple of float arrays ``(x, y)``.
+    """
+    if isinstance(geometries, GeometryArray):
+        return geometries.x[indices], geometries.y[indices]
+    coordinates = np.array(
+        [geometries[i].coordinates[0, :2] for i in indices], dtype=float
+    ).reshape(-1, 2)
+    return coordinates[:, 0], coordinates[:, 1]
+
+
+def grid_sample_coordinates(polygon: shapely.Polygon, grid_size: float) -> tuple:
+    """
+    Generates the coordinates of representative points within a polygon using
+    grid-based sampling.
+
+    The polygon's bounding box is divided into a grid of cells, starting at
+    its lower left corner, and the centers of the cells that fall within the
+    polygon are returned. Cell centers are generated as arrays and tested
+    against the polygon at once, without creating a geometry per cell.
+
+    :param polygon: A Shapely Polygon object.
+    :param grid_size: The size of the grid cells in the same units as the
+        polygon's coordinates.
+    :return: A tuple of arrays ``(x, y)`` of the coordinates of the sample
+        points, ordered by ``x`` then ``y``.
+    """
+    min_x, min_y, max_x, max_y = polygon.bounds
+    cols = np.arange(min_x, max_x + grid_size, grid_size) + grid_size / 2
+    rows = np.arange(min_y, max_y + grid_size, grid_size) + grid_size / 2
+    x, y = np.meshgrid(cols, rows, indexing="ij")
+    x, y = x.ravel(), y.ravel()
+    shapely.prepare(polygon)
+    within = shapely.contains_xy(polygon, x, y)
+    logger.debug(
+        f"Generated {int(within.sum())} sample points within the polygon from "
+        f"{len(x)} grid cells"
+    )
+    return x[within], y[within]
+
+
+# pylint: disable=too-many-locals
+def iter_grid_sample_coordinates(
+    polygon: shapely.Polygon, grid_size: float, strip_size: int = STRIP_SIZE
+) -> Iterator[tuple]:
+    """
+    Generates the coordinates of representative points within a polygon using
+    grid-based sampling, one strip of the grid at a time.
+
+    The grid is the same as that of ``grid_sample_coordinates``, but its
+    cells are generated and tested against the polygon in strips of rows of
+    at most ``strip_size`` cells, so only one strip is held in memory at a
+    time. Points are ordered by ``y`` then ``x``.
+
+    :param polygon: A Shapely Polygon object.
+    :param grid_size: The size of the grid cells in the same units as the
+        polygon's coordinates.
+    :param strip_size: The maximum number of cells per strip.
+    :return: An iterator of tuples of arrays ``(x, y)`` of the coordinates of
+        the sample points of each non-empty strip.
+    """
+    min_x, min_y, max_x, max_y = polygon.bounds
+    cols = np.arange(min_x, max_x + grid_size, grid_size) + grid_size / 2
+    rows = np.arange(min_y, max_y + grid_size, grid_size) + grid_size / 2
+    shapely.prepare(polygon)
+    strip_rows = max(1, strip_size // len(cols))
+    strip_cols = min(len(cols), strip_size)
+    for i in range(0, len(rows), strip_rows):
+        for j in range(0, len(cols), strip_cols):
+            y, x = np.meshgrid(
+                rows[i : i + strip_rows], cols[j : j + strip_cols], indexing="ij"
+            )
+            x, y = x.ravel(), y.ravel()
+            within = shapely.contains_xy(polygon, x, y)
+            if within.any():
+                yield x[within], y[within]
+
+
+# pylint: disable=too-many-locals
+def equal_area_sample_polygon(polygon: shapely.Polygon, max_points: int) -> tuple:
+    """
+    Generates at most ``max_points`` representative points within a polygon,
+    evenly spaced by area.
+
+    The polygon is projected to a Lambert azimuthal equal-area projection
+    centered on it, and the grid spacing is chosen from its projected area so
+    that the grid yields close to ``max_points`` points within the polygon.
+    The cost of resolving the points is thus bounded regardless of the
+    polygon's size or latitude.
+
+    :param polygon: A Shapely Polygon object in EPSG:4326.
+    :param max_points: The maximum number of sample points.
+    :return: A tuple of arrays ``(x, y)`` of the coordinates of the sample
+        points in EPSG:4326.
+    """
+    center = polygon.centroid
+    projection = pyproj.CRS.from_proj4(
+        f"+proj=laea +lat_0={center.y} +lon_0={center.x} +ellps=WGS84 +units=m"
+    )
+    forward = pyproj.Transformer.from_crs(4326, projection, always_xy=True)
+    inverse = pyproj.Transformer.from_crs(projection, 4326, always_xy=True)
+    # Densify the edges, which are straight in degrees, so they follow the
+    # same path in the projection
+    xmin, ymin, xmax, ymax = polygon.bounds
+    densified = shapely.segmentize(polygon, max(xmax - xmin, ymax - ymin) / 100)
+    projected = shapely.transform(
+        densified, lambda c: np.column_stack(forward.transform(c[:, 0], c[:, 1]))
+    )
+
+    # Widen the spacing until the points within the polygon fit the budget.
+    # The first estimate is usually within a few percent. Points are tested
+    # against the polygon in EPSG:4326, as edges are only approximately
+    # preserved by the projection.
+    spacing = np.sqrt(projected.area / max(max_points, 1))
+    x, y = np.array([]), np.array([])
+    for _ in range(10):
+        if spacing <= 0:
+            break
+        x, y = grid_sample_coordinates(projected, spacing)
+        x, y = (np.asarray(c) for c in inverse.transform(x, y))
+        inside = shapely.contains_xy(polygon, x, y)
+        x, y = x[inside], y[inside]
+        if len(x) <= max_points:
+            break
+        spacing *= np.sqrt(len(x) / max_points) * 1.01
+    if len(x) > max_points:  # Keep an evenly spaced subset
+        keep = np.linspace(0, len(x) - 1, max_points).astype(np.int64)
+        x, y = x[keep], y[keep]
+    if len(x) == 0:  # Polygon smaller (or thinner) than a grid cell
+        point = polygon.representative_point()
+        return np.array([point.x]), np.array([point.y])
+    logger.debug(f"Generated {len(x)} equal-area sample points")
+    return x, y
+
 
 # pylint: disable=too-many-locals
+def adaptive_sample_polygon(
+    polygon: shapely.Polygon,
+    classify: Callable[[np.ndarray, np.ndarray], np.ndarray],
+    cell_size: float = None,
+    max_depth: int = 3,
+    max_points: int = None,
+) -> tuple:
+    """
+    Generates representative points within a polygon using adaptive
+    (quadtree) sampling.
+
+    The polygon is first sampled at the centers of a coarse grid of cells, and
+    the samples are classified. Each cell whose class differs from that of a
+    neighboring cell (or of its parent cell) is then split into four
+    quadrants, which are sampled and classified in turn. Refinement stops at
+    ``max_depth`` levels, or once ``max_points`` samples have been taken, so
+    homogeneous areas are sampled coarsely and boundaries between classes
+    finely.
+
+    :param polygon: A Shapely Polygon object.
+    :param classify: A function mapping arrays of ``x`` and ``y`` coordinates
+        to an array of class codes (e.g., environment codes).
+    :param cell_size: The size of the cells of the coarse grid in the same
+        units as the polygon's coordinates. Defaults to a quarter of the
+        largest side of the polygon's bounding box.
+    :param max_depth: The maximum number of refinements of the coarse grid.
+    :param max_points: The maximum number of sample points (optional).
+    :return: A tuple of arrays ``(x, y, codes)`` of the coordinates and class
+        codes of the sample points.
+    """
+    min_x, min_y, max_x, max_y = polygon.bounds
+    if cell_size is None:
+        cell_size = max(max_x - min_x, max_y - min_y) / 4 or 1
+    budget = np.inf if max_points is None else max_points
+    shapely.prepare(polygon)
+
+    # Cells are indexed by (column, row) in the grid of their level
+    n_cols = max(int(np.ceil((max_x - min_x) / cell_size)), 1)
+    n_rows = max(int(np.ceil((max_y - min_y) / cell_size)), 1)
+    i, j = np.meshgrid(np.arange(n_cols), np.arange(n_rows), indexing="ij")
+    i, j = i.ravel(), j.ravel()
+    parents = [None] * len(i)
+    size = cell_size
+    samples_x, samples_y, samples_codes = [], [], []
+    for depth in range(max_depth + 1):
+        x = min_x + (i + 0.5) * size
+        y = min_y + (j + 0.5) * size
+        inside = np.flatnonzero(shapely.contains_xy(polygon, x, y))
+        if len(inside) > budget:  # Keep an evenly spaced subset
+            keep = np.linspace(0, len(inside) - 1, int(budget)).astype(np.int64)
+            inside = inside[keep]
+        if depth == 0 and len(inside) == 0:  # Polygon smaller than a cell
+            point = polygon.representative_point()
+            x, y = np.array([point.x]), np.array([point.y])
+            return x, y, np.asarray(classify(x, y))
+        codes = np.asarray(classify(x[inside], y[inside]))
+        samples_x.append(x[inside])
+        samples_y.append(y[inside])
+        samples_codes.append(codes)
+        budget -= len(inside)
+        logger.debug(f"Sampled {len(inside)} points at depth {depth}")
+        if depth == max_depth or budget <= 0:
+            break
+
+        # Refine cells differing from a neighbor or from their parent
+        cols, rows = i[inside].tolist(), j[inside].tolist()
+        sampled = dict(zip(zip(cols, rows), codes.tolist()))
+        refine = []
+        for col, row, parent in zip(cols, rows, [parents[k] for k in inside]):
+            code = sampled[(col, row)]
+            neighbors = [
+                sampled.get((col + di, row + dj))
+                for di, dj in [(-1, 0), (1, 0), (0, -1), (0, 1)]
+            ]
+            if (parent is not None and parent != code) or any(
+                n is not None and n != code for n in neighbors
+            ):
+                refine.append((col, row, code))
+        if not refine:
+            break
+        cols, rows, codes = (np.array(v) for v in zip(*refine))
+        i = np.concatenate([2 * cols, 2 * cols + 1, 2 * cols, 2 * cols + 1])
+        j = np.concatenate([2 * rows, 2 * rows, 2 * rows + 1, 2 * rows + 1])
+        parents = codes.tolist() * 4
+        size /= 2
+    return (
+        np.concatenate(samples_x),
+        np.concatenate(samples_y),
+        np.concatenate(samples_codes),
+    )
+
+
+def coordinates_to_points(x, y) -> list[dict]:
+    """
+    Converts arrays of coordinates into GeoJSON ``Point`` geometries.
+
+    :param x: An array of x coordinates.
+    :param y: An array of y coordinates.
+    :return: A list of dictionaries representing points in GeoJSON format.
+    """
+    return [
+        {"type": "Point", "coordinates": [x, y]}
+        for x, y in zip(
+            np.asarray(x, dtype=float).tolist(), np.asarray(y, dtype=float).tolist()
+        )
+    ]
+
+
+def split_polygon(polygon: shapely.Polygon, size: float) -> List[shapely.Polygon]:
+    """
+    Splits a polygon into tiles along a grid of square cells.
+
+    :param polygon: A Shapely Polygon object.
+    :param size: The size of the grid cells in the same units as the
+        polygon's coordinates. The grid is aligned to multiples of the size,
+        so tiles of neighboring polygons share the same grid.
+    :return: A list of the non-empty polygonal parts of the polygon within
+        each cell.
+    """
+    min_x, min_y, max_x, max_y = polygon.bounds
+    cols = np.arange(np.floor(min_x / size), np.ceil(max_x / size)) * size
+    rows = np.arange(np.floor(min_y / size), np.ceil(max_y / size)) * size
+    x, y = np.meshgrid(cols, rows, indexing="ij")
+    cells = shapely.box(x.ravel(), y.ravel(), x.ravel() + size, y.ravel() + size)
+    shapely.prepare(polygon)
+    cells = cells[shapely.intersects(polygon, cells)]
+    parts = shapely.get_parts(shapely.intersection(cells, polygon))
+    tiles = [part for part in parts if part.geom_type == "Polygon" and part.area > 0]
+    logger.debug(f"Split polygon into {len(tiles)} tiles of size {size}")
+    return tiles
+
+
+def exceeds_size(geometry: Geometry, size: float) -> bool:
+    """
+    Checks if a ``Polygon`` geometry extends beyond one grid cell of the given
+    size in either dimension (see ``split_polygon``).
+
+    :param geometry: A ``Geometry`` object.
+    :param size: The size of the grid cells.
+    :return: ``True`` if the geometry is a ``Polygon`` larger than the size.
+    """
+    if geometry.geometry_type() != "Polygon":
+        return False
+    min_x, min_y, max_x, max_y = geometry.to_shapely().bounds
+    tolerance = size * 1e-9  # Tiles of exactly one cell are not split again
+    return max(max_x - min_x, max_y - min_y) > size + tolerance
+
+
+def sample_line(line: shapely.LineString, spacing: float) -> tuple:
+    """
+    Generates points at a regular spacing along a line, densifying long
+    segments and decimating dense vertices alike.
+
+    :param line: A Shapely LineString object in EPSG:4326.
+    :param spacing: The distance between points along the line, in the same
+        units as the line's coordinates (e.g., the native resolution of a
+        data source).
+    :return: A tuple of arrays ``(x, y, distance)`` of the coordinates of the
+        points, from the start to the end of the line (which are always
+        included), and of their geodesic distance along the line from its
+        start in meters.
+    """
+    line = shapely.force_2d(line)
+    count = max(int(np.ceil(line.length / spacing)), 1) + 1
+    points = shapely.line_interpolate_point(line, np.linspace(0, line.length, count))
+    x, y = shapely.get_x(points), shapely.get_y(points)
+    _, _, steps = GEOD.inv(x[:-1], y[:-1], x[1:], y[1:])
+    distance = np.concatenate([[0], np.cumsum(steps)])
+    logger.debug(f"Sampled {count} points along a line of {distance[-1]:.0f} m")
+    return x, y, distance
+
+
+def drop_repeated_cells(x, y, transform: tuple) -> np.ndarray:
+    """
+    Finds the points of a sequence (e.g., along a line) that fall in a
+    different cell of a raster grid than the preceding point. Consecutive
+    points in the same cell resolve to the same class, so only the first of
+    them needs to be resolved.
+
+    :param x: An array of x coordinates.
+    :param y: An array of y coordinates.
+    :param transform: A GDAL-style geotransform ``(x_origin, pixel_width, 0,
+        y_origin, 0, pixel_height)`` of the grid.
+    :return: An array of the indices of the points to keep, including the
+        first point.
+    """
+    x_origin, pixel_width, _, y_origin, _, pixel_height = transform
+    cols = np.floor((np.asarray(x, dtype=float) - x_origin) / pixel_width)
+    rows = np.floor((np.asarray(y, dtype=float) - y_origin) / pixel_height)
+    changed = np.ones(len(cols), dtype=bool)
+    changed[1:] = (np.diff(cols) != 0) | (np.diff(rows) != 0)
+    return np.flatnonzero(changed)
+
+
+def snap_to_pixels(x, y, transform: tuple) -> tuple:
+    """
+    Snaps coordinates to the centers of the pixels of a raster grid, keeping
+    at most one point per pixel.
+
+    Points falling within the same pixel always resolve to the same class,
+    so only the first point of each pixel is kept, in the order of the input.
+
+    :param x: An array of x coordinates.
+    :param y: An array of y coordinates.
+    :param transform: A GDAL-style geotransform ``(x_origin, pixel_width, 0,
+        y_origin, 0, pixel_height)`` of the grid.
+    :return: A tuple of arrays ``(x, y)`` of the centers of the distinct
+        pixels containing the points.
+    """
+    x_origin, pixel_width, _, y_origin, _, pixel_height = transform
+    cols = np.floor((np.asarray(x, dtype=float) - x_origin) / pixel_width)
+    rows = np.floor((np.asarray(y, dtype=float) - y_origin) / pixel_height)
+    _, first = np.unique(np.column_stack([rows, cols]), axis=0, return_index=True)
+    first = np.sort(first)
+    logger.debug(f"Snapped {len(cols)} points to {len(first)} pixels")
+    return (
+        x_origin + (cols[first] + 0.5) * pixel_width,
+        y_origin + (rows[first] + 0.5) * pixel_height,
+    )
+
+
 def grid_sample_polygon(polygon: shapely.Polygon, grid_size: float) -> gpd.GeoSeries:
     """
     Generates a set of representative points within a polygon using grid-based
-    sampling.
+    sampling (see ``grid_sample_coordinates``).
 
     :param polygon: A Shapely Polygon object.
     :param grid_size: The size of the grid cells in the same units as the
@@ -215,41 +1207,103 @@ def grid_sample_polygon(polygon: shapely.Polygon, grid_size: float) -> gpd.GeoSe
 
     # pylint: disable=broad-exception-caught
     try:
-        min_x, min_y, max_x, max_y = polygon.bounds
-        logger.debug(
-            f"Polygon bounds: min_x={min_x}, min_y={min_y}, "
-            f"max_x={max_x}, max_y={max_y}"
-        )
-        cols = np.arange(min_x, max_x + grid_size, grid_size)
-        rows = np.arange(min_y, max_y + grid_size, grid_size)
-
-        grid_cells = []
-        for x in cols:
-            for y in rows:
-                grid_cell = Polygon(
-                    [
-                        (x, y),
-                        (x + grid_size, y),
-                        (x + grid_size, y + grid_size),
-                        (x, y + grid_size),
-                    ]
-                )
-                grid_cells.append(grid_cell)
-        logger.debug(f"Generated {len(grid_cells)} grid cells")
-
-        grid_gdf = gpd.GeoDataFrame(geometry=grid_cells)
-        intersecting_cells = grid_gdf[grid_gdf.intersects(polygon)]
-        logger.debug(
-            f"{len(intersecting_cells)} grid cells intersect with " f"the polygon"
-        )
-
-        sample_points = intersecting_cells.centroid
-        sample_points = sample_points[sample_points.within(polygon)]
-        logger.debug(
-            f"Generated {len(sample_points)} sample points within the " f"polygon"
-        )
-
-        return sample_points
+        x, y = grid_sample_coordinates(polygon, grid_size)
+        return gpd.GeoSeries(shapely.points(x, y))
     except Exception as e:
         logger.error(f"Failed to generate sample points: {e}", exc_info=True)
         return gpd.GeoSeries()
+
+
+def match_within_distance(
+    x: np.ndarray, y: np.ndarray, target_x: np.ndarray, target_y: np.ndarray, distance
+) -> tuple:
+    """
+    Finds all pairs of points and target points that are within a geodesic
+    distance of each other. Candidate pairs are found with a spatial index
+    (``shapely.STRtree``), then filtered by their geodesic distance on the
+    WGS84 ellipsoid.
+
+    :param x: An array of x coordinates (longitude) of the points.
+    :param y: An array of y coordinates (latitude) of the points.
+    :param target_x: An array of x coordinates (longitude) of the targets.
+    :param target_y: An array of y coordinates (latitude) of the targets.
+    :param distance: The maximum distance in meters.
+    :return: A tuple of integer arrays ``(i, j)`` indexing the matched points
+        and targets, respectively.
+    """
+    x, y = np.asarray(x, dtype=float), np.asarray(y, dtype=float)
+    target_x = np.asarray(target_x, dtype=float)
+    target_y = np.asarray(target_y, dtype=float)
+    if len(x) == 0 or len(target_x) == 0:
+        return np.array([], dtype=np.int64), np.array([], dtype=np.int64)
+
+    # Search boxes large enough to contain the distance at any latitude
+    # (~111 km per degree of latitude, shrinking by cos(latitude) for
+    # longitude).
+    half_height = distance / 110_000
+    cos_lat = np.cos(np.radians(np.clip(np.abs(y) + half_height, 0, 89.9)))
+    half_width = np.minimum(half_height / cos_lat, 180)
+    boxes = shapely.box(
+        x - half_width, y - half_height, x + half_width, y + half_height
+    )
+    tree = shapely.STRtree(shapely.points(target_x, target_y))
+    i, j = tree.query(boxes, predicate="intersects")
+
+    _, _, meters = GEOD.inv(x[i], y[i], target_x[j], target_y[j])
+    within = meters <= distance
+    return i[within], j[within]
+
+
+def buffer_points(x, y, distance) -> np.ndarray:
+    """
+    Computes the envelopes of geodesic buffers around arrays of points.
+
+    Each buffer is a circle on the WGS84 ellipsoid, traced by solving the
+    forward geodesic problem at evenly spaced azimuths for all points at
+    once. Unlike buffering in a projected CRS, this is accurate at any
+    location.
+
+    :param x: An array of x coordinates (longitude) of the points.
+    :param y: An array of y coordinates (latitude) of the points.
+    :param distance: The buffer distance in meters, as a scalar or an array
+        of one distance per point.
+    :return: An array of shape ``(n, 4)`` of ``(minx, miny, maxx, maxy)``
+        envelopes. Longitudes are continuous across the antimeridian (i.e.,
+        may be outside -180 to 180), and latitudes are clipped to the poles.
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    distance = np.broadcast_to(np.asarray(distance, dtype=float), x.shape)
+    azimuths = np.linspace(0, 360, BUFFER_AZIMUTHS, endpoint=False)
+    lons, lats, _ = GEOD.fwd(
+        np.repeat(x, len(azimuths)),
+        np.repeat(y, len(azimuths)),
+        np.tile(azimuths, len(x)),
+        np.repeat(distance, len(azimuths)),
+    )
+    dlon = (lons.reshape(-1, len(azimuths)) - x[:, None] + 180) % 360 - 180
+    lats = lats.reshape(-1, len(azimuths))
+    return np.column_stack(
+        [
+            x + dlon.min(axis=1),
+            np.maximum(lats.min(axis=1), -90),
+            x + dlon.max(axis=1),
+            np.minimum(lats.max(axis=1), 90),
+        ]
+    )
+
+
+def envelope_to_polygon(bounds) -> dict:
+    """
+    Converts an envelope into a GeoJSON ``Polygon``.
+
+    :param bounds: A sequence of ``(minx, miny, maxx, maxy)``.
+    :return: A dictionary representing the polygon in GeoJSON format.
+    """
+    minx, miny, maxx, maxy = (float(b) for b in bounds)
+    return {
+        "type": "Polygon",
+        "coordinates": [
+            [[minx, miny], [maxx, miny], [maxx, maxy], [minx, maxy], [minx, miny]]
+        ],
+    }
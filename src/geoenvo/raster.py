@@ -0,0 +1,201 @@
+"""
+*raster.py*
+"""
+
+import json
+from pathlib import Path
+from typing import Union
+
+import daiquiri
+import numpy as np
+
+logger = daiquiri.getLogger(__name__)
+
+
+class Raster:
+    """
+    The Raster class provides vectorized point lookups against a single band,
+    georeferenced grid of integer class codes (e.g., a local copy of the World
+    Terrestrial Ecosystems raster).
+
+    The grid is described by a GDAL-style geotransform
+    ``(x_origin, pixel_width, 0, y_origin, 0, pixel_height)``, where the
+    origin is the upper-left corner of the grid and ``pixel_height`` is
+    negative for north-up rasters. Coordinates are in the same units as the
+    geotransform (decimal degrees for EPSG:4326).
+
+    The array may be a ``numpy.memmap`` (see ``from_file``), in which case a
+    lookup only reads the pages of the file that contain the requested
+    pixels.
+    """
+
+    def __init__(self, array, transform: tuple, nodata: int = None):
+        """
+        Initializes a Raster object.
+
+        :param array: A two-dimensional array-like object of class codes, or
+            an open ``rasterio`` dataset for windowed, block-wise reads.
+        :param transform: A GDAL-style geotransform of six numbers.
+        :param nodata: The value representing missing data (optional).
+        """
+        self._array = array
+        self._transform = tuple(float(t) for t in transform)
+        self._nodata = nodata
+
+    @property
+    def array(self):
+        """
+        Retrieves the underlying array (or dataset) of class codes.
+
+        :return: The array-like object of class codes.
+        """
+        return self._array
+
+    @property
+    def transform(self) -> tuple:
+        """
+        Retrieves the GDAL-style geotransform of the raster.
+
+        :return: A tuple of six numbers.
+        """
+        return self._transform
+
+    @property
+    def nodata(self) -> int:
+        """
+        Retrieves the value representing missing data.
+
+        :return: The nodata value, or ``None`` if not defined.
+        """
+        return self._nodata
+
+    @property
+    def shape(self) -> tuple:
+        """
+        Retrieves the number of rows and columns of the raster.
+
+        :return: A tuple of ``(rows, columns)``.
+        """
+        if hasattr(self.array, "height"):  # rasterio dataset
+            return self.array.height, self.array.width
+        return self.array.shape[-2:]
+
+    @classmethod
+    def from_file(
+        cls, path: Union[str, Path], transform: tuple = None, nodata: int = None
+    ) -> "Raster":
+        """
+        Opens a raster of class codes from local file without reading it into
+        memory.
+
+        Two formats are supported:
+
+        - **NumPy** (``.npy``): The array is memory-mapped. The geotransform
+          (and optionally the nodata value) is read from the ``transform``
+          parameter, or from a sidecar JSON file of the same name (e.g.,
+          ``wte.npy.json``) with the keys ``transform`` and ``nodata``.
+        - **GeoTIFF** (``.tif``, ``.tiff``, including COGs): The file is opened
+          with the optional ``rasterio`` dependency and read block-by-block
+          on demand.
+
+        :param path: The path to the raster file.
+        :param transform: A GDAL-style geotransform (optional for GeoTIFF).
+        :param nodata: The value representing missing data (optional).
+        :return: A Raster object.
+        """
+        path = Path(path)
+        logger.debug(f"Opening raster from {path}")
+        if path.suffix.lower() == ".npy":
+            sidecar = path.with_name(path.name + ".json")
+            if sidecar.exists():
+                with open(sidecar, "r", encoding="utf-8") as f:
+                    metadata = json.load(f)
+                transform = transform or metadata.get("transform")
+                nodata = nodata if nodata is not None else metadata.get("nodata")
+            if transform is None:
+                raise ValueError(f"No geotransform provided for {path}")
+            array = np.load(path, mmap_mode="r")
+            return cls(array, transform, nodata)
+        if path.suffix.lower() in [".tif", ".tiff"]:
+            try:
+                # pylint: disable=import-outside-toplevel
+                # pylint: disable=import-error
+                import rasterio
+            except ImportError as e:
+                raise ImportError(
+                    "Reading GeoTIFF files requires the optional 'rasterio' "
+                    "dependency (e.g., 'pip install geoenvo[raster]')."
+                ) from e
+            dataset = rasterio.open(path)
+            transform = transform or dataset.transform.to_gdal()
+            nodata = nodata if nodata is not None else dataset.nodata
+            return cls(dataset, transform, nodata)
+        raise ValueError(f"Unsupported raster format: {path.suffix}")
+
+    def index(self, x, y) -> tuple:
+        """
+        Converts coordinates to pixel row and column indices.
+
+        :param x: An array of x coordinates (longitude).
+        :param y: An array of y coordinates (latitude).
+        :return: A tuple of integer arrays ``(rows, cols)``.
+        """
+        x_origin, pixel_width, _, y_origin, _, pixel_height = self.transform
+        cols = np.floor((np.asarray(x, dtype=float) - x_origin) / pixel_width)
+        rows = np.floor((np.asarray(y, dtype=float) - y_origin) / pixel_height)
+        return rows.astype(np.int64), cols.astype(np.int64)
+
+    def sample(self, x, y) -> np.ma.MaskedArray:
+        """
+        Reads the class codes at the given coordinates.
+
+        :param x: An array of x coordinates (longitude).
+        :param y: An array of y coordinates (latitude).
+        :return: A masked integer array of class codes. Coordinates outside the
+            raster extent, or falling on nodata pixels, are masked.
+        """
+        rows, cols = self.index(np.atleast_1d(x), np.atleast_1d(y))
+        n_rows, n_cols = self.shape
+        inside = (rows >= 0) & (rows < n_rows) & (cols >= 0) & (cols < n_cols)
+        values = np.zeros(rows.shape, dtype=np.int64)
+        if inside.any():
+            values[inside] = self._read(rows[inside], cols[inside])
+        mask = ~inside
+        if self.nodata is not None:
+            mask |= values == self.nodata
+        logger.debug(f"Sampled {len(values)} pixels, {int(mask.sum())} missing")
+        return np.ma.masked_array(values, mask=mask)
+
+    # pylint: disable=too-many-locals
+    def _read(self, rows: np.ndarray, cols: np.ndarray) -> np.ndarray:
+        """
+        Reads pixel values at in-bounds row and column indices.
+
+        :param rows: An array of row indices.
+        :param cols: An array of column indices.
+        :return: An array of pixel values.
+        """
+        if not hasattr(self.array, "block_shapes"):  # array or memmap
+            return np.asarray(self.array[rows, cols])
+
+        # Read each touched block of the dataset once, then index into it
+        # pylint: disable=import-outside-toplevel
+        # pylint: disable=import-error
+        from rasterio.windows import Window
+
+        block_height, block_width = self.array.block_shapes[0]
+        block_rows = rows // block_height
+        block_cols = cols // block_width
+        blocks = block_rows * (cols.max() // block_width + 1) + block_cols
+        order = np.argsort(blocks, kind="stable")
+        _, starts = np.unique(blocks[order], return_index=True)
+        values = np.zeros(rows.shape, dtype=np.int64)
+        for selected in np.split(order, starts[1:]):
+            row_offset = block_rows[selected][0] * block_height
+            col_offset = block_cols[selected][0] * block_width
+            window = Window(col_offset, row_offset, block_width, block_height)
+            data = self.array.read(1, window=window, boundless=True)
+            values[selected] = data[
+                rows[selected] - row_offset, cols[selected] - col_offset
+            ]
+        return values
@@ -5,10 +5,16 @@ The primary client-facing API for resolving spatial geometries to environmental
 descriptions.
 """
 
-from typing import List
+from typing import List, Union
 import daiquiri
 from geoenvo.data_sources.data_source import DataSource
-from geoenvo.geometry import Geometry
+from geoenvo.environment import merge_environments
+from geoenvo.geometry import (
+    Geometry,
+    GeometryArray,
+    reproject_geometries,
+    split_parts,
+)
 from geoenvo.response import construct_response, Response
 
 logger = daiquiri.getLogger(__name__)
@@ -64,6 +70,12 @@ class Resolver:
         configured data sources. The results are mapped to a semantic resource
         (e.g., ENVO) and returned as a ``Response`` object.
 
+        The parts of a multipart geometry (e.g., ``MultiPolygon``) are
+        resolved together with each data source's ``get_environments``, and
+        their environments are merged without duplicates. Geometries in a
+        coordinate reference system other than EPSG:4326 are reprojected
+        first, and the response holds the reprojected geometry.
+
         :param geometry: The spatial geometry to resolve.
         :param semantic_resource: The semantic resource to use for mapping
             (default: "ENVO").
@@ -80,9 +92,14 @@ class Resolver:
         )
         # pylint: disable=broad-exception-caught
         try:
+            geometry = geometry.to_wgs84()
             results = []
             for item in self.data_source:
-                environment = item.get_environment(geometry)
+                if geometry.is_multipart():
+                    parts = item.get_environments(geometry.parts())
+                    environment = merge_environments(parts)
+                else:
+                    environment = item.get_environment(geometry)
                 results.extend(environment)
             result = construct_response(
                 geometry=geometry,
@@ -98,6 +115,74 @@ class Resolver:
             result = construct_response(geometry=geometry, environment=[])
             return result
 
+    # pylint: disable=too-many-locals
+    def resolve_batch(
+        self,
+        geometries: Union[List[Geometry], GeometryArray],
+        semantic_resource: str = "ENVO",
+        identifier: List[str] = None,
+        description: List[str] = None,
+    ) -> List[Response]:
+        """
+        Resolves a list of ``Geometry`` objects to environments using the
+        configured data sources. Each data source receives the full list of
+        geometries at once, enabling bulk resolution where supported (e.g.,
+        ``WorldTerrestrialEcosystems`` with a local ``raster``). Multipart
+        geometries are split into parts, which are resolved along with the
+        other geometries, and their environments are merged. Geometries in
+        other coordinate reference systems than EPSG:4326 are reprojected once
+        for the batch, with one transformation per system.
+
+        :param geometries: The spatial geometries to resolve, as a list of
+            ``Geometry`` objects or a ``GeometryArray``.
+        :param semantic_resource: The semantic resource to use for mapping
+            (default: "ENVO").
+        :param identifier: An optional list of identifiers, one per geometry.
+            Defaults to the ``ids`` of a ``GeometryArray``.
+        :param description: An optional list of descriptions, one per
+            geometry.
+        :return: A list of ``Response`` objects, in the order of the input
+            geometries.
+        """
+        logger.info(f"Resolving batch of {len(geometries)} geometries")
+        if identifier is None and isinstance(geometries, GeometryArray):
+            if geometries.ids is not None:
+                identifier = [str(i) for i in geometries.ids.tolist()]
+        identifier = identifier or [None] * len(geometries)
+        description = description or [None] * len(geometries)
+        geometries = reproject_geometries(geometries)
+        results = [[] for _ in geometries]
+        parts, owners = split_parts(geometries)
+        for item in self.data_source:
+            # pylint: disable=broad-exception-caught
+            try:
+                environments = item.get_environments(parts)
+            except Exception as e:
+                logger.error(
+                    f"Failed to resolve batch with {item.__class__.__name__}: {e}",
+                    exc_info=True,
+                )
+                continue
+            if owners is not None:
+                grouped = [[] for _ in geometries]
+                for owner, environment in zip(owners, environments):
+                    grouped[owner].append(environment)
+                environments = [merge_environments(group) for group in grouped]
+            for result, environment in zip(results, environments):
+                result.extend(environment)
+        responses = []
+        for i, geometry in enumerate(geometries):
+            response = construct_response(
+                geometry=geometry,
+                environment=results[i],
+                identifier=identifier[i],
+                description=description[i],
+            )
+            response.apply_term_mapping(semantic_resource)
+            responses.append(response)
+        logger.info(f"Resolution complete for batch of {len(geometries)} geometries")
+        return responses
+
 
 # if __name__ == "__main__":
 #
@@ -4,6 +4,7 @@
 
 import importlib
 import json
+from functools import lru_cache
 from typing import List, Union
 
 import daiquiri
@@ -110,7 +111,6 @@ class Response:
             )
         return self
 
-    # pylint: disable=too-many-locals
     def apply_term_mapping(self, semantic_resource: str = "ENVO") -> "Response":
         """
         Maps environmental terms in the response data to a specified semantic
@@ -128,59 +128,19 @@ class Response:
         # Iterate over list of environments in data
         for environment in self.data["properties"]["environment"]:
 
-            # Load SSSOM of environment for term mapping
+            # Map each property value to semantic resource term, if possible
             data_source = environment["dataSource"]["name"]
-            sssom_file = importlib.resources.files("geoenvo.data.sssom").joinpath(
-                f"{data_source}-{semantic_resource.lower()}.sssom.tsv"
+            envo_terms = map_terms(
+                data_source,
+                semantic_resource,
+                tuple(environment["properties"].values()),
             )
-            if not sssom_file.exists():
-                logger.warning(
-                    f"Mapping file {sssom_file} not found. Skipping term "
-                    f"mapping for {data_source}."
-                )
-                return []
-            sssom_meta_file = importlib.resources.files("geoenvo.data.sssom").joinpath(
-                f"{data_source}-{semantic_resource.lower()}.sssom.yml"
-            )
-            if not sssom_meta_file.exists():
-                logger.warning(
-                    f"Metadata file {sssom_meta_file} not found. Skipping term "
-                    f"mapping for {data_source}."
-                )
+            if envo_terms is None:
                 return []
-            with open(sssom_file, mode="r", encoding="utf-8") as f:
-                sssom = pd.read_csv(f, sep="\t")
-            with open(sssom_meta_file, mode="r", encoding="utf-8") as f:
-                sssom_meta = safe_load(f)
-
-            # Map each property value to semantic resource term, if possible
-            envo_terms = []
-            for _, value in environment["properties"].items():
-                try:
-                    label = sssom.loc[
-                        sssom["subject_label"].str.lower() == value.lower(),
-                        "object_label",
-                    ].values[0]
-                    curie = sssom.loc[
-                        sssom["subject_label"].str.lower() == value.lower(), "object_id"
-                    ].values[0]
-                    curie_prefix = curie.split(":")[0]
-                    uri = sssom_meta["curie_map"][curie_prefix] + curie.split(":")[1]
-                    logger.debug(f"Mapped '{value}' to '{label}' ({uri})")
-                except IndexError:
-                    label = None
-                    uri = None
-                    logger.debug(f"No mapping found for '{value}' in {data_source}")
-
-                # Don't add empty labels. Empty implies no mapping was found.
-                if pd.notna(label) and uri is not None:
-                    # Unmappable objects are useless. Don't add them.
-                    if curie.lower() != "sssom:nomapping":
-                        envo_terms.append({"label": label, "uri": uri})
 
             # Add list of semantic resource terms back to the environment
             # object
-            environment["mappedProperties"] = envo_terms
+            environment["mappedProperties"] = [dict(term) for term in envo_terms]
 
         logger.info(
             f"Term mapping complete. Mapped terms added to "
@@ -330,3 +290,91 @@ def construct_response(
     }
     logger.debug(f"Compiled response with {len(environments)} environments")
     return Response(result)
+
+
+@lru_cache(maxsize=None)
+def load_term_mapping(data_source: str, semantic_resource: str) -> Union[dict, None]:
+    """
+    Loads the SSSOM mapping set of a data source into a lookup of subject
+    labels to semantic resource terms. Mapping sets are read from file once
+    per process.
+
+    :param data_source: The name of the data source (e.g.,
+        "WorldTerrestrialEcosystems").
+    :param semantic_resource: The semantic resource to map to (e.g., "ENVO").
+    :return: A dictionary mapping lower case subject labels to term
+        dictionaries with the keys ``label`` and ``uri``, or to ``None`` if the
+        subject is unmappable. Returns ``None`` if no mapping set exists.
+    """
+    sssom_file = importlib.resources.files("geoenvo.data.sssom").joinpath(
+        f"{data_source}-{semantic_resource.lower()}.sssom.tsv"
+    )
+    if not sssom_file.exists():
+        logger.warning(
+            f"Mapping file {sssom_file} not found. Skipping term "
+            f"mapping for {data_source}."
+        )
+        return None
+    sssom_meta_file = importlib.resources.files("geoenvo.data.sssom").joinpath(
+        f"{data_source}-{semantic_resource.lower()}.sssom.yml"
+    )
+    if not sssom_meta_file.exists():
+        logger.warning(
+            f"Metadata file {sssom_meta_file} not found. Skipping term "
+            f"mapping for {data_source}."
+        )
+        return None
+    with open(sssom_file, mode="r", encoding="utf-8") as f:
+        sssom = pd.read_csv(f, sep="\t")
+    with open(sssom_meta_file, mode="r", encoding="utf-8") as f:
+        sssom_meta = safe_load(f)
+
+    # Only the first mapping of a subject label is used
+    lookup = {}
+    for row in sssom.itertuples(index=False):
+        subject = str(row.subject_label).lower()
+        if subject in lookup:
+            continue
+        label = row.object_label
+        curie = row.object_id
+        # Don't add empty labels. Empty implies no mapping was found.
+        # Unmappable objects are useless. Don't add them either.
+        if pd.isna(label) or curie.lower() == "sssom:nomapping":
+            lookup[subject] = None
+            continue
+        curie_prefix, curie_suffix = curie.split(":")[0], curie.split(":")[1]
+        uri = sssom_meta["curie_map"][curie_prefix] + curie_suffix
+        lookup[subject] = (("label", label), ("uri", uri))
+    return lookup
+
+
+@lru_cache(maxsize=4096)
+def map_terms(
+    data_source: str, semantic_resource: str, values: tuple
+) -> Union[tuple, None]:
+    """
+    Maps the property values of an environment to semantic resource terms.
+    Results are memoized, so each distinct environment class is mapped once
+    per process.
+
+    :param data_source: The name of the data source.
+    :param semantic_resource: The semantic resource to map to (e.g., "ENVO").
+    :param values: A tuple of environment property values.
+    :return: A tuple of terms, each a tuple of ``(key, value)`` pairs that
+        can be converted to a dictionary with the keys ``label`` and ``uri``.
+        Returns ``None`` if no mapping set exists for the data source.
+    """
+    lookup = load_term_mapping(data_source, semantic_resource)
+    if lookup is None:
+        return None
+    terms = []
+    for value in values:
+        if not isinstance(value, str):
+            continue
+        term = lookup.get(value.lower())
+        if term is None:
+            logger.debug(f"No mapping found for '{value}' in {data_source}")
+            continue
+        logger.debug(f"Mapped '{value}' to '{term[0][1]}' ({term[1][1]})")
+        terms.append(term)
+    return tuple(terms)
@@ -0,0 +1,99 @@
+"""
+*segments.py*
+"""
+
+from pathlib import Path
+from typing import List, Union
+
+import daiquiri
+import geopandas as gpd
+import numpy as np
+import shapely
+
+logger = daiquiri.getLogger(__name__)
+
+
+class SegmentStore:
+    """
+    The SegmentStore class provides bulk intersection queries against a local
+    copy of a vector dataset of classified features (e.g., the 1 km coastal
+    segments of the Ecological Coastal Units), indexed with a
+    ``shapely.STRtree``.
+
+    Lookups return dictionaries in the format of the GeoJSON response of the
+    online data source, which can then be converted to ``Environment`` objects
+    the same way.
+    """
+
+    def __init__(self, geometries, descriptors, descriptor: str = "CSU_Descriptor"):
+        """
+        Initializes a SegmentStore object.
+
+        :param geometries: An array of shapely geometries of the features.
+        :param descriptors: An array of the class descriptor of each feature.
+        :param descriptor: The name of the descriptor property in responses.
+        """
+        self._geometries = np.asarray(geometries, dtype=object)
+        self._descriptors = list(descriptors)
+        self._descriptor = descriptor
+        self._tree = shapely.STRtree(self._geometries)
+        logger.debug(f"Indexed {len(self._descriptors)} features")
+
+    def __len__(self) -> int:
+        return len(self._descriptors)
+
+    @classmethod
+    def from_file(
+        cls, path: Union[str, Path], descriptor: str = "CSU_Descriptor"
+    ) -> "SegmentStore":
+        """
+        Loads a segment store from a local file.
+
+        GeoParquet files (``.parquet``, ``.geoparquet``) are read with the
+        optional ``pyarrow`` dependency. Other formats (e.g., GeoPackage or
+        GeoJSON) are read with ``geopandas.read_file``. Features are
+        reprojected to EPSG:4326 if needed.
+
+        :param path: The path to the file.
+        :param descriptor: The name of the column of class descriptors.
+        :return: A SegmentStore object.
+        """
+        path = Path(path)
+        logger.debug(f"Opening segment store from {path}")
+        if path.suffix.lower() in [".parquet", ".geoparquet"]:
+            try:
+                table = gpd.read_parquet(path, columns=["geometry", descriptor])
+            except ImportError as e:
+                message = (
+                    "The optional 'pyarrow' dependency is required (e.g., "
+                    "'pip install geoenvo[parquet]')."
+                )
+                raise ImportError(message) from e
+        else:
+            table = gpd.read_file(path, columns=[descriptor])
+        if table.crs is not None and table.crs.to_epsg() != 4326:
+            table = table.to_crs(4326)
+        table = table[table.geometry.notna()]
+        return cls(table.geometry.to_numpy(), table[descriptor].tolist(), descriptor)
+
+    def query(self, geometries: List[dict]) -> List[dict]:
+        """
+        Finds the features intersecting each of a list of geometries, with a
+        single bulk query of the spatial index.
+
+        :param geometries: A list of GeoJSON geometries, or shapely geometries.
+        :return: A list of dictionaries, one per geometry, in the format of the
+            GeoJSON response of a single query.
+        """
+        shapes = [
+            g if isinstance(g, shapely.Geometry) else shapely.geometry.shape(g)
+            for g in geometries
+        ]
+        i, j = self._tree.query(shapely.force_2d(shapes), predicate="intersects")
+        results = [{"type": "FeatureCollection", "features": []} for _ in shapes]
+        for geometry, feature in zip(i.tolist(), j.tolist()):
+            results[geometry]["features"].append(
+                {"properties": {self._descriptor: self._descriptors[feature]}}
+            )
+        logger.debug(f"Found {len(i)} intersections for {len(shapes)} geometries")
+        return results
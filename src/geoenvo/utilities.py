@@ -2,7 +2,9 @@
 *utilities.py*
 """
 
+from collections import OrderedDict
 from datetime import datetime
+from threading import Lock
 
 import daiquiri
 
@@ -130,3 +132,70 @@ def user_agent() -> dict:
     """
     header = {"user-agent": "geoenvo Python package"}
     return header
+
+
+class LRUCache:
+    """
+    A bounded, thread-safe mapping that evicts the least recently used item
+    once the maximum size is reached.
+    """
+
+    def __init__(self, maxsize: int = 128):
+        """
+        Initializes an empty cache.
+
+        :param maxsize: The maximum number of items to keep.
+        """
+        self._maxsize = maxsize
+        self._items = OrderedDict()
+        self._lock = Lock()
+
+    @property
+    def maxsize(self) -> int:
+        """
+        Retrieves the maximum number of items kept in the cache.
+
+        :return: The maximum size as an integer.
+        """
+        return self._maxsize
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def __contains__(self, key) -> bool:
+        return key in self._items
+
+    def get(self, key, default=None):
+        """
+        Retrieves an item from the cache and marks it as recently used.
+
+        :param key: The key of the item.
+        :param default: The value returned if the key is not cached.
+        :return: The cached item, or ``default``.
+        """
+        with self._lock:
+            if key not in self._items:
+                return default
+            self._items.move_to_end(key)
+            return self._items[key]
+
+    def put(self, key, value) -> None:
+        """
+        Adds an item to the cache, evicting the least recently used item if
+        the cache is full.
+
+        :param key: The key of the item.
+        :param value: The item to cache.
+        """
+        with self._lock:
+            self._items[key] = value
+            self._items.move_to_end(key)
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+
+    def clear(self) -> None:
+        """
+        Removes all items from the cache.
+        """
+        with self._lock:
+            self._items.clear()
@@ -3,11 +3,18 @@
 import json
 import tempfile
 from importlib.resources import files
+import geopandas as gpd
+import numpy as np
 import pytest
+import shapely
+from geoenvo.columns import ColumnStore
 from geoenvo.geometry import Geometry
 from geoenvo.data_sources import EcologicalCoastalUnits
 from geoenvo.data_sources import EcologicalMarineUnits
 from geoenvo.data_sources import WorldTerrestrialEcosystems
+from geoenvo.data_sources.ecological_coastal_units import PROPERTIES as ECU_PROPERTIES
+from geoenvo.data_sources.ecological_marine_units import PROPERTIES as EMU_PROPERTIES
+from geoenvo.raster import Raster
 from geoenvo.response import Response, construct_response
 from geoenvo.utilities import EnvironmentDataModel
 
@@ -109,19 +116,7 @@ def scenarios(
 @pytest.fixture
 def raw_properties_of_ecological_coastal_units():
     """Raw properties of Ecological Coastal Units."""
-    return {
-        "Slope",
-        "Sinuosity",
-        "Erodibility",
-        "Temperature and Moisture Regime",
-        "River Discharge",
-        "Wave Height",
-        "Tidal Range",
-        "Marine Physical Environment",
-        "Turbidity",
-        "Chlorophyll",
-        "CSU_Descriptor",
-    }
+    return set(ECU_PROPERTIES)
 
 
 @pytest.fixture
@@ -145,17 +140,7 @@ def properties_of_ecological_coastal_units():
 @pytest.fixture
 def raw_properties_of_ecological_marine_units():
     """Raw properties of Ecological Marine Units."""
-    return {
-        "OceanName",
-        "Depth",
-        "Temperature",
-        "Salinity",
-        "Dissolved Oxygen",
-        "Nitrate",
-        "Phosphate",
-        "Silicate",
-        "EMU_Descriptor",
-    }
+    return set(EMU_PROPERTIES)
 
 
 @pytest.fixture
@@ -229,6 +214,74 @@ def data_model(mocker):
     return data
 
 
+@pytest.fixture
+def diagonal_raster(tmp_path):
+    """Create a raster of two environments (codes 175 and 176) split along a
+    diagonal, covering 4 by 4 degrees from the origin, with a given number of
+    pixels per side."""
+
+    def _diagonal_raster(pixels: int = 64) -> Raster:
+        indices = np.add.outer(np.arange(pixels), np.arange(pixels))
+        path = tmp_path / "wte.npy"
+        np.save(path, np.where(indices < pixels, 175, 176).astype(np.uint16))
+        size = 4 / pixels
+        return Raster.from_file(path, transform=(0, size, 0, 4, 0, -size))
+
+    return _diagonal_raster
+
+
+@pytest.fixture
+def square_polygon():
+    """A polygon covering the extent of the diagonal raster."""
+    return {
+        "type": "Polygon",
+        "coordinates": [[[0, 0], [4, 0], [4, 4], [0, 4], [0, 0]]],
+    }
+
+
+@pytest.fixture
+def column_store():
+    """Create a column store from the layers of a mocked EMU response,
+    optionally written to (and read from) a file with the fields of the
+    response."""
+
+    def _column_store(path=None) -> ColumnStore:
+        response = load_response("emu_success_point_on_ocean_with_depth").json()
+        features = response["features"][::-1]  # Layers are sorted on load
+        arrays = {
+            "x": [f["geometry"]["x"] for f in features],
+            "y": [f["geometry"]["y"] for f in features],
+        }
+        for attribute in ["UnitTop", "UnitBottom", "OceanName", "Name_2018"]:
+            arrays[attribute] = [f["attributes"][attribute] for f in features]
+        if path is None:
+            return ColumnStore(arrays.pop("x"), arrays.pop("y"), arrays)
+        np.savez(path, **arrays)
+        with open(str(path) + ".json", "w", encoding="utf-8") as f:
+            json.dump({"fields": response["fields"]}, f)
+        return ColumnStore.from_file(path)
+
+    return _column_store
+
+
+@pytest.fixture
+def coastal_segments() -> gpd.GeoDataFrame:
+    """A table of two coastal segments with descriptors of a mocked ECU
+    response."""
+    descriptors = [
+        f["properties"]["CSU_Descriptor"]
+        for f in load_response("ecu_success").json()["features"]
+    ]
+    return gpd.GeoDataFrame(
+        {"CSU_Descriptor": sorted(set(descriptors))[-2:]},
+        geometry=[
+            shapely.LineString([(-70.201, 42.0), (-70.201, 42.01)]),
+            shapely.LineString([(-70.301, 42.0), (-70.301, 42.01)]),
+        ],
+        crs=4326,
+    )
+
+
 def load_geometry(filename: str):
     """Load test geometry in JSON format."""
     with open(
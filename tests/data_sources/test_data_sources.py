@@ -1,5 +1,9 @@
 """Test the data_source modules"""
 
+from concurrent.futures import ThreadPoolExecutor
+from copy import deepcopy
+from geoenvo.geometry import Geometry
+
 
 def test_data_source_init(data_sources):
     """Test the DataSource class initialization"""
@@ -121,3 +125,32 @@ def test_properties(scenarios):
         default_value = data_source.properties
         data_source.properties = {"test": "test"}
         assert data_source.properties != default_value
+
+
+def test_stateless_resolution(scenarios, mocker):
+    """Test that resolution doesn't store per-call state on the data source.
+
+    The response and geometry of each call are passed to the conversion
+    methods, so the data source and the input geometry are left unchanged,
+    and one instance can serve concurrent resolutions."""
+    for scenario in scenarios:
+        data_source = scenario["data_source"]
+        mocker.patch(
+            "requests.get",
+            side_effect=lambda *_, s=scenario, **__: deepcopy(s["response"]),
+        )
+        properties = deepcopy(data_source.properties)
+        geometry = Geometry(scenario["geometry"])
+        geometry_data = deepcopy(geometry.data)
+        expected = [e.code for e in data_source.get_environment(geometry)]
+        assert data_source.data is None
+        assert data_source.geometry is None
+        assert data_source.properties == properties
+        assert geometry.data == geometry_data
+
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            results = executor.map(
+                data_source.get_environment, [Geometry(geometry_data)] * 8
+            )
+        for result in results:
+            assert [e.code for e in result] == expected
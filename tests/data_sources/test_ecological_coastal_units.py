@@ -1,9 +1,14 @@
 """Test the EcologicalCoastalUnits data source"""
 
+import numpy as np
 import pytest
-from geoenvo.geometry import Geometry
+from geoenvo.geometry import Geometry, GeometryArray
 from geoenvo.data_sources import EcologicalCoastalUnits
-from tests.conftest import load_geometry
+from geoenvo.data_sources.ecological_coastal_units import (
+    cluster_points,
+    parse_descriptor,
+)
+from tests.conftest import load_geometry, load_response, RequestsResponse
 
 
 def test_init():
@@ -45,3 +50,200 @@ def test_buffer(scenarios):
             buffer = 0.5
             data_source.buffer = buffer
             assert data_source.buffer == buffer
+
+
+def test_get_environments_with_batch_size(mocker):
+    """Test the get_environments method with batch_size set
+
+    Nearby buffered points are resolved with one query per cluster, and the
+    returned coastal units are assigned to the buffers they intersect."""
+    features = load_response("ecu_success").json()["features"][:2]
+    features[0]["geometry"] = {
+        "type": "LineString",
+        "coordinates": [[-70.201, 42.0], [-70.201, 42.01]],
+    }
+    features[1]["geometry"] = {
+        "type": "LineString",
+        "coordinates": [[-70.301, 42.0], [-70.301, 42.01]],
+    }
+    response = {"type": "FeatureCollection", "features": features}
+    mock = mocker.patch(
+        "requests.get", side_effect=lambda *_, **__: RequestsResponse(response, 200)
+    )
+    data_source = EcologicalCoastalUnits(buffer=0.5, batch_size=10)
+    geometries = [
+        Geometry({"type": "Point", "coordinates": [-70.2, 42.005]}),
+        Geometry({"type": "Point", "coordinates": [-70.3, 42.005]}),
+        Geometry({"type": "Point", "coordinates": [-70.25, 42.005]}),
+        Geometry({"type": "Point", "coordinates": [10, 10]}),
+    ]
+
+    result = data_source.get_environments(geometries)
+    assert mock.call_count == 2  # One query per cluster
+    assert mock.call_args_list[0].kwargs["params"]["returnGeometry"] == "true"
+    assert len(result[0]) == 1
+    assert len(result[1]) == 1
+    assert result[0][0].code != result[1][0].code
+    assert result[2] == []  # No coastal units within the buffer
+    assert geometries[0].data["type"] == "Point"  # Inputs are not modified
+
+
+def test_get_environments_with_failed_page(mocker):
+    """Test the get_environments method when a later page of a cluster fails
+
+    Pages are ordered by a unique field, and a failed page discards the
+    earlier pages of the cluster rather than returning a partial result."""
+    features = load_response("ecu_success").json()["features"][:1]
+    features[0]["geometry"] = {
+        "type": "LineString",
+        "coordinates": [[-70.201, 42.0], [-70.201, 42.01]],
+    }
+    first_page = {
+        "type": "FeatureCollection",
+        "features": features,
+        "properties": {"exceededTransferLimit": True},
+    }
+    mock = mocker.patch(
+        "requests.get",
+        side_effect=[RequestsResponse(first_page, 200), ConnectionError],
+    )
+    data_source = EcologicalCoastalUnits(buffer=0.5, batch_size=10)
+    geometries = [
+        Geometry({"type": "Point", "coordinates": [-70.2, 42.005]}),
+        Geometry({"type": "Point", "coordinates": [-70.25, 42.005]}),
+    ]
+
+    result = data_source.get_environments(geometries)
+    assert mock.call_count == 2
+    for call in mock.call_args_list:
+        assert call.kwargs["params"]["orderByFields"] == "OBJECTID"
+    assert mock.call_args_list[1].kwargs["params"]["resultOffset"] == "1"
+    assert result == [[], []]
+
+
+def test_get_environments_with_store(mocker, tmp_path, coastal_segments):
+    """Test the get_environments method with a local segment store
+
+    Buffered points and polygons are resolved offline in one bulk query."""
+    mock = mocker.patch("requests.get")
+    path = tmp_path / "ecu.gpkg"
+    coastal_segments.to_file(path)
+    data_source = EcologicalCoastalUnits(buffer=0.5, store=path)
+    polygon = {
+        "type": "Polygon",
+        "coordinates": [[[-70.4, 42], [-70.1, 42], [-70.1, 42.1], [-70.4, 42]]],
+    }
+    geometries = [
+        Geometry({"type": "Point", "coordinates": [-70.2, 42.005]}),
+        Geometry({"type": "Point", "coordinates": [-70.25, 42.005]}),
+        Geometry(polygon),
+    ]
+
+    result = data_source.get_environments(geometries)
+    assert mock.call_count == 0
+    assert len(result[0]) == 1
+    assert result[0][0].data["properties"]["slope"] == "sloping"
+    assert result[1] == []
+    assert len(result[2]) == 2
+
+    # Single geometries are resolved offline too
+    assert data_source.get_environment(geometries[0])[0].code == result[0][0].code
+    assert mock.call_count == 0
+
+    # Arrays of geometries are resolved the same way
+    array = GeometryArray.from_shapely([g.to_shapely() for g in geometries])
+    codes = [[e.code for e in r] for r in result]
+    assert [[e.code for e in r] for r in data_source.get_environments(array)] == codes
+
+
+def test_get_environment_does_not_modify_geometry(mocker):
+    """Test that buffering a point doesn't modify the input geometry"""
+    mock = mocker.patch("requests.get", return_value=load_response("ecu_success"))
+    data_source = EcologicalCoastalUnits(buffer=0.5)
+    geometry = Geometry(load_geometry("point_on_land_expands_to_coast"))
+    assert len(data_source.get_environment(geometry)) > 0
+    assert geometry.data == load_geometry("point_on_land_expands_to_coast")
+    assert "Polygon" in mock.call_args.kwargs["params"]["geometryType"]
+
+
+def test_get_environment_with_distance_strategy(mocker):
+    """Test the get_environment method with the distance strategy
+
+    Points are sent as a coordinate pair with a server-side search distance,
+    rather than as a locally buffered polygon."""
+    mock = mocker.patch("requests.get", return_value=load_response("ecu_success"))
+    data_source = EcologicalCoastalUnits(buffer=0.5, strategy="distance")
+    geometry = Geometry({"type": "Point", "coordinates": [-70.2, 42.005]})
+    assert len(data_source.get_environment(geometry)) > 0
+    params = mock.call_args.kwargs["params"]
+    assert params["geometry"] == "-70.2,42.005"
+    assert params["geometryType"] == "esriGeometryPoint"
+    assert params["distance"] == "0.5"
+    assert params["units"] == "esriSRUnit_Kilometer"
+
+    with pytest.raises(ValueError):
+        data_source.strategy = "nearest"
+
+
+def test_get_environment_with_split_size(mocker):
+    """Test the get_environment method with split_size set
+
+    Large polygons are split into tiles, which are queried separately, and
+    the environments of the tiles are merged without duplicates."""
+    mock = mocker.patch(
+        "requests.get", side_effect=lambda *_, **__: load_response("ecu_success")
+    )
+    polygon = {
+        "type": "Polygon",
+        "coordinates": [[[-71, 41], [-69, 41], [-69, 43], [-71, 43], [-71, 41]]],
+    }
+    expected = EcologicalCoastalUnits().get_environment(Geometry(polygon))
+    assert mock.call_count == 1
+
+    mock.reset_mock()
+    data_source = EcologicalCoastalUnits(split_size=0.5)
+    result = data_source.get_environment(Geometry(polygon))
+    assert mock.call_count == 16
+    assert [e.data["properties"] for e in result] == [
+        e.data["properties"] for e in expected
+    ]
+
+    # Small polygons are not split
+    mock.reset_mock()
+    data_source.split_size = 5
+    data_source.get_environment(Geometry(polygon))
+    assert mock.call_count == 1
+
+
+def test_cluster_points():
+    """Test the cluster_points function"""
+    x = np.array([0.1, 0.2, 0.3, 5])
+    y = np.array([0.1, 0.2, 0.3, 5])
+    clusters = cluster_points(x, y, 2)
+    assert [c.tolist() for c in clusters] == [[0, 1], [2], [3]]
+
+
+def test_parse_descriptor():
+    """Test the parse_descriptor function
+
+    Descriptors are parsed once per process into read-only properties."""
+    descriptor = load_response("ecu_success").json()["features"][0]["properties"][
+        "CSU_Descriptor"
+    ]
+    properties = parse_descriptor(descriptor)
+    assert properties["slope"] == "sloping"
+    assert properties["chlorophyll"] == "low chlorophyll"
+    assert properties["ecosystem"] == descriptor
+    assert parse_descriptor(descriptor) is properties
+    with pytest.raises(TypeError):
+        properties["slope"] = "flat"
+    assert EcologicalCoastalUnits().set_properties(descriptor) == properties
+
+
+def test_convert_data_with_empty_descriptor():
+    """Test that empty descriptors are converted to environments without
+    properties"""
+    data = {"features": [{"properties": {"CSU_Descriptor": ""}}]}
+    result = EcologicalCoastalUnits().convert_data(data)
+    assert len(result) == 1
+    assert result[0].data["properties"] is None
@@ -1,8 +1,19 @@
 """Test the EcologicalMarineUnits data source"""
 
-from json import loads
-from tests.conftest import load_response, load_geometry
+from copy import deepcopy
+from json import dumps, loads
+import pytest
+from tests.conftest import load_response, load_geometry, RequestsResponse
 from geoenvo.data_sources import EcologicalMarineUnits
+from geoenvo.data_sources.ecological_marine_units import (
+    coded_value_domains,
+    parse_descriptor,
+    select_layers,
+)
+from geoenvo.geometry import Geometry
+
+# The process-wide cache of coded value domains
+DOMAINS = "geoenvo.data_sources.ecological_marine_units._domains"
 
 
 def test_convert_codes_to_values():
@@ -87,3 +98,259 @@ def test_get_environments_for_geometry_z_values():
         assert isinstance(environment, str)
         assert loads(environment)["attributes"]["Name_2018"] in expected_environments
     assert len(environments) == 6
+
+
+def test_get_environments_with_batch_size(mocker):
+    """Test the get_environments method with batch_size set
+
+    Points are resolved with one multipoint query per batch, and the returned
+    features are assigned to the points within the search distance of them.
+    """
+    mock = mocker.patch(
+        "requests.get",
+        side_effect=lambda *_, **__: load_response(
+            "emu_success_point_on_ocean_with_depth"
+        ),
+    )
+    data_source = EcologicalMarineUnits(batch_size=10)
+    point_with_depth = load_geometry("point_on_ocean_with_depth")
+    point_without_depth = {"type": "Point", "coordinates": [-157.875, 21.125]}
+    far_away_point = {"type": "Point", "coordinates": [0, 0]}
+    geometries = [
+        Geometry(point_with_depth),
+        Geometry(far_away_point),
+        Geometry(point_without_depth),
+    ]
+
+    result = data_source.get_environments(geometries)
+    assert mock.call_count == 1
+    assert len(result) == 3
+
+    # The z value of each point filters the assigned features
+    assert len(result[0]) == 1
+    assert "Epipelagic" in result[0][0].data["properties"]["depth"]
+
+    # Points without features within the search distance resolve to nothing
+    assert result[1] == []
+
+    # The results match those of resolving each point individually
+    data_source = EcologicalMarineUnits()
+    expected = data_source.get_environments(
+        [Geometry(point_with_depth), Geometry(point_without_depth)]
+    )
+    assert mock.call_count == 2  # Both points share a cached column
+    assert [e.code for e in result[0]] == [e.code for e in expected[0]]
+    assert {e.code for e in result[2]} == {e.code for e in expected[1]}
+    assert len(result[2]) > 1  # All vertically stacked environments
+
+
+def test_get_environments_with_paging(mocker):
+    """Test that batched queries page through results in a stable order, and
+    that a failed page fails the whole batch"""
+    response = load_response("emu_success_point_on_ocean_with_depth").json()
+    pages = [dict(response, exceededTransferLimit=True), response]
+    mock = mocker.patch(
+        "requests.get",
+        side_effect=lambda *_, **__: RequestsResponse(
+            deepcopy(pages.pop(0)) if pages else {}, 200
+        ),
+    )
+    data_source = EcologicalMarineUnits(batch_size=10)
+    geometry = Geometry({"type": "Point", "coordinates": [-157.875, 21.125]})
+    result = data_source.get_environments([geometry])
+    assert mock.call_count == 2
+    offsets = [c.kwargs["params"]["resultOffset"] for c in mock.call_args_list]
+    assert offsets == ["0", str(len(response["features"]))]
+    assert mock.call_args.kwargs["params"]["orderByFields"] == "UnitTop desc,OBJECTID"
+    assert len(result[0]) > 2
+
+    # Features of earlier pages are discarded if a later page fails
+    pages = [dict(response, exceededTransferLimit=True)]
+    data_source = EcologicalMarineUnits(batch_size=10)
+    assert data_source.get_environments([geometry]) == [[]]
+    assert mock.call_count == 4
+
+
+def test_get_environment_profile(mocker):
+    """Test the get_environment_profile method
+
+    The vertical stack is requested once and each depth, or depth interval,
+    resolves to the layers intersecting it."""
+    mock = mocker.patch(
+        "requests.get",
+        return_value=load_response("emu_success_point_on_ocean_with_depth"),
+    )
+    data_source = EcologicalMarineUnits()
+    geometry = Geometry({"type": "Point", "coordinates": [-157.875, 21.125]})
+    depths = [-17, -225, (-28, -260), -580]
+
+    result = data_source.get_environment_profile(geometry, depths)
+    assert mock.call_count == 1
+    assert len(result) == len(depths)
+    assert len(result[0]) == 1
+    assert "Epipelagic" in result[0][0].data["properties"]["depth"]
+    assert len(result[1]) == 2  # On the boundary of two layers
+    assert len(result[2]) == 4
+    assert result[3] == []  # Between layers of the stack
+
+
+def test_select_layers():
+    """Test the select_layers function with overlapping layers"""
+    tops = [0, -10, -5]
+    bottoms = [-20, -15, -30]
+    result = select_layers(tops, bottoms, [-2, -12, (-25, -40)])
+    assert sorted(result[0].tolist()) == [0]
+    assert sorted(result[1].tolist()) == [0, 1, 2]
+    assert sorted(result[2].tolist()) == [2]
+
+
+def test_column_cache(mocker):
+    """Test the cache of vertical columns
+
+    Geometries at the same horizontal location but different depths are
+    resolved with a single request, and z values are applied after the
+    cache."""
+    mock = mocker.patch(
+        "requests.get",
+        side_effect=lambda *_, **__: load_response(
+            "emu_success_point_on_ocean_with_depth"
+        ),
+    )
+    data_source = EcologicalMarineUnits()
+    shallow = Geometry({"type": "Point", "coordinates": [-157.875, 21.125, -17]})
+    deep = Geometry({"type": "Point", "coordinates": [-157.875, 21.125, -260]})
+    column = Geometry({"type": "Point", "coordinates": [-157.875, 21.125]})
+
+    result = data_source.get_environments([shallow, deep, column])
+    assert mock.call_count == 1
+    assert "Epipelagic" in result[0][0].data["properties"]["depth"]
+    assert result[0][0].code != result[1][0].code
+    assert len(result[2]) > 2
+
+    # Batched points are answered from the same cache
+    data_source.batch_size = 10
+    assert data_source.get_environments([deep])[0][0].code == result[1][0].code
+    assert mock.call_count == 1
+
+    # Failed requests are not cached
+    mock.side_effect = ConnectionError
+    other = Geometry({"type": "Point", "coordinates": [0, 0]})
+    data_source.batch_size = None
+    data_source.get_environment(other)
+    data_source.get_environment(other)
+    assert mock.call_count == 3
+
+    # Failed multipoint requests of batches are not cached either
+    data_source = EcologicalMarineUnits(batch_size=10)
+    assert data_source.get_environments([column]) == [[]]
+    assert mock.call_count == 4
+    mock.side_effect = lambda *_, **__: load_response(
+        "emu_success_point_on_ocean_with_depth"
+    )
+    assert len(data_source.get_environments([column])[0]) > 2
+    assert len(data_source.get_environment(column)) > 2
+    assert mock.call_count == 5
+
+
+def test_get_environments_with_store(mocker, column_store):
+    """Test the get_environments method with a local column store
+
+    Geometries are resolved offline, without requests (even for the coded
+    value domains), and with the same output as the online data source."""
+    mocker.patch(DOMAINS, {})  # Start from an empty domain cache
+    mock = mocker.patch("requests.get", side_effect=ConnectionError)
+    geometries = [
+        Geometry(load_geometry("point_on_ocean_with_depth")),
+        Geometry({"type": "Point", "coordinates": [-157.875, 21.125]}),
+        Geometry({"type": "Point", "coordinates": [0, 0]}),
+    ]
+    data_source = EcologicalMarineUnits(store=column_store())  # No fields
+    result = data_source.get_environments(geometries)
+    result.append(data_source.get_environment(geometries[0]))
+    assert mock.call_count == 0
+    assert "n/a" not in result[0][0].data["properties"]["ecosystem"]
+    assert result[2] == []
+    assert result[3][0].code == result[0][0].code
+
+    mock.side_effect = lambda *_, **__: load_response(
+        "emu_success_point_on_ocean_with_depth"
+    )
+    expected = EcologicalMarineUnits().get_environments(geometries[:2])
+    assert [e.code for e in result[0]] == [e.code for e in expected[0]]
+    assert {e.code for e in result[1]} == {e.code for e in expected[1]}
+
+
+def test_coded_value_domains(mocker):
+    """Test the coded_value_domains function
+
+    Domains are captured from the first response (or the copy shipped with
+    the package) and cached for the rest of the process."""
+    mocker.patch(DOMAINS, {})  # Start from an empty domain cache
+    mock = mocker.patch("requests.get")
+    assert coded_value_domains()["OceanName"][1] == "Arctic"  # Shipped copy
+    mocker.patch(DOMAINS, {})
+    fields = load_response("emu_success").json()["fields"]
+    domains = coded_value_domains(fields)
+    assert domains["OceanName"][1] == "Arctic"
+    assert domains["Name_2018"][0] == "n/a"
+    atomic = domains["Name_2018_atomic"][domains["Name_2018"][2]]
+    assert atomic == (
+        "Epipelagic",
+        "Cold",
+        "Polyhaline",
+        "Hypoxic",
+        "Low Nitrate",
+        "Low Phosphate",
+        "Low Silicate",
+    )
+
+    # Cached domains are reused without requests, and responses without
+    # fields are converted with them.
+    assert coded_value_domains() is domains
+    data_source = EcologicalMarineUnits()
+    data_source.data = load_response("emu_success").json()
+    del data_source.data["fields"]
+    data = data_source.convert_codes_to_values()
+    assert data["features"][0]["attributes"]["OceanName"] == "North Pacific"
+    assert mock.call_count == 0
+
+
+def test_get_environment_with_split_size(mocker):
+    """Test the get_environment method with split_size set"""
+    mock = mocker.patch(
+        "requests.get", side_effect=lambda *_, **__: load_response("emu_success")
+    )
+    polygon = {
+        "type": "Polygon",
+        "coordinates": [[[-158, 21], [-157, 21], [-157, 22], [-158, 22], [-158, 21]]],
+    }
+    expected = EcologicalMarineUnits().get_environment(Geometry(polygon))
+
+    mock.reset_mock()
+    data_source = EcologicalMarineUnits(split_size=0.5)
+    result = data_source.get_environment(Geometry(polygon))
+    assert mock.call_count == 4
+    assert [e.code for e in result] == [e.code for e in expected]
+
+
+def test_parse_descriptor():
+    """Test the parse_descriptor function
+
+    Descriptors are parsed once per process into read-only properties."""
+    descriptor = dumps(
+        {
+            "attributes": {
+                "OceanName": "North Pacific",
+                "Name_2018": "Epipelagic, Cold, Polyhaline, Hypoxic, Low Nitrate, "
+                "Low Phosphate, Low Silicate",
+            }
+        }
+    )
+    properties = parse_descriptor(descriptor)
+    assert properties["oceanName"] == "North Pacific"
+    assert properties["silicate"] == "Low Silicate"
+    assert properties["ecosystem"].startswith("North Pacific, Epipelagic")
+    assert parse_descriptor(descriptor) is properties
+    with pytest.raises(TypeError):
+        properties["depth"] = "Abyssopelagic"
+    assert EcologicalMarineUnits().set_properties(descriptor) == properties
@@ -1,13 +1,17 @@
 """Test the WorldTerrestrialEcosystems data source"""
 
 from importlib.resources import files
+import numpy as np
 import pytest
-from tests.conftest import load_geometry, load_response
-from geoenvo.geometry import Geometry
+from tests.conftest import load_geometry, load_response, RequestsResponse
+from geoenvo.geometry import Geometry, GeometryArray, get_transformer
+from geoenvo.raster import Raster
 from geoenvo.data_sources import WorldTerrestrialEcosystems
+from geoenvo.resolver import Resolver
 from geoenvo.data_sources.world_terrestrial_ecosystems import (
     create_attribute_table,
     apply_code_mapping,
+    PIXEL_GRID,
 )
 
 
@@ -102,3 +106,262 @@ def test_apply_code_mapping():
     assert code == "NoData"
     data = apply_code_mapping(response.data)
     assert data == {"results": []}
+
+
+def test_get_environment_with_raster(tmp_path, mocker):
+    """Test the get_environment method with a local raster"""
+    # A small raster covering the point_on_land geometry. Code 175 is the
+    # environment returned by the online data source for this location.
+    path = tmp_path / "wte.npy"
+    np.save(path, np.array([[0, 175], [0, 0]], dtype=np.uint16))
+    transform = (-123, 0.25, 0, 38, 0, -0.25)
+    raster = Raster.from_file(path, transform=transform, nodata=0)
+    data_source = WorldTerrestrialEcosystems(raster=raster)
+
+    # Point on land resolves to the same environment as the online response
+    result = data_source.get_environment(Geometry(load_geometry("point_on_land")))
+    assert len(result) == 1
+    expected = WorldTerrestrialEcosystems()
+    expected.data = load_response("wte_success").json()
+    assert result[0].data["properties"] == expected.convert_data()[0].data["properties"]
+
+    # Points on nodata pixels or outside the raster resolve to nothing
+    result = data_source.get_environment(Geometry(load_geometry("point_on_ocean")))
+    assert result == []
+
+    # Batches are resolved in one lookup, in the order of the inputs
+    geometries = [
+        Geometry(load_geometry("point_on_ocean")),
+        Geometry(load_geometry("point_on_land")),
+    ]
+    result = data_source.get_environments(geometries)
+    assert len(result) == 2
+    assert result[0] == []
+    assert len(result[1]) == 1
+
+    # Arrays of points are read from their coordinates, without creating a
+    # Geometry per point
+    array = GeometryArray.from_shapely([g.to_shapely() for g in geometries])
+    spy = mocker.spy(GeometryArray, "__getitem__")
+    codes = [[e.code for e in r] for r in result]
+    assert [[e.code for e in r] for r in data_source.get_environments(array)] == codes
+    assert spy.call_count == 0
+
+    # Geometries in other coordinate reference systems are reprojected first
+    projected = GeometryArray(
+        *get_transformer(3857).transform(array.x, array.y, direction="INVERSE"),
+        crs=3857,
+    )
+    result = data_source.get_environments(projected)
+    assert [[e.code for e in r] for r in result] == codes
+    assert [e.code for e in data_source.get_environment(projected[1])] == codes[1]
+
+
+def test_get_environment_with_adaptive_depth(diagonal_raster, square_polygon, mocker):
+    """Test the get_environment method with adaptive_depth set
+
+    Adaptive sampling finds the same environments as a uniform grid of the
+    finest resolution, with fewer lookups."""
+    raster = diagonal_raster()
+    polygon = square_polygon
+    data_source = WorldTerrestrialEcosystems(raster=raster, adaptive_depth=3)
+    spy = mocker.spy(data_source, "_classify")
+
+    result = data_source.get_environment(Geometry(polygon))
+    assert [e.code for e in result] == [175, 176]
+    lookups = sum(len(c.args[0]) for c in spy.call_args_list)
+    assert lookups < (4 * 2**3) ** 2 / 2  # Less than half of a uniform grid
+
+    # The number of samples is bounded by max_points
+    spy.reset_mock()
+    data_source.max_points = 20
+    data_source.get_environment(Geometry(polygon))
+    assert sum(len(c.args[0]) for c in spy.call_args_list) <= 20
+
+
+def test_get_environment_with_max_points(diagonal_raster, square_polygon, mocker):
+    """Test the get_environment method with max_points set
+
+    Polygons are sampled on an equal-area grid of at most max_points points,
+    regardless of grid_size."""
+    raster = diagonal_raster()
+    polygon = square_polygon
+    data_source = WorldTerrestrialEcosystems(
+        raster=raster, grid_size=0.01, max_points=50
+    )
+    spy = mocker.spy(raster, "sample")
+
+    result = data_source.get_environment(Geometry(polygon))
+    assert [e.code for e in result] == [175, 176]
+    assert 0 < sum(len(c.args[0]) for c in spy.call_args_list) <= 50
+
+
+def test_get_environment_with_streamed_grid(diagonal_raster, square_polygon, mocker):
+    """Test the get_environment method with a grid too large to sample at once
+
+    Strips of the grid are resolved as they are generated, with the same
+    result as resolving all points at once."""
+    raster = diagonal_raster()
+    polygon = square_polygon
+    data_source = WorldTerrestrialEcosystems(raster=raster, grid_size=0.005)
+    spy = mocker.spy(data_source, "_classify")
+
+    result = data_source.get_environment(Geometry(polygon))
+    assert [e.code for e in result] == [175, 176]
+    assert spy.call_count > 2  # Several strips, and the vertices
+    assert max(len(c.args[0]) for c in spy.call_args_list) <= 100_000
+
+    # Batches stream polygons, and read other geometries at once
+    geometries = [Geometry(polygon), Geometry(load_geometry("point_on_land"))]
+    result = data_source.get_environments(geometries)
+    assert [e.code for e in result[0]] == [175, 176]
+    assert result[1] == []
+
+
+def test_get_environment_with_align_to_pixels(diagonal_raster, square_polygon, mocker):
+    """Test the get_environment method with align_to_pixels set
+
+    A grid finer than the pixels resolves the same environments, with one
+    lookup per pixel touched by the polygon."""
+    raster = diagonal_raster(8)
+    polygon = square_polygon
+    data_source = WorldTerrestrialEcosystems(raster=raster, grid_size=0.1)
+    expected = [e.code for e in data_source.get_environment(Geometry(polygon))]
+
+    data_source.align_to_pixels = True
+    spy = mocker.spy(raster, "sample")
+    result = data_source.get_environment(Geometry(polygon))
+    assert [e.code for e in result] == expected == [175, 176]
+    # The 64 pixels within the polygon, and the pixels of vertices on its
+    # right and bottom edges, instead of over 1,600 grid points
+    assert sum(len(c.args[0]) for c in spy.call_args_list) <= 64 + 4
+
+
+def test_pixel_grid(diagonal_raster, mocker):
+    """Test the pixel_grid property
+
+    The grid is that of the local raster, or of the tiles, or else is read
+    once from the metadata of the ImageServer, and is None if the metadata
+    does not describe a grid in EPSG:4326."""
+    raster = diagonal_raster()
+    assert WorldTerrestrialEcosystems(raster=raster).pixel_grid == raster.transform
+    assert WorldTerrestrialEcosystems(tile_size=256).pixel_grid == PIXEL_GRID
+
+    metadata = {
+        "extent": {
+            "xmin": -180,
+            "ymin": -90,
+            "xmax": 180,
+            "ymax": 90,
+            "spatialReference": {"wkid": 4326},
+        },
+        "pixelSizeX": 0.5,
+        "pixelSizeY": 0.5,
+    }
+    mock = mocker.patch(
+        "requests.get", side_effect=lambda *_, **__: RequestsResponse(metadata, 200)
+    )
+    data_source = WorldTerrestrialEcosystems()
+    assert data_source.pixel_grid == (-180, 0.5, 0, 90, 0, -0.5)
+    assert data_source.pixel_grid == (-180, 0.5, 0, 90, 0, -0.5)
+    assert mock.call_count == 1  # Requested once
+
+    metadata["extent"]["spatialReference"] = {"wkid": 102100, "latestWkid": 3857}
+    assert WorldTerrestrialEcosystems().pixel_grid is None
+
+    mocker.patch("requests.get", side_effect=ConnectionError)
+    assert WorldTerrestrialEcosystems().pixel_grid is None
+
+
+def test_get_environment_with_align_to_pixels_online(square_polygon, mocker):
+    """Test the get_environment method with align_to_pixels set and no local
+    raster
+
+    Sample points are aligned to the grid of the ImageServer, and are left as
+    is if the grid can't be determined."""
+    data_source = WorldTerrestrialEcosystems(grid_size=0.1, align_to_pixels=True)
+    geometry = Geometry(square_polygon)
+    expected = len(geometry.polygon_to_points(grid_size=0.1))
+
+    mock = mocker.patch.object(
+        data_source, "_request", return_value={"properties": {"Values": ["NoData"]}}
+    )
+    mocker.patch.object(data_source, "_request_pixel_grid", return_value=None)
+    data_source.get_environment(geometry)
+    assert mock.call_count == expected
+
+    mock.reset_mock()
+    grid = (-180, 1.0, 0, 90, 0, -1.0)
+    mocker.patch.object(data_source, "_request_pixel_grid", return_value=grid)
+    data_source.get_environment(geometry)
+    assert mock.call_count < expected
+    for call in mock.call_args_list:  # At pixel centers
+        assert np.allclose(call.args[0].coordinates[0, :2] % 1, 0.5)
+
+
+def test_get_environment_with_line(diagonal_raster, mocker):
+    """Test the get_environment method with a LineString geometry
+
+    The line is sampled at the pixel size, only samples entering a new pixel
+    are resolved, and environments list their extents along the line."""
+    raster = diagonal_raster()
+    line = {"type": "LineString", "coordinates": [[0, 2.01], [3.99, 2.01]]}
+    data_source = WorldTerrestrialEcosystems(raster=raster)
+    spy = mocker.spy(data_source, "_classify")
+
+    result = data_source.get_environment(Geometry(line))
+    assert [e.code for e in result] == [175, 176]
+    assert len(spy.call_args.args[0]) <= 64  # One sample per pixel
+    first, second = (e.data["extents"] for e in result)
+    assert len(first) == len(second) == 1
+    assert first[0]["start"] == 0
+    assert first[0]["end"] == second[0]["start"]
+    # The class changes at the pixel boundary x = 33 / 16
+    boundary = second[0]["end"] * (33 / 16) / 3.99
+    assert first[0]["end"] == pytest.approx(boundary, rel=0.01)
+
+    # Lines are resolved in batches too
+    result = data_source.get_environments([Geometry(line)])
+    assert [e.code for e in result[0]] == [175, 176]
+
+    # The extents along the parts of multipart lines are combined, by part
+    short = [[0, 1.01], [1, 1.01]]  # Within class 175
+    multiline = {"type": "MultiLineString", "coordinates": [line["coordinates"], short]}
+    result = Resolver([data_source]).resolve(Geometry(multiline))
+    first, second = result.data["properties"]["environment"]
+    assert [e["part"] for e in first["extents"]] == [0, 1]
+    assert first["extents"][1]["end"] == pytest.approx(111_000, rel=0.01)
+    assert [e["part"] for e in second["extents"]] == [0]
+
+
+def test_get_environment_with_tile_size(mocker):
+    """Test the get_environment method with tile_size set"""
+
+    # Mock the exportImage operation, returning tiles of code 175 for tiles
+    # covering the point_on_land geometry, and tiles of nodata otherwise.
+    def export_image(*_, params=None, **__):
+        xmin, ymin, xmax, ymax = [float(v) for v in params["bbox"].split(",")]
+        code = 175 if xmin <= -122.622364 < xmax and ymin < 37.905931 <= ymax else 0
+        response = mocker.Mock()
+        response.content = np.full((4, 4), code, dtype=np.uint16).tobytes()
+        return response
+
+    mock = mocker.patch("requests.get", side_effect=export_image)
+    data_source = WorldTerrestrialEcosystems(tile_size=4)
+
+    # Points are resolved from the tile containing them
+    geometries = [
+        Geometry(load_geometry("point_on_land")),
+        Geometry(load_geometry("point_on_ocean")),
+        Geometry(load_geometry("point_on_land")),
+    ]
+    result = data_source.get_environments(geometries)
+    assert [len(r) for r in result] == [1, 0, 1]
+    assert result[0][0].data["properties"]["ecosystem"] == (
+        "Warm Temperate Moist Cropland on Mountains"
+    )
+    assert mock.call_count == 2  # One request per tile, not per point
+
+    # Cached tiles are not requested again
+    data_source.get_environment(Geometry(load_geometry("point_on_land")))
+    assert mock.call_count == 2
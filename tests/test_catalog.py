@@ -0,0 +1,78 @@
+"""Test the catalog module"""
+
+import pytest
+from geoenvo.catalog import EnvironmentCatalog
+from geoenvo.environment import Environment
+
+
+def test_register():
+    """Test the register method"""
+    catalog = EnvironmentCatalog("SomeDataSource", "Some identifier")
+
+    # Classes are assigned integer codes
+    code = catalog.register("a", {"ecosystem": "A"})
+    assert isinstance(code, int)
+    assert code in catalog
+    assert catalog.code("a") == code
+
+    # Registering a known class returns the existing code
+    assert catalog.register("a", {"ecosystem": "Different"}) == code
+    assert catalog.properties(code)["ecosystem"] == "A"
+    assert len(catalog) == 1
+
+    # Codes can be provided explicitly
+    assert catalog.register("b", {"ecosystem": "B"}, code=175) == 175
+    assert catalog.code("unknown") is None
+
+    # Properties are immutable
+    with pytest.raises(TypeError):
+        catalog.properties(code)["ecosystem"] = "B"
+
+    # Classes may have no properties (e.g., an empty descriptor)
+    code = catalog.register("", None)
+    assert catalog.properties(code) is None
+    assert catalog.environment(code).data["properties"] is None
+
+
+def test_environment(empty_environment_data_model):
+    """Test the environment and expand methods"""
+    catalog = EnvironmentCatalog("SomeDataSource", "Some identifier")
+    code = catalog.register("a", {"ecosystem": "A"})
+
+    # A new Environment object is returned for each result
+    environment = catalog.environment(code)
+    assert isinstance(environment, Environment)
+    assert environment is not catalog.environment(code)
+    assert environment.code == code
+
+    # The environment is expanded into the data model on access
+    data = environment.data
+    assert data.keys() == empty_environment_data_model.keys()
+    assert data["dataSource"] == {
+        "identifier": "Some identifier",
+        "name": "SomeDataSource",
+    }
+    assert data["properties"] == {"ecosystem": "A"}
+    assert data["mappedProperties"] == []
+
+    # The data is expanded once per result, so changes are kept with the
+    # result and don't leak to other results
+    assert environment.data is data
+    data["mappedProperties"].append({"label": "a", "uri": "b"})
+    assert environment.data["mappedProperties"] == [{"label": "a", "uri": "b"}]
+    assert catalog.environment(code).data["mappedProperties"] == []
+    environment.data = {"changed": True}
+    assert environment.data == {"changed": True}
+    assert catalog.environment(code).data["properties"] == {"ecosystem": "A"}
+
+
+def test_data_source_catalogs(scenarios):
+    """Test that resolved environments reference the data source catalog"""
+    for scenario in scenarios:
+        data_source = scenario["data_source"]
+        data_source.data = scenario["response"].json()
+        data_source.geometry = scenario["geometry"]
+        for environment in data_source.convert_data():
+            assert environment.code in data_source.catalog
+            properties = data_source.catalog.properties(environment.code)
+            assert environment.data["properties"] == properties
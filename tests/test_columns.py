@@ -0,0 +1,54 @@
+"""Test the columns module"""
+
+import pytest
+from geoenvo.columns import ColumnStore
+
+
+def test_query_points(column_store):
+    """Test the query_points method"""
+    store = column_store()
+    result = store.query_points([-157.875, -157.9, 0], [21.125, 21.1, 0], 18520)
+    assert len(result) == 3
+
+    # Points within the distance of a cell return its whole column, from the
+    # top down
+    tops = [f["attributes"]["UnitTop"] for f in result[0]["features"]]
+    assert len(tops) == len(store)
+    assert tops == sorted(tops, reverse=True)
+    assert result[1]["features"] == result[0]["features"]
+
+    # Points far from any cell return no layers
+    assert result[2]["features"] == []
+
+
+def test_query_polygon(column_store):
+    """Test the query_polygon method"""
+    store = column_store()
+    polygon = {
+        "type": "Polygon",
+        "coordinates": [[[-158, 21], [-157.8, 21], [-157.8, 21.2], [-158, 21]]],
+    }
+    assert len(store.query_polygon(polygon, 18520)["features"]) == len(store)
+
+    # Cells near the polygon's boundary are included
+    polygon = {
+        "type": "Polygon",
+        "coordinates": [[[-157.8, 21], [-157.7, 21], [-157.7, 21.2], [-157.8, 21]]],
+    }
+    assert len(store.query_polygon(polygon, 18520)["features"]) == len(store)
+    assert store.query_polygon(polygon, 1000)["features"] == []
+
+    # Lines include the cells within the distance of the line
+    line = {"type": "LineString", "coordinates": [[-158, 21.175], [-157.7, 21.175]]}
+    assert len(store.query_polygon(line, 18520)["features"]) == len(store)
+    assert store.query_polygon(line, 1000)["features"] == []
+
+
+def test_from_file(tmp_path, column_store):
+    """Test the from_file method"""
+    store = column_store(tmp_path / "emu.npz")
+    assert len(store) == len(column_store())
+    assert store.fields[2]["name"] == "OceanName"
+
+    with pytest.raises(ValueError):
+        ColumnStore.from_file(tmp_path / "emu.txt")
@@ -1,6 +1,6 @@
 """Test the environment module."""
 
-from geoenvo.environment import Environment
+from geoenvo.environment import Environment, merge_environments
 
 
 def test_environment_init():
@@ -18,3 +18,29 @@ def test_data():
     default_value = geometry.data
     geometry.data = {"type": "Different Environment"}
     assert geometry.data != default_value
+
+
+def test_merge_environments():
+    """Test the merge_environments() function.
+
+    Duplicates are dropped, by code or by data, in the order of first
+    occurrence."""
+    first = Environment({"properties": {"a": 1}})
+    second = Environment({"properties": {"a": 2}})
+    duplicate = Environment({"properties": {"a": 1}})
+    merged = merge_environments([[first, second], [duplicate], []])
+    assert merged == [first, second]
+
+    coded = [Environment(code=1), Environment(code=2), Environment(code=1)]
+    assert [e.code for e in merge_environments([coded])] == [1, 2]
+
+    # Extents along the parts of lines are combined, by part
+    first = Environment({"extents": [{"start": 0, "end": 5}]}, code=1)
+    second = Environment({"extents": [{"start": 2, "end": 3}]}, code=1)
+    merged = merge_environments([[first], [second]])
+    assert len(merged) == 1
+    assert merged[0].data["extents"] == [
+        {"start": 0, "end": 5, "part": 0},
+        {"start": 2, "end": 3, "part": 1},
+    ]
+    assert first.data["extents"] == [{"start": 0, "end": 5}]
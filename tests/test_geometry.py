@@ -4,9 +4,25 @@ import json
 from io import StringIO
 import pandas as pd
 import geopandas as gpd
+import numpy as np
 import pytest
 import shapely
-from geoenvo.geometry import Geometry, grid_sample_polygon
+from geoenvo.geometry import (
+    Geometry,
+    GeometryArray,
+    grid_sample_polygon,
+    grid_sample_coordinates,
+    adaptive_sample_polygon,
+    buffer_points,
+    equal_area_sample_polygon,
+    snap_to_pixels,
+    iter_grid_sample_coordinates,
+    sample_line,
+    drop_repeated_cells,
+    split_polygon,
+    get_transformer,
+    reproject_geometries,
+)
 from tests.conftest import load_geometry
 
 
@@ -16,6 +32,83 @@ def test_geometry_init():
     assert isinstance(geometry.data, dict)
 
 
+def test_geometry_cached_forms():
+    """Test that derived forms of a geometry are computed once, and reset
+    when its data is set."""
+    geometry = Geometry(load_geometry("polygon_on_land_and_ocean"))
+    assert geometry.to_shapely() is geometry.to_shapely()
+    assert geometry.to_esri_json() is geometry.to_esri_json()
+    assert json.loads(geometry.to_esri_json())["rings"] == geometry.data["coordinates"]
+    assert geometry.coordinates.shape == (4, 2)
+    assert not hasattr(geometry, "__dict__")
+
+    # Copies of the Esri form may be modified
+    geometry.to_esri()["geometry"].pop("rings")
+    assert "rings" in geometry.to_esri()["geometry"]
+
+    # Setting data resets the cache
+    geometry.data = load_geometry("point_on_land")
+    assert geometry.to_shapely().geom_type == "Point"
+    assert geometry.coordinates.shape == (1, 2)
+
+    # Keys are equal for the same shape, including its rings
+    assert geometry.key == Geometry(load_geometry("point_on_land")).key
+    assert geometry.key != Geometry(load_geometry("polygon_on_land_and_ocean")).key
+    shell = [[0, 0], [4, 0], [4, 4], [0, 4], [0, 0]]
+    hole = [[1, 1], [2, 1], [2, 2], [1, 1]]
+    with_hole = Geometry({"type": "Polygon", "coordinates": [shell, hole]})
+    single_ring = Geometry({"type": "Polygon", "coordinates": [shell + hole]})
+    assert with_hole.key != single_ring.key
+    with_hole.crs = 3857
+    assert with_hole.key[0] == 3857
+
+
+def test_geometry_array():
+    """Test the GeometryArray class.
+
+    Points are held as coordinate arrays, and other geometries as Shapely
+    objects, and rows are materialized as Geometry objects on access."""
+    x, y = np.array([-122.6, -70.2]), np.array([37.9, 42.0])
+    array = GeometryArray(x, y, ids=["a", "b"])
+    assert array.x is x  # Not copied
+    assert len(array) == 2
+    assert array.types.tolist() == ["Point", "Point"]
+    assert array[1].data == {"type": "Point", "coordinates": [-70.2, 42.0]}
+    assert [g.geometry_type() for g in array] == ["Point", "Point"]
+
+    # From Shapely geometries, with z coordinates and polygons
+    polygon = load_geometry("polygon_on_land_and_ocean")
+    shapes = [shapely.Point(1, 2, -5), shapely.geometry.shape(polygon)]
+    array = GeometryArray.from_shapely(shapes)
+    assert array.types.tolist() == ["Point", "Polygon"]
+    assert array[0].data["coordinates"] == [1, 2, -5]
+    assert array[1].key == Geometry(polygon).key
+    assert np.isnan(array.x[1])
+
+    # From a GeoDataFrame, reprojected to EPSG:4326
+    frame = gpd.GeoDataFrame(
+        {"site": ["s1", "s2"]}, geometry=gpd.points_from_xy(x, y), crs=4326
+    ).to_crs(3857)
+    array = GeometryArray.from_geodataframe(frame, id_column="site")
+    assert array.ids.tolist() == ["s1", "s2"]
+    assert np.allclose(array.x, x) and np.allclose(array.y, y)
+
+    # Selecting rows
+    selected = array.take([1])
+    assert len(selected) == 1
+    assert selected.ids.tolist() == ["s2"]
+
+    # Missing and empty geometries are rejected rather than becoming NaN points
+    with pytest.raises(ValueError):
+        GeometryArray.from_shapely([shapely.Point(1, 2), None])
+    with pytest.raises(ValueError):
+        GeometryArray.from_shapely([shapely.Point(1, 2), shapely.Polygon()])
+    with pytest.raises(ValueError):
+        GeometryArray([1.0, np.nan], [2.0, 3.0])
+    with pytest.raises(ValueError):
+        GeometryArray([1.0, np.nan], [2.0, np.nan], shapes=[None, shapely.Polygon()])
+
+
 def test_geometry_type():
     """Test the geometry_type() function."""
     # Point
@@ -43,6 +136,42 @@ def test_is_supported():
     # Unsupported geometry
     assert Geometry({"type": "Unknown"}).is_supported() is False
 
+    # LineString geometry
+    line = {"type": "LineString", "coordinates": [[0, 0], [1, 1]]}
+    assert Geometry(line).is_supported() is True
+    assert Geometry(line).to_esri()["geometryType"] == "esriGeometryPolyline"
+
+    # Multipart geometries of supported parts
+    point = load_geometry("point_on_land")
+    multipoint = {"type": "MultiPoint", "coordinates": [point["coordinates"]]}
+    assert Geometry(multipoint).is_supported() is True
+    collection = {"type": "GeometryCollection", "geometries": [{"type": "Unknown"}]}
+    assert Geometry(collection).is_supported() is False
+
+
+def test_parts():
+    """Test the parts() and is_multipart() methods.
+
+    Multipart geometries split into single parts, with nested collections
+    flattened."""
+    point = load_geometry("point_on_land")
+    polygon = load_geometry("polygon_on_land_and_ocean")
+    multipolygon = {"type": "MultiPolygon", "coordinates": [polygon["coordinates"]] * 2}
+    collection = {
+        "type": "GeometryCollection",
+        "geometries": [point, multipolygon],
+    }
+    geometry = Geometry(collection)
+    assert geometry.is_multipart()
+    assert [p.geometry_type() for p in geometry.parts()] == ["Point"] + ["Polygon"] * 2
+    assert geometry.parts()[1].key == Geometry(polygon).key
+    assert geometry.coordinates.shape == (9, 2)
+
+    # Single geometries are their only part
+    geometry = Geometry(point)
+    assert not geometry.is_multipart()
+    assert geometry.parts() == [geometry]
+
 
 def test_point_to_polygon():
     """Test the point_to_polygon() function.
@@ -81,6 +210,23 @@ def test_point_to_polygon():
     assert geometry.data != result
 
 
+def test_buffer_points():
+    """Test the buffer_points() function.
+
+    Envelopes of geodesic buffers are computed for arrays of points at once,
+    and widen in longitude with latitude."""
+    bounds = buffer_points([21, 21, 179.99], [0, 60, 0], 10000)
+    assert bounds.shape == (3, 4)
+    height = (bounds[:, 3] - bounds[:, 1]) * 111_000
+    assert np.allclose(height, 20000, rtol=0.01)
+    width = bounds[:, 2] - bounds[:, 0]
+    assert np.isclose(width[1], width[0] * 2, rtol=0.01)  # cos(60) = 0.5
+
+    # Buffers are continuous across the antimeridian
+    assert bounds[2, 0] < 180 < bounds[2, 2]
+    assert np.isclose(width[2], width[0])
+
+
 def test_to_esri():
     """Test the to_esri() function."""
     # GeoJSON point to ESRI point
@@ -169,6 +315,214 @@ def test_grid_sample_polygon():
         ]
 
 
+def test_grid_sample_coordinates():
+    """Test the grid_sample_coordinates() function.
+
+    Cell centers are returned as coordinate arrays, ordered by x then y, and
+    centers in holes of the polygon are excluded."""
+    polygon = shapely.Polygon(
+        [(0, 0), (1.5, 0), (1.5, 1.5), (0, 1.5)],
+        holes=[[(0.6, 0.6), (0.9, 0.6), (0.9, 0.9), (0.6, 0.9)]],
+    )
+    x, y = grid_sample_coordinates(polygon, 0.5)
+    assert isinstance(x, np.ndarray)
+    assert len(x) == 8  # 9 cells, less the one centered in the hole
+    assert (0.75, 0.75) not in zip(x.tolist(), y.tolist())
+    assert list(zip(x.tolist(), y.tolist()))[:3] == [
+        (0.25, 0.25),
+        (0.25, 0.75),
+        (0.25, 1.25),
+    ]
+
+    # The result matches that of grid_sample_polygon()
+    points = grid_sample_polygon(polygon, 0.5)
+    assert points.x.tolist() == x.tolist()
+    assert points.y.tolist() == y.tolist()
+
+
+def test_adaptive_sample_polygon():
+    """Test the adaptive_sample_polygon() function.
+
+    Cells are only refined where neighboring samples differ, so samples
+    concentrate along the boundary between classes."""
+    polygon = shapely.box(0, 0, 4, 4)
+
+    def classify(x, _):
+        return np.where(x < 1.1, 1, 2)
+
+    x, _, codes = adaptive_sample_polygon(polygon, classify, 1, max_depth=3)
+    assert set(codes.tolist()) == {1, 2}
+    assert len(x) < 16 * 4**3
+    assert np.mean(np.abs(x - 1.1) < 1) > 0.5  # Mostly near the boundary
+
+    # Homogeneous polygons are not refined
+    def homogeneous(x, _):
+        return np.ones(len(x))
+
+    x, _, codes = adaptive_sample_polygon(polygon, homogeneous, 1, max_depth=3)
+    assert len(x) == 16
+
+    # A budget smaller than the first level keeps samples spread over the
+    # polygon, rather than those of its first cells
+    x, y, _ = adaptive_sample_polygon(polygon, homogeneous, 1, max_points=4)
+    assert len(x) == 4
+    assert np.ptp(x) > 2 and np.ptp(y) > 2
+
+    # Polygons smaller than a cell are sampled at a representative point
+    x, _, _ = adaptive_sample_polygon(shapely.box(0, 0, 0.1, 0.1), classify, 1)
+    assert len(x) == 1
+
+
+def test_equal_area_sample_polygon():
+    """Test the equal_area_sample_polygon() function.
+
+    The number of samples is close to, but no more than, the budget, and
+    samples are evenly spaced by area rather than by degrees."""
+    polygon = shapely.box(0, 0, 10, 80)
+    x, y = equal_area_sample_polygon(polygon, 1000)
+    assert 900 <= len(x) <= 1000
+    assert shapely.contains_xy(polygon, x, y).all()
+    low, high = np.histogram(y, bins=[0, 10, 70, 80])[0][[0, 2]]
+    assert low > 3 * high  # A degree of latitude covers less area near poles
+
+    # Edges are straight in degrees, not in the projection
+    triangle = shapely.Polygon([(0, 0), (60, 0), (0, 60)])
+    x, y = equal_area_sample_polygon(triangle, 100)
+    assert 0 < len(x) <= 100
+    assert shapely.contains_xy(triangle, x, y).all()
+
+    # Polygons smaller than the spacing are sampled at a representative point
+    x, _ = equal_area_sample_polygon(shapely.box(0, 0, 0.001, 0.001), 1)
+    assert len(x) == 1
+
+    # Thin diagonal polygons are sampled within the polygon, or at a
+    # representative point if no grid point falls within it
+    sliver = shapely.Polygon([(-170, 0), (170, 50), (170, 50.05), (-170, 0.02)])
+    for max_points in [3, 10, 100]:
+        x, y = equal_area_sample_polygon(sliver, max_points)
+        assert 0 < len(x) <= max_points
+        assert shapely.contains_xy(sliver, x, y).all()
+
+
+def test_snap_to_pixels():
+    """Test the snap_to_pixels() function.
+
+    Points are snapped to pixel centers, keeping the first point of each
+    pixel in the order of the input."""
+    transform = (0, 1, 0, 4, 0, -1)
+    x, y = snap_to_pixels([2.9, 0.1, 2.1, 0.5], [3.5, 0.2, 3.9, 0.9], transform)
+    assert x.tolist() == [2.5, 0.5]
+    assert y.tolist() == [3.5, 0.5]
+
+
+def test_iter_grid_sample_coordinates():
+    """Test the iter_grid_sample_coordinates() function.
+
+    Strips of the grid yield the same points as the whole grid at once."""
+    polygon = shapely.geometry.shape(load_geometry("polygon_on_land_and_ocean"))
+    x, y = grid_sample_coordinates(polygon, 0.0005)
+    strips = list(iter_grid_sample_coordinates(polygon, 0.0005, strip_size=50))
+    assert len(strips) > 1
+    assert all(len(strip_x) <= 50 for strip_x, _ in strips)
+    streamed = set(zip(*(np.concatenate(a) for a in zip(*strips))))
+    assert streamed == set(zip(x, y))
+
+
+def test_iter_polygon_to_points():
+    """Test the iter_polygon_to_points() method."""
+    geometry = Geometry(load_geometry("polygon_on_land_and_ocean"))
+    points = geometry.iter_polygon_to_points(grid_size=0.5)
+    assert not isinstance(points, list)
+    points = [tuple(p["coordinates"]) for p in points]
+    expected = geometry.polygon_to_points(grid_size=0.5)
+    assert sorted(points) == sorted(tuple(p["coordinates"]) for p in expected)
+
+    # Non-polygon geometries yield nothing
+    geometry = Geometry(load_geometry("point_on_land"))
+    assert not list(geometry.iter_polygon_to_points(grid_size=0.5))
+
+
+def test_split_polygon():
+    """Test the split_polygon() function.
+
+    Tiles cover the polygon exactly, each within one cell of the grid."""
+    polygon = shapely.Polygon([(0.2, 0.2), (2.6, 0.4), (1.1, 1.9)])
+    tiles = split_polygon(polygon, 0.5)
+    assert len(tiles) > 4
+    assert sum(t.area for t in tiles) == pytest.approx(polygon.area)
+    for tile in tiles:
+        min_x, min_y, max_x, max_y = tile.bounds
+        assert np.floor(min_x / 0.5) == np.ceil(max_x / 0.5) - 1
+        assert np.floor(min_y / 0.5) == np.ceil(max_y / 0.5) - 1
+
+
+def test_sample_line():
+    """Test the sample_line() function.
+
+    Points are evenly spaced along the line, including its ends, with their
+    geodesic distance from the start."""
+    line = shapely.LineString([(0, 0), (1, 0), (1, 1)])
+    x, y, distance = sample_line(line, 0.1)
+    assert len(x) == 21
+    assert (x[0], y[0]) == (0, 0) and (x[-1], y[-1]) == (1, 1)
+    assert np.all(np.diff(distance) > 0)
+    assert distance[-1] == pytest.approx(2 * 111_000, rel=0.01)
+
+    # Dense vertices are decimated to the spacing
+    line = shapely.LineString(
+        np.column_stack([np.linspace(0, 1, 1000), np.zeros(1000)])
+    )
+    assert len(sample_line(line, 0.25)[0]) == 5
+
+
+def test_drop_repeated_cells():
+    """Test the drop_repeated_cells() function.
+
+    Only points entering a new cell are kept, so a cell revisited later is
+    kept again."""
+    x = [0.1, 0.2, 0.9, 1.5, 1.6, 0.5]
+    y = [0.5] * 6
+    kept = drop_repeated_cells(x, y, (0, 1, 0, 1, 0, -1))
+    assert kept.tolist() == [0, 3, 5]
+
+
+def test_reproject():
+    """Test reprojecting geometries declared in other coordinate reference
+    systems to EPSG:4326.
+
+    Transformers are cached, and the Esri form keeps the declared system so
+    that services can reproject it."""
+    x, y = np.array([-122.6, -70.2]), np.array([37.9, 42.0])
+    mx, my = get_transformer(3857).transform(x, y, direction="INVERSE")
+
+    geometry = Geometry({"type": "Point", "coordinates": [mx[0], my[0], -5]}, 3857)
+    assert geometry.to_esri()["geometry"]["spatialReference"] == {"wkid": 3857}
+    assert (
+        geometry.key
+        != Geometry({"type": "Point", "coordinates": [mx[0], my[0], -5]}).key
+    )
+    wgs84 = geometry.to_wgs84()
+    assert wgs84 is geometry.to_wgs84()
+    assert wgs84.crs is None
+    assert np.allclose(wgs84.data["coordinates"], [x[0], y[0], -5])
+    assert wgs84.to_wgs84() is wgs84
+    assert get_transformer(3857) is get_transformer(3857)
+
+    # Lists are reprojected by system, and arrays at once
+    geometries = reproject_geometries(
+        [geometry, Geometry(load_geometry("point_on_land"))]
+    )
+    assert np.allclose(geometries[0].data["coordinates"], [x[0], y[0], -5])
+    assert geometries[1].data == load_geometry("point_on_land")
+    square = shapely.box(mx[1], my[1], mx[1] + 1000, my[1] + 1000)
+    array = GeometryArray.from_shapely([shapely.Point(mx[0], my[0]), square], crs=3857)
+    assert array[0].crs == 3857
+    array = reproject_geometries(array)
+    assert array.crs is None
+    assert np.allclose(array.x[:1], x[:1]) and np.allclose(array.y[:1], y[:1])
+    assert np.allclose(array[1].to_shapely().bounds[:2], [x[1], y[1]])
+
+
 def test_polygon_to_points():
     """Test the polygon_to_points() function."""
     polygon = {
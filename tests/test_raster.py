@@ -0,0 +1,49 @@
+"""Test the raster module"""
+
+import json
+import numpy as np
+import pytest
+from geoenvo.raster import Raster
+
+
+def test_sample():
+    """Test the sample method"""
+    array = np.array([[1, 2], [3, 0]])
+    raster = Raster(array, transform=(0, 1, 0, 2, 0, -1), nodata=0)
+
+    # Coordinates are mapped to the pixel containing them
+    codes = raster.sample(np.array([0.5, 1.5, 0.5]), np.array([1.5, 1.5, 0.5]))
+    assert codes.tolist() == [1, 2, 3]
+
+    # Coordinates outside the extent, or on nodata pixels, are masked
+    codes = raster.sample(np.array([5, 1.5]), np.array([5, 0.5]))
+    assert codes.mask.all()
+
+
+def test_from_file(tmp_path):
+    """Test the from_file method"""
+    array = np.array([[1, 2], [3, 0]], dtype=np.uint16)
+    path = tmp_path / "raster.npy"
+    np.save(path, array)
+
+    # The geotransform is required for NumPy files
+    with pytest.raises(ValueError):
+        Raster.from_file(path)
+
+    # The array is memory-mapped, not read into memory
+    raster = Raster.from_file(path, transform=(0, 1, 0, 2, 0, -1))
+    assert isinstance(raster.array, np.memmap)
+    assert raster.shape == (2, 2)
+    assert raster.sample([1.5], [0.5]).tolist() == [0]  # no nodata defined
+    assert raster.sample([0.5], [0.5]).tolist() == [3]
+
+    # The geotransform and nodata value can be read from a sidecar file
+    with open(tmp_path / "raster.npy.json", "w", encoding="utf-8") as f:
+        json.dump({"transform": [0, 1, 0, 2, 0, -1], "nodata": 0}, f)
+    raster = Raster.from_file(path)
+    assert raster.nodata == 0
+    assert raster.sample([1.5], [0.5]).mask.all()
+
+    # Unsupported formats raise an error
+    with pytest.raises(ValueError):
+        Raster.from_file(tmp_path / "raster.txt", transform=(0, 1, 0, 2, 0, -1))
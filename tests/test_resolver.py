@@ -1,9 +1,13 @@
 """Test the resolver module"""
 
+from copy import deepcopy
+import numpy as np
 from geoenvo.resolver import Resolver
-from geoenvo.geometry import Geometry
+from geoenvo.geometry import Geometry, GeometryArray, get_transformer
 from geoenvo.data_sources import WorldTerrestrialEcosystems
 from geoenvo.data_sources import EcologicalMarineUnits
+from geoenvo.raster import Raster
+from tests.conftest import load_geometry
 
 
 def test_resolve(use_mock, scenarios, assert_identify, mocker):
@@ -38,3 +42,84 @@ def test_data_source():
     assert resolver.data_source is not None
     assert isinstance(resolver.data_source, list)
     assert isinstance(resolver.data_source[0], EcologicalMarineUnits)
+
+
+def test_resolve_batch(scenarios, mocker):
+    """Test the resolve_batch method"""
+    for scenario in scenarios:
+        # Return a fresh copy of the response for each request
+        response = scenario.get("response")
+        mocker.patch(
+            "requests.get", side_effect=lambda *_, r=response, **__: deepcopy(r)
+        )
+        resolver = Resolver([scenario.get("data_source")])
+        geometries = [Geometry(scenario.get("geometry"))] * 2
+
+        result = resolver.resolve_batch(geometries, identifier=["a", "b"])
+        assert len(result) == 2
+        assert [r.data["identifier"] for r in result] == ["a", "b"]
+        for item in result:
+            environment = item.data["properties"]["environment"]
+            assert len(environment) == scenario["unique_environment"]
+
+        # Arrays of geometries are accepted, with their ids as identifiers
+        shape = geometries[0].to_shapely()
+        array = GeometryArray.from_shapely([shape, shape], ids=["a", "b"])
+        result = resolver.resolve_batch(array)
+        assert [r.data["identifier"] for r in result] == ["a", "b"]
+        for item in result:
+            environment = item.data["properties"]["environment"]
+            assert len(environment) == scenario["unique_environment"]
+
+
+def test_resolve_multipart(mocker):
+    """Test resolving multipart geometries
+
+    Parts are resolved together in one batch, and their environments are
+    merged without duplicates."""
+    raster = Raster(np.array([[0, 175], [0, 0]]), (-123, 0.25, 0, 38, 0, -0.25), 0)
+    data_source = WorldTerrestrialEcosystems(raster=raster)
+    spy = mocker.spy(data_source, "get_environments")
+    resolver = Resolver([data_source])
+    land = load_geometry("point_on_land")["coordinates"]
+    ocean = load_geometry("point_on_ocean")["coordinates"]
+    multipoint = {"type": "MultiPoint", "coordinates": [land, ocean, land]}
+
+    result = resolver.resolve(Geometry(multipoint))
+    assert len(result.data["properties"]["environment"]) == 1
+    assert result.data["geometry"] == multipoint
+    assert spy.call_count == 1
+    assert len(spy.call_args.args[0]) == 3
+
+    # In batches, the parts of all geometries are resolved together
+    spy.reset_mock()
+    geometries = [Geometry(multipoint), Geometry(load_geometry("point_on_ocean"))]
+    result = resolver.resolve_batch(geometries)
+    assert [len(r.data["properties"]["environment"]) for r in result] == [1, 0]
+    assert spy.call_count == 1
+    assert len(spy.call_args.args[0]) == 4
+
+
+def test_resolve_crs():
+    """Test resolving geometries in other coordinate reference systems than
+    EPSG:4326, which are reprojected before they are resolved."""
+    raster = Raster(np.array([[0, 175], [0, 0]]), (-123, 0.25, 0, 38, 0, -0.25), 0)
+    resolver = Resolver([WorldTerrestrialEcosystems(raster=raster)])
+    land = Geometry(load_geometry("point_on_land"))
+    x, y = land.data["coordinates"][:2]
+    projected = Geometry(
+        {
+            "type": "Point",
+            "coordinates": list(
+                get_transformer(3857).transform(x, y, direction="INVERSE")
+            ),
+        },
+        3857,
+    )
+
+    result = resolver.resolve(projected)
+    assert len(result.data["properties"]["environment"]) == 1
+    assert np.allclose(result.data["geometry"]["coordinates"], [x, y])
+
+    result = resolver.resolve_batch([projected, land])
+    assert [len(r.data["properties"]["environment"]) for r in result] == [1, 1]
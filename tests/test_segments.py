@@ -0,0 +1,36 @@
+"""Test the segments module"""
+
+import pytest
+import shapely
+from geoenvo.segments import SegmentStore
+
+
+def test_query(coastal_segments):
+    """Test the query method"""
+    segments = coastal_segments
+    store = SegmentStore(segments.geometry, segments["CSU_Descriptor"])
+    assert len(store) == 2
+    polygon = {
+        "type": "Polygon",
+        "coordinates": [[[-70.4, 42], [-70.1, 42], [-70.1, 42.1], [-70.4, 42]]],
+    }
+    point = {"type": "Point", "coordinates": [0, 0]}
+    result = store.query([polygon, point, shapely.box(-70.21, 42, -70.19, 42.1)])
+    assert len(result[0]["features"]) == 2
+    assert result[1]["features"] == []
+    assert result[2]["features"] == [
+        {"properties": {"CSU_Descriptor": segments["CSU_Descriptor"][0]}}
+    ]
+
+
+def test_from_file(tmp_path, coastal_segments):
+    """Test the from_file method"""
+    path = tmp_path / "ecu.gpkg"
+    coastal_segments.to_crs(3857).to_file(path)
+    store = SegmentStore.from_file(path)
+    assert len(store) == 2
+    box = shapely.box(-70.21, 42, -70.19, 42.1)  # Reprojected to EPSG:4326
+    assert len(store.query([box])[0]["features"]) == 1
+
+    with pytest.raises(Exception):
+        SegmentStore.from_file(tmp_path / "missing.gpkg")
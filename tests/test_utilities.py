@@ -7,9 +7,10 @@ from geoenvo.data_sources.world_terrestrial_ecosystems import apply_code_mapping
 from geoenvo.geometry import Geometry
 from geoenvo.utilities import (
     EnvironmentDataModel,
+    LRUCache,
     get_properties,
 )
-from geoenvo.response import Response, construct_response
+from geoenvo.response import Response, construct_response, map_terms
 from tests.conftest import load_response
 
 
@@ -300,3 +301,33 @@ def test__to_schema_org_keywords(data_model):
     data.data["properties"]["environment"] = []
     keywords = data._to_schema_org_keywords()
     assert keywords is None
+
+
+def test_lru_cache():
+    """Test the LRUCache class"""
+    cache = LRUCache(maxsize=2)
+    assert cache.get("a") is None
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1  # Marks "a" as recently used
+
+    # The least recently used item is evicted when the cache is full
+    cache.put("c", 3)
+    assert len(cache) == 2
+    assert "b" not in cache
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+
+    cache.clear()
+    assert len(cache) == 0
+
+
+def test_map_terms():
+    """Test the map_terms function"""
+    terms = map_terms("WorldTerrestrialEcosystems", "ENVO", ("Plains", "Polar Moist"))
+    assert terms == (
+        (("label", "plain"), ("uri", "http://purl.obolibrary.org/obo/ENVO_00000086")),
+    )
+
+    # Unknown data sources have no mapping
+    assert map_terms("SomeDataSource", "ENVO", ("Plains",)) is None